@@ -1,9 +1,18 @@
 # backend/app/api/routers/novels.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.deps import get_db
-from app.schemas.novel import NovelCreate, NovelRead
+from app.db.session import SessionLocal
+from app.schemas.chapter import ChapterRead
+from app.schemas.novel import NovelCreate, NovelPage, NovelRead, NovelSummary
+from app.services.chapter_cache import CachedChapter, chapter_cache
+from app.services.chapter_service import get_chapter_by_number, novel_version
+from app.services.novel_export import EXPORTS, MEDIA_TYPES, cached_export, export_revision, stream_export
 from app.services.novel_service import create_novel, get_novel, list_novels
 
 router = APIRouter(prefix="/novels", tags=["novels"])
@@ -12,9 +21,31 @@ router = APIRouter(prefix="/novels", tags=["novels"])
 def create_novel_endpoint(novel: NovelCreate, db: Session = Depends(get_db)):
     return create_novel(db, novel)
 
-@router.get("/", response_model=list[NovelRead])
-def list_novels_endpoint(db: Session = Depends(get_db)):
-    return list_novels(db)
+@router.get("/", response_model=NovelPage)
+def list_novels_endpoint(
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = Query(None, description="next_cursor of the previous page"),
+    author: str | None = None,
+    status: Literal["ongoing", "completed"] | None = None,
+    db: Session = Depends(get_db),
+):
+    rows, next_cursor = list_novels(db, limit=limit, before=before, author=author, status=status)
+    items = [
+        NovelSummary(
+            id=novel.id,
+            title=novel.title,
+            author=novel.author,
+            cover_url=novel.cover_url,
+            source_url=novel.source_url,
+            total_chapters=novel.total_chapters or 0,
+            status=novel.status,
+            chapter_count=stats.chapter_count if stats else 0,
+            total_chars=stats.total_chars if stats else 0,
+            updated_at=stats.last_chapter_at if stats else None,
+        )
+        for novel, stats in rows
+    ]
+    return NovelPage(items=items, next_cursor=next_cursor)
 
 @router.get("/{novel_id}", response_model=NovelRead)
 def get_novel_endpoint(novel_id: int, db: Session = Depends(get_db)):
@@ -22,3 +53,80 @@ def get_novel_endpoint(novel_id: int, db: Session = Depends(get_db)):
     if not novel:
         raise HTTPException(status_code=404, detail="Novel not found")
     return novel
+
+@router.get(
+    "/{novel_id}/chapters/{chapter_number}",
+    response_model=ChapterRead,
+    responses={304: {"description": "Not modified (If-None-Match matched)"}},
+)
+def read_chapter_endpoint(
+    novel_id: int,
+    chapter_number: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    key = (novel_id, chapter_number)
+    # the chapter may have been rewritten by another process (re-extract CLI)
+    entry = chapter_cache.get(key, lambda: novel_version(db, novel_id))
+    if entry is None:
+        version = chapter_cache.version(novel_id)  # read before the chapter is
+        chapter = get_chapter_by_number(db, novel_id, chapter_number)
+        if not chapter:
+            raise HTTPException(status_code=404, detail="Chapter not found")
+        entry = CachedChapter(ChapterRead(
+            novel_id=chapter.novel_id,
+            chapter_number=chapter.chapter_number,
+            title=chapter.title,
+            content=chapter.content,
+            source_url=chapter.source_url,
+        ).model_dump(), version=version)
+        chapter_cache.put(key, entry)
+
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": entry.gzip_etag if use_gzip else entry.etag,
+        "Cache-Control": "public, max-age=300",
+        "Vary": "Accept-Encoding",
+    }
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+@router.get(
+    "/{novel_id}/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {MEDIA_TYPES["epub"]: {}, MEDIA_TYPES["txt"]: {}}}},
+)
+def export_novel_endpoint(
+    novel_id: int,
+    format: Literal["epub", "txt"] = "epub",
+    db: Session = Depends(get_db),
+):
+    novel = get_novel(db, novel_id)
+    if not novel:
+        raise HTTPException(status_code=404, detail="Novel not found")
+    revision = export_revision(db, novel)
+    filename = quote(f"{novel.title}.{format}")
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{filename}",
+        "ETag": f'"{revision}"',
+    }
+
+    path = cached_export(novel_id, format, revision)
+    if path is not None:
+        EXPORTS.inc(format, "cache")
+        return FileResponse(path, media_type=MEDIA_TYPES[format], headers=headers)
+
+    def body():
+        # the request's session is closed before the response streams
+        stream_db = SessionLocal()
+        try:
+            stream_novel = get_novel(stream_db, novel_id)
+            yield from stream_export(stream_db, stream_novel, format, revision)
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format], headers=headers)
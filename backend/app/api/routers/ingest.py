@@ -1,10 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+import logging
 import os
 
-from app.db.session import get_db
-from app.services.novel_ingestor import get_ingestor
-from app.schemas.ingest import IngestRequest, IngestResponse
+from app.db.deps import get_db
+
+from app.services.html_parser import parse_stats
+from app.services.http_client import get_http_client
+from app.services.ingest_jobs import job_manager
+from app.services.ingest_worker import enqueue_novel, queue_stats
+from app.schemas.ingest import (
+    BulkIngestRequest,
+    BulkIngestResponse,
+    IngestJobResponse,
+    IngestJobStatus,
+    IngestQueueStats,
+    IngestRequest,
+    QueuedIngestResponse,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/ingest",
@@ -12,33 +27,130 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/", response_model=IngestResponse, summary="Ingest a novel by URL")
-def ingest_novel(request: IngestRequest, db: Session = Depends(get_db)):
-    print("🚀 Ingestion route triggered")
+@router.post(
+    "/",
+    response_model=IngestJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue a novel for ingestion by URL",
+)
+def ingest_novel(request: IngestRequest):
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_role_key:
+        logger.error("Missing Supabase service role key")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Missing Supabase service role key",
+        )
+
+    job = job_manager.submit(
+        url=str(request.url),
+        service_role_key=service_role_key,
+        limit=request.limit,
+        concurrency=request.concurrency,
+        update=request.update,
+    )
+
+    return IngestJobResponse(job_id=job.id, status=job.status)
+
+
+@router.post(
+    "/async",
+    response_model=IngestJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue a novel for ingestion on the async (httpx + AsyncSession) path",
+)
+async def ingest_novel_async(request: IngestRequest):
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_role_key:
+        logger.error("Missing Supabase service role key")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Missing Supabase service role key",
+        )
+
+    job = job_manager.submit_async(
+        url=str(request.url),
+        service_role_key=service_role_key,
+        limit=request.limit,
+        concurrency=request.concurrency,
+        update=request.update,
+    )
+
+    return IngestJobResponse(job_id=job.id, status=job.status)
+
 
+@router.post(
+    "/bulk",
+    response_model=BulkIngestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue many novels at once, fetching their chapters fairly across domains",
+)
+def ingest_bulk(request: BulkIngestRequest):
     service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     if not service_role_key:
-        print("❌ Missing Supabase service role key")
+        logger.error("Missing Supabase service role key")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Missing Supabase service role key",
         )
 
-    print(f"🔗 Ingesting URL: {request.url} | Limit: {request.limit}")
-    ingestor = get_ingestor(
-        db=db,
+    jobs = job_manager.submit_bulk(
+        urls=[str(u) for u in request.urls],
         service_role_key=service_role_key,
-        url=request.url,
+        limit=request.limit,
+        update=request.update,
+    )
+
+    return BulkIngestResponse(
+        jobs=[IngestJobResponse(job_id=job.id, status=job.status) for job in jobs]
     )
 
-    result = ingestor.ingest_novel(url=request.url, limit=request.limit)
 
-    if result.get("status") == "error":
-        print(f"⚠️ Ingestion failed: {result.get('message')}")
+@router.post(
+    "/queue",
+    response_model=QueuedIngestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue a novel's chapters for the standalone ingest workers",
+)
+def ingest_novel_queued(request: IngestRequest, db: Session = Depends(get_db)):
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_role_key:
+        logger.error("Missing Supabase service role key")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result.get("message", "Unknown ingestion error"),
+            detail="Missing Supabase service role key",
+        )
+
+    # the listing page is fetched here; the chapters by whichever workers run
+    try:
+        result = enqueue_novel(
+            db, request.url, service_role_key, limit=request.limit, update=request.update
         )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"enqueue failed for {request.url}: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Could not queue novel: {e}")
+    return QueuedIngestResponse(**result)
+
+
+@router.get("/queue", response_model=IngestQueueStats, summary="Shared ingest queue and its workers")
+def ingest_queue_stats(db: Session = Depends(get_db)):
+    return queue_stats(db)
+
+
+@router.get("/http-stats", summary="Connection reuse per source host")
+def http_stats():
+    return get_http_client().stats()
+
+
+@router.get("/parse-stats", summary="HTML parse time per parser backend")
+def html_parse_stats():
+    return parse_stats.snapshot()
+
 
-    print(f"✅ Ingestion successful: {result.get('inserted_count', 'N/A')} chapters")
-    return IngestResponse(**result)
\ No newline at end of file
+@router.get("/{job_id}", response_model=IngestJobStatus, summary="Ingest job progress")
+def ingest_job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return IngestJobStatus(**job.snapshot())
@@ -0,0 +1,31 @@
+# backend/app/api/routers/search.py
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.db.deps import get_db
+from app.schemas.search import SearchHit, SearchResponse
+from app.services.search_index import is_available, search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/", response_model=SearchResponse)
+def search_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: Literal["chapters", "novels"] = "chapters",
+    page: int = Query(1, ge=1, le=500),
+    page_size: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    if not is_available(db):
+        raise HTTPException(status_code=503, detail="Search index not available")
+    hits, has_more = search(db, q, scope=scope, page=page, page_size=page_size)
+    return SearchResponse(
+        query=q,
+        scope=scope,
+        page=page,
+        page_size=page_size,
+        has_more=has_more,
+        results=[SearchHit(**h) for h in hits],
+    )
@@ -0,0 +1,59 @@
+# backend/app/db/async_session.py
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.engine import (
+    POOL_SIZES,
+    apply_sqlite_pragmas,
+    instrument_pool,
+    is_sqlite,
+    sqlite_in_memory,
+)
+from app.db.session import DATABASE_URL
+
+# Same database as app.db.session, reached through an asyncio driver
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    base = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(base, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+
+def _async_engine_options(url: str) -> dict:
+    # async ingest jobs get the ingest pool sizes; aiosqlite keeps its
+    # default pool, the pragmas below do the SQLite tuning
+    if is_sqlite(url):
+        return {}
+    pool_size, max_overflow = POOL_SIZES["ingest"]
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": True}
+
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    apply_sqlite_pragmas(async_engine.sync_engine, in_memory=sqlite_in_memory(DATABASE_URL))
+instrument_pool(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_async_db():
+    """
+    Async counterpart of app.db.session.get_db for `async def` routes.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
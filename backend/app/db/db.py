@@ -1,18 +1,12 @@
-# backend/app/db.py
-
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-# Load DATABASE_URL from root .env
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
+# backend/app/db/db.py
+# Kept for old imports: the engine, sessions and Base all come from
+# app.db.session (engine profiles in app.db.engine).
+
+from app.db.session import (  # noqa: F401
+    DATABASE_URL,
+    Base,
+    IngestSessionLocal,
+    SessionLocal,
+    engine,
+    ingest_engine,
 )
-
-Base = declarative_base()
@@ -0,0 +1,228 @@
+# backend/app/db/engine.py
+"""
+Engine profiles: one place that decides how the app talks to its database.
+
+Two engines share DATABASE_URL:
+
+* `engine` serves the API (request-scoped sessions, mostly reads);
+* `ingest_engine` serves ingest jobs, bulk ingest and scripts (long-lived
+  sessions, batch writes).
+
+SQLite profile: every connection is switched to WAL (readers never block the
+writer and commits only append to the log), synchronous=NORMAL, a memory map
+and a larger page cache, and a busy_timeout so a writer waits for the lock
+instead of failing with "database is locked". SQLite still allows only one
+writer at a time, so ingest batch writes also go through `writer_queue`, a
+FIFO slot that hands the write lock to waiting workers in arrival order
+rather than leaving them to poll the busy handler.
+
+Postgres (and other server databases) profile: a QueuePool per engine, sized
+separately (DB_API_POOL_SIZE / DB_INGEST_POOL_SIZE plus overflow), with
+pre-ping and recycling so idle connections dropped by the server are
+replaced transparently.
+
+Both profiles export pool usage (mtlhub_db_pool_*) from pool events.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Deque, Iterator, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.services.metrics import (
+    DB_POOL_CAPACITY,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OPEN,
+    DB_WRITE_QUEUE,
+    DB_WRITE_WAIT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "sqlite:///./test.db",  # fallback for local dev
+)
+
+SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "30"))
+SQLITE_MMAP_SIZE = int(os.getenv("DB_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("DB_SQLITE_CACHE_KB", "65536"))
+
+POOL_SIZES = {
+    "api": (int(os.getenv("DB_API_POOL_SIZE", "10")), int(os.getenv("DB_API_MAX_OVERFLOW", "10"))),
+    "ingest": (int(os.getenv("DB_INGEST_POOL_SIZE", "8")), int(os.getenv("DB_INGEST_MAX_OVERFLOW", "4"))),
+}
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def is_sqlite(url: str) -> bool:
+    return url.split(":", 1)[0].split("+", 1)[0] == "sqlite"
+
+
+def sqlite_in_memory(url: str) -> bool:
+    path = url.split("://", 1)[1].lstrip("/") if "://" in url else ""
+    return path in ("", ":memory:") or "mode=memory" in url
+
+
+def sqlite_pragmas(in_memory: bool = False) -> dict:
+    """PRAGMAs run on every new SQLite connection."""
+    pragmas = {
+        "busy_timeout": int(SQLITE_BUSY_TIMEOUT * 1000),
+        "cache_size": -SQLITE_CACHE_KB,  # negative: KiB rather than pages
+        "temp_store": "MEMORY",
+    }
+    if not in_memory:
+        pragmas.update({
+            "journal_mode": "WAL",
+            # WAL + NORMAL: a commit is durable once the OS has it; only a
+            # power loss can roll back the last transactions, never corrupt
+            "synchronous": "NORMAL",
+            "mmap_size": SQLITE_MMAP_SIZE,
+        })
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine: Engine, in_memory: bool = False) -> None:
+    """Run `sqlite_pragmas()` on each connection `engine` opens. Works for
+    sync engines and for `AsyncEngine.sync_engine`."""
+    pragmas = sqlite_pragmas(in_memory)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """Publish checked-out / open connection counts for `engine`'s pool."""
+    if isinstance(engine.pool, QueuePool):
+        pool_size, max_overflow = POOL_SIZES.get(name, (engine.pool.size(), 0))
+        DB_POOL_CAPACITY.set(name, value=pool_size + max(0, max_overflow))
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_OPEN.inc(name)
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        DB_POOL_OPEN.dec(name)
+
+    @event.listens_for(engine, "close_detached")
+    def _on_close_detached(dbapi_connection):
+        DB_POOL_OPEN.dec(name)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc(name)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec(name)
+
+
+def engine_options(url: str, role: str) -> dict:
+    """create_engine() keyword arguments for `url` under the `role` profile."""
+    pool_size, max_overflow = POOL_SIZES[role]
+    if is_sqlite(url):
+        options = {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}}
+        if not sqlite_in_memory(url):
+            # SQLite connections are cheap but their page cache and mmap are
+            # per connection, so keep a pool instead of reopening the file
+            options.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow)
+        return options
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def build_engine(url: str = DATABASE_URL, role: str = "api") -> Engine:
+    """A sync engine for `url` using the `role` ("api" or "ingest") profile."""
+    engine = create_engine(url, **engine_options(url, role))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(engine, in_memory=sqlite_in_memory(url))
+    instrument_pool(engine, role)
+    logger.debug(f"[db] {role} engine: {engine.dialect.name}, pool={engine.pool.status()}")
+    return engine
+
+
+class WriterQueue:
+    """
+    FIFO write slot for SQLite.
+
+    SQLite serializes writers anyway; queueing them here means a waiting
+    ingest worker gets the lock in arrival order and sleeps on a condition
+    instead of spinning in SQLite's busy handler. Re-entrant per thread, so
+    a writer that retries row by row inside its batch keeps the slot.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiting: Deque[int] = deque()
+        self._owner: Optional[int] = None
+        self._depth = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+            else:
+                start = time.perf_counter()
+                self._waiting.append(me)
+                DB_WRITE_QUEUE.inc()
+                try:
+                    while self._owner is not None or self._waiting[0] != me:
+                        self._cond.wait()
+                finally:
+                    self._waiting.remove(me)
+                    DB_WRITE_QUEUE.dec()
+                    # the next in line may have been waiting behind us
+                    self._cond.notify_all()
+                self._owner, self._depth = me, 1
+                DB_WRITE_WAIT_SECONDS.observe(value=time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    self._cond.notify_all()
+
+
+writer_queue = WriterQueue()
+
+
+def serialized_write(db):
+    """
+    Context for one write transaction on session `db`: the SQLite write slot
+    for sync SQLite sessions, a no-op otherwise (Postgres handles concurrent
+    writers itself; async sessions must not block the event loop on a lock
+    and rely on busy_timeout instead).
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "sqlite" or getattr(dialect, "is_async", False):
+        return nullcontext()
+    return writer_queue.slot()
+
+
+engine = build_engine(DATABASE_URL, "api")
+# an in-memory SQLite database exists once per engine, so share it
+ingest_engine = engine if sqlite_in_memory(DATABASE_URL) else build_engine(DATABASE_URL, "ingest")
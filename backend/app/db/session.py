@@ -1,31 +1,23 @@
-import os
-
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# Replace with your real database URL or env var
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "sqlite:///./test.db",  # fallback for local dev
-)
-
-# Create the SQLAlchemy engine
-# For SQLite, enable check_same_thread; remove connect_args for Postgres/MySQL
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-    if DATABASE_URL.startswith("sqlite")
-    else {},
-)
+# Engines (and their SQLite / Postgres tuning) live in app.db.engine
+from app.db.engine import DATABASE_URL, engine, ingest_engine
 
-# Each instance of SessionLocal will be a database session
+# Each instance of SessionLocal will be a database session (API side)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
 )
 
+# Sessions for ingest jobs, bulk ingest and scripts, on their own pool
+IngestSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=ingest_engine,
+)
+
 # Base class for all your ORM models
 Base = declarative_base()
 
@@ -1,9 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.routers.chapters import router as chapters_router
 from app.api.routers.ingest import router as ingest_router
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.search import router as search_router
 
 # NEW imports
 from app.db.session import engine, Base
+from app.models import novel as _novel_models  # noqa: F401 (registers tables on Base)
+from app.services.content_store import ensure_content_schema
+from app.services.novel_stats import ensure_novel_stats
+from app.services.search_index import ensure_search_index
 
 app = FastAPI(
     title="MTLHub API",
@@ -19,8 +26,14 @@ app.add_middleware(
 )
 
 app.include_router(ingest_router, prefix="/api")
+app.include_router(chapters_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(metrics_router)
 
 
 @app.on_event("startup")
 def on_startup_create_tables():
     Base.metadata.create_all(bind=engine)
+    ensure_content_schema(engine)
+    ensure_search_index(engine)
+    ensure_novel_stats(engine)
@@ -1,15 +1,5 @@
 # backend/app/models/chapter.py
 
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from app.db.session import Base
-
-class Chapter(Base):
-    __tablename__ = "chapters"
-    __table_args__ = {"extend_existing": True}
-
-    id = Column(Integer, primary_key=True, index=True)
-    novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False)
-    chapter_number = Column(Integer, nullable=False)
-    title = Column(String(255), nullable=False)
-    original_content = Column(Text, nullable=True)
-    source_url = Column(String(500), nullable=True)
+# The chapters table is mapped once, next to Novel and ChapterBody; this module
+# re-exports it for code that imports from app.models.chapter.
+from app.models.novel import Chapter, ChapterBody  # noqa: F401
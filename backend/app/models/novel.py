@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, LargeBinary, String, Text, ForeignKey, event
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.session import Base  # now available
 
 class Novel(Base):
     __tablename__ = "novels"
+    __table_args__ = (
+        # keyset pages of the catalog, filtered (see services.novel_service)
+        Index("ix_novels_author_id", "author", "id"),
+        Index("ix_novels_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -12,11 +17,43 @@ class Novel(Base):
     cover_url = Column(String, nullable=True)
     source_url = Column(String, unique=True, index=True)
     total_chapters = Column(Integer, default=0)
+    description = Column(Text, nullable=True)
+    status = Column(String(16), nullable=True)  # "ongoing" / "completed"
 
     # Relationship to chapters
     chapters = relationship("Chapter", back_populates="novel")
 
 
+class NovelStats(Base):
+    """Aggregates over a novel's stored chapters, kept current by whatever
+    writes chapters (see services.novel_stats), so the catalog never counts."""
+
+    __tablename__ = "novel_stats"
+
+    novel_id = Column(Integer, ForeignKey("novels.id"), primary_key=True)
+    chapter_count = Column(Integer, nullable=False, default=0)
+    total_chars = Column(BigInteger, nullable=False, default=0)
+    last_chapter_at = Column(Float, nullable=True)  # unix time of the last chapter write
+
+
+@event.listens_for(Novel, "after_insert")
+def _create_novel_stats(mapper, connection, novel):
+    # every novel gets its stats row in the flush that creates it
+    connection.execute(
+        NovelStats.__table__.insert().values(novel_id=novel.id, chapter_count=0, total_chars=0)
+    )
+
+
+class ChapterBody(Base):
+    """Compressed chapter text, shared by every chapter with identical content."""
+
+    __tablename__ = "chapter_bodies"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of the UTF-8 text
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = deferred(Column(LargeBinary, nullable=False))  # zlib
+
+
 class Chapter(Base):
     __tablename__ = "chapters"
 
@@ -24,8 +61,93 @@ class Chapter(Base):
     novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False, index=True)
     chapter_number = Column(Integer, default=0, index=True)
     title = Column(String, nullable=True)
-    original_content = Column(Text, nullable=False)
+    # Legacy uncompressed text; new chapters store theirs in chapter_bodies.
+    # Both are deferred so listings and TOC queries never load chapter text.
+    original_content = deferred(Column(Text, nullable=True))
+    content_hash = Column(String(64), ForeignKey("chapter_bodies.hash"), nullable=True, index=True)
     source_url = Column(String, unique=True, index=True)
 
     # Back‐reference to novel
     novel = relationship("Novel", back_populates="chapters")
+    body = relationship("ChapterBody")
+
+    @property
+    def content(self) -> str:
+        """Chapter text, decompressed on access."""
+        if self.content_hash is not None and self.body is not None:
+            from app.services.content_store import decompress_text
+            return decompress_text(self.body.data)
+        return self.original_content or ""
+
+
+class ChapterFingerprint(Base):
+    """Simhash of a stored chapter's body, for junk / near-duplicate screening."""
+
+    __tablename__ = "chapter_fingerprints"
+
+    chapter_id = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False, index=True)
+    simhash = Column(BigInteger, nullable=False)  # 64-bit, stored signed
+    # "junk" / "duplicate" when stored under the "flag" policy
+    flag = Column(String(16), nullable=True, index=True)
+
+
+class JunkTemplate(Base):
+    """Fingerprint of a placeholder / ad page, shared by every worker."""
+
+    __tablename__ = "junk_templates"
+
+    simhash = Column(BigInteger, primary_key=True)
+    label = Column(String(64), nullable=False)
+
+
+class TranslationMemory(Base):
+    """One translated segment, keyed by the hash of its normalized source text
+    and language pair, so a repeated line is only ever translated once."""
+
+    __tablename__ = "translation_memory"
+
+    key = Column(String(64), primary_key=True)  # sha256, see translation.segment_key
+    source_lang = Column(String(8), nullable=False)
+    target_lang = Column(String(8), nullable=False)
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    backend = Column(String(32), nullable=False)
+
+
+class ChapterTranslation(Base):
+    """Machine translation of a chapter; the text lives in chapter_bodies."""
+
+    __tablename__ = "chapter_translations"
+
+    chapter_id = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    lang = Column(String(8), primary_key=True)
+    title = Column(String, nullable=True)
+    content_hash = Column(String(64), ForeignKey("chapter_bodies.hash"), nullable=False, index=True)
+    backend = Column(String(32), nullable=False)
+
+
+class CrawlFrontier(Base):
+    """One chapter URL an ingest has planned, and how far it got; lets an
+    interrupted ingest resume (see services.crawl_frontier)."""
+
+    __tablename__ = "crawl_frontier"
+    __table_args__ = (
+        Index("ix_crawl_frontier_novel_state", "novel_id", "state"),
+        # ingest workers claim by state and reclaim by lease expiry
+        Index("ix_crawl_frontier_state_lease", "state", "lease_expires"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    novel_id = Column(Integer, ForeignKey("novels.id"), nullable=False)
+    chapter_number = Column(Integer, nullable=False)
+    url = Column(String, unique=True, nullable=False)
+    # pending / queued / in_flight / done / failed
+    state = Column(String(16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(255), nullable=True)
+    updated_at = Column(Float, nullable=True)  # unix time
+    # set while an ingest worker holds the chapter (see services.ingest_worker)
+    lease_owner = Column(String(64), nullable=True)
+    lease_token = Column(String(32), nullable=True, index=True)
+    lease_expires = Column(Float, nullable=True)  # unix time
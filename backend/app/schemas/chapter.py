@@ -17,3 +17,11 @@ class ChapterOut(ChapterBase):
 
     class Config:
         orm_mode = True
+
+class ChapterRead(BaseModel):
+    """Body of GET /novels/{novel_id}/chapters/{chapter_number}."""
+    novel_id: int
+    chapter_number: int
+    title: str | None = None
+    content: str
+    source_url: str | None = None
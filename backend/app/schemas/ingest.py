@@ -1,14 +1,68 @@
-from typing import Optional
-from pydantic import BaseModel, HttpUrl
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, HttpUrl
 
 class IngestRequest(BaseModel):
     url: HttpUrl
     # Optional limit on number of chapters (None = unlimited/default)
     limit: Optional[int] = None
+    # Parallel chapter fetches for this ingest (None = INGEST_CONCURRENCY).
+    # Requests to one host are additionally capped by INGEST_PER_HOST_LIMIT.
+    concurrency: Optional[int] = Field(default=None, ge=1, le=32)
+    # Re-ingest an already stored novel, fetching only chapters not yet stored
+    update: bool = False
+
+
+class BulkIngestRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=500)
+    # Per-novel chapter limit, as in IngestRequest
+    limit: Optional[int] = None
+    update: bool = False
 
 
 class IngestResponse(BaseModel):
     status: str
     novel_id: int
     chapters_ingested: int
+    chapters_failed: int = 0
+    message: Optional[str] = None
+
+
+class QueuedIngestResponse(BaseModel):
+    # "queued", or "exists" / "warning" as for a direct ingest
+    status: str
+    novel_id: Optional[int] = None
+    chapters_queued: int = 0
+
+
+class IngestQueueStats(BaseModel):
+    # crawl_frontier rows per state (queued / in_flight / done / failed ...)
+    states: Dict[str, int]
+    # worker id -> chapters it holds leases on
+    workers: Dict[str, int]
+    expired_leases: int
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class BulkIngestResponse(BaseModel):
+    jobs: List[IngestJobResponse]
+
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    url: str
+    status: str
+    novel_id: Optional[int] = None
+    chapters_done: int
+    chapters_failed: int
+    # kept out by the junk / duplicate screen
+    chapters_skipped: int = 0
+    # From the listing page's "共 N 章" (falls back to the number of links found)
+    chapters_total: int
+    elapsed_seconds: float
+    chapters_per_second: float
+    errors: List[str] = []
     message: Optional[str] = None
@@ -1,20 +1,34 @@
-# backend/app/schemas/novel.py
-
-from pydantic import BaseModel
-
-class NovelBase(BaseModel):
-    title: str
-    author: str | None = None
-    cover_url: str | None = None
-    source_url: str
-    total_chapters: int = 0
-
-class NovelCreate(NovelBase):
-    pass
-
-class NovelRead(NovelBase):
-    id: int
-
-    class Config:
-        orm_mode = True
-
+# backend/app/schemas/novel.py
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+class NovelBase(BaseModel):
+    title: str
+    author: str | None = None
+    cover_url: str | None = None
+    source_url: str
+    total_chapters: int = 0
+
+class NovelCreate(NovelBase):
+    pass
+
+class NovelRead(NovelBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class NovelSummary(NovelRead):
+    """One catalog entry: the novel plus its novel_stats aggregates."""
+    status: str | None = None
+    # chapters actually stored (total_chapters is what the source listed)
+    chapter_count: int = 0
+    total_chars: int = 0
+    updated_at: datetime | None = None
+
+class NovelPage(BaseModel):
+    items: list[NovelSummary]
+    # pass as `before` for the next page; None on the last page
+    next_cursor: int | None = None
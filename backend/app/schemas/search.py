@@ -0,0 +1,22 @@
+# backend/app/schemas/search.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+class SearchHit(BaseModel):
+    novel_id: int
+    title: Optional[str] = None
+    score: float
+    # chapter hits
+    chapter_number: Optional[int] = None
+    novel_title: Optional[str] = None
+    # novel hits
+    author: Optional[str] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    scope: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: List[SearchHit]
@@ -0,0 +1,69 @@
+# app/scripts/bulk_ingest.py
+#
+# Ingest many novels in one run. Chapter fetches from all of them share one
+# fair scheduler, so a long novel can't starve the short ones and each
+# domain stays within INGEST_PER_HOST_LIMIT.
+#
+#   python -m app.scripts.bulk_ingest URL [URL ...] [--file urls.txt]
+#                                     [--limit N] [--update] [--workers N]
+#                                     [--replay]
+
+import argparse
+import logging
+import os
+import time
+from contextlib import nullcontext
+
+from app.services.bulk_ingest import BulkIngest
+from app.services.page_archive import replay
+
+
+def _read_urls(path: str):
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest several novels concurrently")
+    parser.add_argument("urls", nargs="*", help="novel listing URLs")
+    parser.add_argument("--file", help="file with one URL per line")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="max chapters per novel")
+    parser.add_argument("--update", action="store_true",
+                        help="fetch missing chapters of novels already stored")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="fetch threads (default INGEST_BULK_WORKERS)")
+    parser.add_argument("--replay", action="store_true",
+                        help="read pages from the page archive instead of the network")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.file:
+        urls.extend(_read_urls(args.file))
+    if not urls:
+        parser.error("no URLs given")
+
+    logging.basicConfig(level=logging.INFO)
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+
+    def on_result(url: str, result: dict) -> None:
+        print(f"  {result.get('status'):>8} novel {result.get('novel_id')}: "
+              f"{result.get('chapters_ingested', 0)} chapters"
+              f" ({result.get('chapters_failed', 0)} failed)  {url}")
+
+    print(f"📚 Ingesting {len(urls)} novels")
+    start = time.perf_counter()
+    with replay() if args.replay else nullcontext():
+        results = BulkIngest(service_role_key, workers=args.workers, on_result=on_result).run(
+            urls, limit=args.limit, update=args.update
+        )
+    total = sum(r.get("chapters_ingested", 0) for r in results.values())
+    elapsed = time.perf_counter() - start
+    print(f"✅ Done, {total} chapters in {elapsed:.1f}s ({total / elapsed:.1f} ch/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# app/scripts/ingest_worker.py
+#
+# Standalone ingest worker: claims queued chapter fetches from the shared
+# database and stores them. Start as many as you like, on any node that can
+# reach DATABASE_URL; each leases its own chapters (see
+# app.services.ingest_worker).
+#
+#   python -m app.scripts.ingest_worker [--concurrency N] [--batch N] [--drain]
+#   python -m app.scripts.ingest_worker --enqueue URL [URL ...] [--limit N] [--update]
+#   python -m app.scripts.ingest_worker --stats
+
+import argparse
+import logging
+import os
+import signal
+
+from app.db.session import IngestSessionLocal
+from app.services.ingest_worker import LEASE_SECONDS, IngestWorker, enqueue_novel, queue_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue(urls, limit, update, service_role_key):
+    db = IngestSessionLocal()
+    try:
+        for url in urls:
+            try:
+                result = enqueue_novel(db, url, service_role_key, limit=limit, update=update)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"enqueue failed for {url}: {e}")
+                continue
+            print(f"  {result.get('status'):>8} novel {result.get('novel_id')}: "
+                  f"{result.get('chapters_queued', 0)} chapters queued  {url}")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch queued chapters from the shared ingest queue")
+    parser.add_argument("--enqueue", nargs="+", metavar="URL",
+                        help="queue these novels for the workers and exit")
+    parser.add_argument("--limit", type=int, default=None, help="max chapters per queued novel")
+    parser.add_argument("--update", action="store_true",
+                        help="queue the missing chapters of novels already stored")
+    parser.add_argument("--stats", action="store_true", help="print the queue state and exit")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="parallel fetches (default WORKER_CONCURRENCY)")
+    parser.add_argument("--batch", type=int, default=None,
+                        help="chapters claimed at a time (default 2 x concurrency)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+
+    if args.enqueue:
+        _enqueue(args.enqueue, args.limit, args.update, service_role_key)
+        return
+    if args.stats:
+        db = IngestSessionLocal()
+        try:
+            print(queue_stats(db))
+        finally:
+            db.close()
+        return
+
+    worker = IngestWorker(
+        service_role_key, concurrency=args.concurrency, batch=args.batch, lease_seconds=args.lease
+    )
+    # finish the batch in hand; its leases would otherwise have to expire first
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+    print(f"🛠️ Worker {worker.worker_id} started")
+    result = worker.run(drain=args.drain)
+    print(f"✅ Stopped, {result['done']} chapters stored, {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,13 @@
 from app.db.session import engine, Base
 from app.models.novel import Novel
 from app.models.chapter import Chapter
+from app.services.content_store import ensure_content_schema
+from app.services.novel_stats import ensure_novel_stats
+from app.services.search_index import ensure_search_index
 
 print("🔧 Creating tables in local SQLite DB...")
 Base.metadata.create_all(bind=engine, checkfirst=True)
+ensure_content_schema(engine)
+ensure_search_index(engine)
+ensure_novel_stats(engine)
 print("✅ Tables created successfully.")
\ No newline at end of file
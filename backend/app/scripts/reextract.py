@@ -0,0 +1,76 @@
+# app/scripts/reextract.py
+#
+# Re-run extraction for stored novels from the raw page archive, without
+# touching the network: use after fixing a parser to apply the fix to the
+# whole library.
+#
+#   python -m app.scripts.reextract [NOVEL_ID ...] [--as-of 2026-10-01T00:00]
+#                                   [--concurrency N]
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from app.db.session import IngestSessionLocal
+from app.models.novel import Novel
+from app.services.page_archive import replay
+from app.services.reextract import reextract_novel
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: str) -> float:
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract stored novels from archived pages")
+    parser.add_argument("novel_ids", nargs="*", type=int, help="novels to redo (default: all)")
+    parser.add_argument("--as-of", type=_timestamp, default=None,
+                        help="use the captures from before this time (ISO 8601, UTC)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="archive read threads per novel")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+
+    db = IngestSessionLocal()
+    try:
+        query = db.query(Novel).order_by(Novel.id)
+        if args.novel_ids:
+            query = query.filter(Novel.id.in_(args.novel_ids))
+        novels = query.all()
+        print(f"♻️  Re-extracting {len(novels)} novels")
+
+        start = time.perf_counter()
+        checked = rewritten = 0
+        with replay(as_of=args.as_of):
+            for novel in novels:
+                try:
+                    result = reextract_novel(db, novel, service_role_key, args.concurrency)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"re-extract failed for novel_id={novel.id}: {e}")
+                    continue
+                checked += result["chapters_checked"]
+                rewritten += result["chapters_rewritten"]
+                if result["metadata_changed"] or result["chapters_rewritten"]:
+                    print(f"  ~ novel {novel.id}: {result['chapters_rewritten']} chapters rewritten"
+                          f", metadata: {', '.join(result['metadata_changed']) or 'unchanged'}")
+                if result["chapters_failed"]:
+                    print(f"  ! novel {novel.id}: {result['chapters_failed']} pages not in the archive")
+        elapsed = time.perf_counter() - start
+        print(f"✅ Done, {rewritten} of {checked} chapters rewritten in {elapsed:.1f}s"
+              f" ({checked / elapsed if elapsed else 0:.1f} ch/s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
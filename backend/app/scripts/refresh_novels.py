@@ -0,0 +1,63 @@
+# app/scripts/refresh_novels.py
+#
+# Daily refresh for serialized novels: re-reads each listing page and fetches
+# only the chapters that aren't stored yet.
+#
+#   python -m app.scripts.refresh_novels [--all] [--concurrency N]
+
+import argparse
+import logging
+import os
+
+from app.db.session import IngestSessionLocal
+from app.models.novel import Novel
+from app.services.novel_ingestor import get_ingestor
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick up new chapters for stored novels")
+    parser.add_argument("--all", action="store_true",
+                        help="refresh finished (已完結) novels too")
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+
+    db = IngestSessionLocal()
+    try:
+        query = db.query(Novel.id, Novel.source_url)
+        if not args.all:
+            query = query.filter(Novel.status == "ongoing")
+        targets = query.order_by(Novel.id).all()
+        print(f"🔄 Refreshing {len(targets)} novels")
+
+        total_new = 0
+        for novel_id, source_url in targets:
+            ingestor = get_ingestor(
+                db=db,
+                service_role_key=service_role_key,
+                url=source_url,
+                concurrency=args.concurrency,
+            )
+            try:
+                result = ingestor.ingest_novel(url=source_url, update=True)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"refresh failed for novel_id={novel_id}: {e}")
+                continue
+            new = result.get("chapters_ingested", 0)
+            total_new += new
+            if new:
+                print(f"  + novel {novel_id}: {new} new chapters")
+            if result.get("chapters_failed"):
+                print(f"  ! novel {novel_id}: {result['chapters_failed']} chapters failed")
+        print(f"✅ Done, {total_new} new chapters")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# app/scripts/translate.py
+#
+# Machine-translate stored chapters that have no translation into the target
+# language yet, through the segment translation memory.
+#
+#   python -m app.scripts.translate [NOVEL_ID ...] [--lang en] [--backend stub]
+
+import argparse
+import logging
+
+from app.db.session import IngestSessionLocal
+from app.models.novel import Novel
+from app.services.translation import get_backend, translate_novel
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translate stored chapters")
+    parser.add_argument("novel_ids", nargs="*", type=int, help="novels to translate (default: all)")
+    parser.add_argument("--lang", default="en", help="target language code")
+    parser.add_argument("--backend", default=None, help="translation backend (default: $TRANSLATION_BACKEND)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backend = get_backend(args.backend)
+
+    db = IngestSessionLocal()
+    try:
+        query = db.query(Novel.id).order_by(Novel.id)
+        if args.novel_ids:
+            query = query.filter(Novel.id.in_(args.novel_ids))
+        novel_ids = [novel_id for (novel_id,) in query]
+        print(f"🌐 Translating {len(novel_ids)} novels into {args.lang} with {backend.name}")
+
+        chapters = segments = reused = 0
+        seconds = 0.0
+        for novel_id in novel_ids:
+            try:
+                result = translate_novel(db, novel_id, args.lang, backend)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"translation failed for novel_id={novel_id}: {e}")
+                continue
+            chapters += result["chapters"]
+            segments += result["segments"]
+            reused += result["memory_hits"] + result["repeats"]
+            seconds += result["seconds"]
+        print(f"✅ Done, {chapters} chapters, {segments} segments"
+              f" ({reused / segments if segments else 0:.0%} from memory)"
+              f", {segments / seconds if seconds else 0:.1f} segments/s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
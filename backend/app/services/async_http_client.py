@@ -0,0 +1,151 @@
+"""
+Shared asyncio HTTP client for the async ingest path.
+
+One `httpx.AsyncClient` per host keeps a keep-alive pool sized from the same
+`DOMAIN_SETTINGS` as the threaded client, and a per-host semaphore applies
+INGEST_PER_HOST_LIMIT across every coroutine in the process. Waiting on a
+slot costs a suspended coroutine, not a thread, so thousands of fetches can
+be queued across many novels. Pacing, retries and circuit breaking share
+the per-host guards of the threaded client, so both paths back off together.
+Pages are archived like the threaded client's (see `page_archive`).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from .http_client import DEFAULT_HEADERS, settings_for
+from .metrics import HTTP_BYTES, HTTP_FETCH_SECONDS, HTTP_RETRIES
+from .novel_ingestor import PER_HOST_LIMIT
+from .page_archive import archive_response
+from .resilience import (
+    MAX_ATTEMPTS,
+    RETRYABLE_STATUS,
+    CircuitOpenError,
+    backoff_delay,
+    get_guard,
+    retry_after_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHttpClient:
+    def __init__(self, per_host_limit: int = PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _client_for(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None:
+            settings = settings_for(host)
+            client = self._clients[host] = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                limits=httpx.Limits(
+                    max_connections=settings.pool_size,
+                    max_keepalive_connections=settings.pool_size,
+                ),
+                timeout=httpx.Timeout(
+                    settings.read_timeout, connect=settings.connect_timeout
+                ),
+                follow_redirects=True,
+            )
+            self._limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return client
+
+    async def get(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        """Same retry / backoff / breaker rules as HttpClient.get."""
+        parts = urlparse(url)
+        host = parts.netloc.lower()
+        domain = parts.hostname or host
+        client = self._client_for(host)
+        guard = get_guard(host)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            last = attempt == MAX_ATTEMPTS
+            try:
+                wait = guard.acquire()
+            except CircuitOpenError as e:
+                if last:
+                    raise
+                HTTP_RETRIES.inc(domain)
+                logger.warning(f"[async-http] {e}; waiting before {url}")
+                await asyncio.sleep(e.retry_after)
+                continue
+
+            # see HttpClient.get: the guard may hold the half-open probe now
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                async with self._limits[host]:
+                    start = time.perf_counter()
+                    resp = await client.get(url, headers=headers)
+                    elapsed = time.perf_counter() - start
+            except httpx.TransportError as e:
+                guard.record_failure()
+                if last:
+                    raise
+                delay = backoff_delay(attempt)
+                HTTP_RETRIES.inc(domain)
+                logger.warning(f"[async-http] {url} failed ({e!r}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                # httpx.DecodingError, TooManyRedirects...
+                guard.record_failure()
+                raise
+            except BaseException:
+                # CancelledError: the fetcher was cancelled, the host did nothing wrong
+                guard.release()
+                raise
+            HTTP_FETCH_SECONDS.observe(domain, value=elapsed)
+            HTTP_BYTES.inc(domain, amount=len(resp.content))
+
+            if resp.status_code not in RETRYABLE_STATUS:
+                guard.record_success(elapsed)
+                # disk + index write: keep it off the event loop
+                await asyncio.to_thread(
+                    archive_response, url, resp.status_code, resp.headers, resp.content
+                )
+                return resp
+            guard.record_failure(throttled=resp.status_code == 429)
+            if last:
+                return resp
+            delay = backoff_delay(attempt, retry_after_seconds(resp.headers))
+            HTTP_RETRIES.inc(domain)
+            logger.warning(f"[async-http] {url} -> {resp.status_code}, retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return resp
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._limits.clear()
+
+
+_clients: Dict[int, AsyncHttpClient] = {}
+_override = None
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    """Client for the running event loop (httpx pools can't cross loops)."""
+    if _override is not None:
+        return _override
+    loop_id = id(asyncio.get_running_loop())
+    client = _clients.get(loop_id)
+    if client is None:
+        client = _clients[loop_id] = AsyncHttpClient()
+    return client
+
+
+def set_async_http_client(client):
+    """Serve every loop from `client` (None: back to per-loop clients);
+    returns the previous override."""
+    global _override
+    previous, _override = _override, client
+    return previous
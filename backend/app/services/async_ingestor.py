@@ -0,0 +1,263 @@
+"""
+Async-native ingest path.
+
+`AsyncNovelIngestor` mirrors the `NovelIngestor` interface with coroutine
+I/O: pages come from the shared `httpx` client and rows go through an
+`AsyncSession`. Site-specific parsing is not duplicated. Each async ingestor
+wraps the matching sync ingestor (`parser_class`) and calls its
+`extract_metadata` / `get_chapter_urls` / `parse_chapter` in a worker thread
+so the event loop never blocks on BeautifulSoup. Batches are persisted by the
+usual `ChapterWriter`: its CPU side (junk screen, compression, search
+tokens) runs in a worker thread too, and only the DB write goes through
+`AsyncSession.run_sync` on the loop.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+
+from pydantic import HttpUrl
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.novel import Chapter, Novel
+from .async_http_client import get_async_http_client
+from .chapter_writer import DEFAULT_BATCH_SIZE, ChapterWriter, PreparedChapter
+from .charset import decode_page
+from .crawl_frontier import FrontierTracker, seed_frontier, unfinished_chapters
+from .html_parser import parse_html
+from .ixdzs_ingestor import IxdzsIngestor
+from .novel_ingestor import NovelIngestor, ingest_result
+from .site_registry import ingestor_class_for
+from .search_index import index_novel
+
+logger = logging.getLogger(__name__)
+
+
+def get_async_ingestor(
+    db: AsyncSession,
+    service_role_key: str,
+    url: Union[str, HttpUrl],
+    concurrency: Optional[int] = None,
+    progress=None,
+):
+    """Async counterpart of novel_ingestor.get_ingestor."""
+    parser_class = ingestor_class_for(urlparse(str(url)).hostname or "") or NovelIngestor
+    return AsyncNovelIngestor(
+        db, service_role_key, concurrency=concurrency, progress=progress, parser_class=parser_class
+    )
+
+
+class AsyncNovelIngestor:
+    """Generic async ingestor; parsing comes from `parser_class`."""
+
+    parser_class = NovelIngestor
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        service_role_key: str,
+        concurrency: Optional[int] = None,
+        progress=None,
+        parser_class=None,
+    ):
+        self.db = db
+        self.service_role_key = service_role_key
+        # The sync ingestor never sees a session; it only parses and reports
+        self.parser = (parser_class or self.parser_class)(
+            None, service_role_key, concurrency=concurrency, progress=progress
+        )
+        self.accept_language = self.parser.accept_language
+        self.concurrency = self.parser.concurrency
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.written = 0  # chapters committed by the current ingest_novel
+
+    async def fetch_text(self, url: str) -> str:
+        try:
+            resp = await get_async_http_client().get(
+                url, headers={"Accept-Language": self.accept_language}
+            )
+            resp.raise_for_status()
+            return decode_page(
+                resp.content, str(resp.url), resp.headers.get("Content-Type"), self.parser.default_encoding
+            )
+        except Exception as e:
+            logger.error(f"[async] fetch failed for {url}: {e}")
+            raise
+
+    async def fetch_chapter_content(self, url: str) -> Tuple[str, str]:
+        html = await self.fetch_text(url)
+        return await asyncio.to_thread(self.parser.parse_chapter, html, url)
+
+    async def _fetch_chapter_safe(self, url: str) -> Tuple[str, str, Optional[str]]:
+        """(title, body, error), like NovelIngestor._fetch_chapter_limited."""
+        self.parser.report_fetching(url)
+        try:
+            title, body = await self.fetch_chapter_content(url)
+        except Exception as e:
+            logger.error(f"[async] chapter fetch failed for {url}: {e}")
+            return "", "", f"{type(e).__name__}: {e}"
+        if not body:
+            return title, "", "empty chapter body"
+        return title, body, None
+
+    async def known_chapter_urls(self, novel_id: int) -> Set[str]:
+        rows = await self.db.execute(
+            select(Chapter.source_url).where(Chapter.novel_id == novel_id)
+        )
+        return set(rows.scalars())
+
+    async def ingest_novel(
+        self, url: Union[str, HttpUrl], limit: Optional[int] = None, update: bool = False
+    ) -> dict:
+        """
+        Same steps and result dict as IxdzsIngestor.ingest_novel:
+        1) create (or, with update=True, refresh) the novel row
+        2) list chapter URLs, skipping stored ones, into the crawl frontier
+           (or resume the unfinished ones of an interrupted run)
+        3) fetch up to `concurrency` chapters at a time
+        4) write + commit them in batches
+        """
+        url_str = str(url)
+        logger.info(f"[async] ingest_novel start: {url_str} (update={update})")
+
+        # 1) listing page + metadata
+        html = await self.fetch_text(url_str)
+        soup = await asyncio.to_thread(parse_html, html)
+        meta = await asyncio.to_thread(self.parser.extract_metadata, soup, url_str)
+        self.parser.report_total(meta["total_chapters"])
+
+        result = await self.db.execute(
+            select(Novel).where(Novel.source_url == meta["source_url"])
+        )
+        novel = result.scalars().first()
+        known: Set[str] = set()
+        if novel and not update:
+            # an earlier run that stopped part-way left chapters in the frontier
+            todo = await self.db.run_sync(unfinished_chapters, novel.id)
+            if not todo:
+                return {"status": "exists", "novel_id": novel.id, "chapters_ingested": 0}
+            if limit:
+                todo = todo[:limit]
+            logger.info(f"[async] resuming novel_id={novel.id}: {len(todo)} chapters left")
+            novel_id = novel.id
+            self.parser.report_novel(novel_id)
+            self.parser.report_total(len(todo))
+        else:
+            if novel:
+                novel.total_chapters = meta["total_chapters"]
+                novel.description = meta.get("description")
+                novel.status = meta.get("status") or novel.status
+                known = await self.known_chapter_urls(novel.id)
+            else:
+                novel = Novel(**meta)
+                self.db.add(novel)
+                await self.db.flush()
+            novel_id = novel.id
+            self.parser.report_novel(novel_id)
+            await self.db.run_sync(
+                index_novel, novel_id, novel.title, novel.author, novel.description
+            )
+
+            # 2) chapter URLs, minus the ones already stored
+            chap_urls = await asyncio.to_thread(self.parser.get_chapter_urls, soup, url_str)
+            if not chap_urls:
+                await self.db.commit()
+                return {"status": "warning", "novel_id": novel_id, "chapters_ingested": 0}
+            if not meta["total_chapters"]:
+                novel.total_chapters = len(chap_urls)
+                self.parser.report_total(len(chap_urls))
+            todo = [(idx, u) for idx, u in enumerate(chap_urls, start=1) if u not in known]
+            if limit:
+                todo = todo[:limit]
+            if known:
+                self.parser.report_total(len(todo))
+            todo = await self.db.run_sync(seed_frontier, novel_id, todo)
+            await self.db.commit()
+        self.parser.frontier = FrontierTracker(novel_id)
+
+        # 3) + 4)
+        failed: List[str] = []
+        skipped: List[str] = []
+        self.written = 0
+        try:
+            written = await self._fetch_and_store(novel_id, todo, failed, skipped)
+        except Exception as e:
+            logger.error(f"[async] write failed for novel_id={novel_id}: {e}")
+            return {
+                "status": "error",
+                "novel_id": novel_id,
+                # batches before the failing one are committed
+                "chapters_ingested": self.written,
+                "chapters_failed": len(failed),
+                "failed_urls": failed,
+                "message": str(e),
+            }
+
+        logger.info(
+            f"[async] committed {written} chapters for novel_id={novel_id} ({len(failed)} failed)"
+        )
+        return ingest_result(novel_id, written, failed, len(skipped))
+
+    async def _fetch_and_store(
+        self, novel_id: int, todo: List[Tuple[int, str]], failed: List[str], skipped: List[str]
+    ) -> int:
+        """Fetch concurrently, write in completion order (chapter_number is explicit).
+        URLs that couldn't be fetched are appended to `failed`, the ones the
+        junk screen dropped to `skipped`."""
+        slots = asyncio.Semaphore(self.concurrency)
+        # Bounded so fetchers wait on a slow writer instead of piling up bodies
+        done: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def fetch(idx: int, chap_url: str) -> None:
+            async with slots:
+                title, body, error = await self._fetch_chapter_safe(chap_url)
+            await done.put((idx, chap_url, title, body, error))
+
+        # one writer for the whole ingest; it only flushes when told to. Its
+        # session is the AsyncSession's sync side, used inside run_sync only
+        writer = ChapterWriter(
+            self.db.sync_session, novel_id, batch_size=len(todo) + 1,
+            report=self.parser.report_chapter, frontier=self.parser.frontier,
+        )
+        await self.db.run_sync(lambda _: writer.load())
+        fetchers = [asyncio.create_task(fetch(idx, u)) for idx, u in todo]
+        batch: List[Tuple[int, str, str, str]] = []
+        try:
+            for _ in range(len(fetchers)):
+                idx, chap_url, title, body, error = await done.get()
+                if error:
+                    self.parser.report_chapter(chap_url, error=error)
+                    failed.append(chap_url)
+                    continue
+                batch.append((idx, chap_url, title, body))
+                if len(batch) >= self.batch_size:
+                    await self._write(writer, batch)
+                    batch = []
+            if batch or (self.parser.frontier and self.parser.frontier.has_changes()):
+                # an empty batch still records the last fetch failures
+                await self._write(writer, batch)
+        finally:
+            for task in fetchers:
+                task.cancel()
+            skipped.extend(writer.skipped)
+        return self.written
+
+    async def _write(self, writer: ChapterWriter, batch: List[Tuple[int, str, str, str]]) -> None:
+        def prepare() -> List[PreparedChapter]:
+            prepared = (writer.prepare(idx, title, body, url) for idx, url, title, body in batch)
+            return [p for p in prepared if p is not None]
+
+        def store(_sync_db) -> int:
+            for chapter in prepared:
+                writer.stage(chapter)
+            return writer.flush()
+
+        # screening, compression and tokenizing are pure CPU: keep them off the loop
+        prepared = await asyncio.to_thread(prepare)
+        self.written += await self.db.run_sync(store)
+
+
+class AsyncIxdzsIngestor(AsyncNovelIngestor):
+    parser_class = IxdzsIngestor
@@ -0,0 +1,243 @@
+"""
+Bulk multi-novel ingest.
+
+Every URL is prepared through its usual ingestor (`get_ingestor(...)
+.prepare_novel`), and its missing chapters go into one `FairScheduler`
+shared by all novels. Fetch workers take the next chapter round-robin: first
+across domains, then across the novels of that domain. A 3,000-chapter book
+therefore gets one turn per round like everything else. A domain is only
+offered work while it has fewer than INGEST_PER_HOST_LIMIT fetches in
+flight, so workers never sit blocked on a busy host while another is idle.
+Total throughput is bounded by the per-domain limits, not by how novels are
+queued.
+
+Fetched chapters go to a single writer thread. It owns the DB session and
+keeps one ChapterWriter per novel, so batches stay per novel and SQLite only
+ever sees one writer.
+"""
+
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.db.session import IngestSessionLocal
+from .novel_ingestor import PER_HOST_LIMIT, IngestPlan, get_ingestor, ingest_result
+
+logger = logging.getLogger(__name__)
+
+BULK_FETCH_WORKERS = int(os.getenv("INGEST_BULK_WORKERS", "16"))
+
+
+class _NovelRun:
+    """One novel inside a bulk ingest: its ingestor, plan and writer state."""
+
+    def __init__(self, url: str, ingestor, plan: IngestPlan):
+        self.url = url
+        self.domain = (urlparse(url).hostname or "").lower()
+        self.ingestor = ingestor
+        self.novel_id = plan.novel_id
+        self.pending: Deque[Tuple[int, str]] = deque(plan.todo)
+        self.remaining = len(plan.todo)
+        self.failed: List[str] = []
+        self.writer = None
+
+
+class FairScheduler:
+    """Round-robin chapter queue over domains, then novels within a domain."""
+
+    def __init__(self, per_domain_limit: int = PER_HOST_LIMIT):
+        self.per_domain_limit = max(1, per_domain_limit)
+        self._cond = threading.Condition()
+        # domain -> novels with chapters left; the OrderedDict order is the
+        # domain rotation, each deque the novel rotation inside a domain
+        self._domains: "OrderedDict[str, Deque[_NovelRun]]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self._closed = False
+
+    def add(self, run: _NovelRun) -> None:
+        if not run.pending:
+            return
+        with self._cond:
+            self._domains.setdefault(run.domain, deque()).append(run)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """No more novels will be added; `next()` returns None once drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def next(self) -> Optional[Tuple[_NovelRun, int, str]]:
+        """Block until some domain has spare capacity and return its next
+        chapter as (run, chapter_number, url)."""
+        with self._cond:
+            while True:
+                for domain in list(self._domains):
+                    if self._in_flight.get(domain, 0) >= self.per_domain_limit:
+                        continue
+                    runs = self._domains[domain]
+                    run = runs.popleft()
+                    idx, url = run.pending.popleft()
+                    if run.pending:
+                        runs.append(run)
+                    if runs:
+                        self._domains.move_to_end(domain)
+                    else:
+                        del self._domains[domain]
+                    self._in_flight[domain] = self._in_flight.get(domain, 0) + 1
+                    return run, idx, url
+                if self._closed and not self._domains:
+                    return None
+                self._cond.wait()
+
+    def done(self, domain: str) -> None:
+        with self._cond:
+            self._in_flight[domain] -= 1
+            self._cond.notify_all()
+
+
+class BulkIngest:
+    """
+    Usage:
+        results = BulkIngest(service_role_key).run(urls, limit=None, update=False)
+
+    `progress_for(url)` may return a progress sink (an IngestJob) per URL;
+    `results` maps each URL to the same result dict `ingest_novel` returns.
+    """
+
+    def __init__(
+        self,
+        service_role_key: str,
+        workers: Optional[int] = None,
+        per_domain_limit: int = PER_HOST_LIMIT,
+        progress_for: Optional[Callable[[str], object]] = None,
+        on_result: Optional[Callable[[str, dict], None]] = None,
+    ):
+        self.service_role_key = service_role_key
+        self.workers = max(1, workers or BULK_FETCH_WORKERS)
+        self.scheduler = FairScheduler(per_domain_limit)
+        self.progress_for = progress_for
+        self.on_result = on_result
+        self.results: Dict[str, dict] = {}
+        self._results_lock = threading.Lock()
+        # bounded so fetchers wait on a slow writer instead of piling up bodies
+        self._written: "queue.Queue" = queue.Queue(maxsize=self.workers * 4)
+
+    def run(self, urls: List[str], limit: Optional[int] = None, update: bool = False) -> Dict[str, dict]:
+        writer = threading.Thread(target=self._write_loop, name="bulk-writer", daemon=True)
+        fetchers = [
+            threading.Thread(target=self._fetch_loop, name=f"bulk-fetch-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        writer.start()
+        for t in fetchers:
+            t.start()
+        try:
+            # Novels join the scheduler as soon as their listing is parsed,
+            # so early ones are already fetching while later ones prepare.
+            self._prepare_all(urls, limit, update)
+        finally:
+            self.scheduler.close()
+            for t in fetchers:
+                t.join()
+            self._written.put(None)
+            writer.join()
+        return self.results
+
+    def _finish(self, url: str, result: dict) -> None:
+        with self._results_lock:
+            self.results[url] = result
+        if self.on_result is not None:
+            self.on_result(url, result)
+
+    def _prepare_all(self, urls: List[str], limit: Optional[int], update: bool) -> None:
+        db = IngestSessionLocal()
+        try:
+            for url in dict.fromkeys(urls):  # dedupe, keep order
+                progress = self.progress_for(url) if self.progress_for else None
+                ingestor = get_ingestor(db, self.service_role_key, url, progress=progress)
+                try:
+                    plan = ingestor.prepare_novel(url, limit=limit, update=update)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"[bulk] prepare failed for {url}: {e}")
+                    self._finish(url, {"status": "error", "novel_id": None,
+                                       "chapters_ingested": 0, "message": str(e)})
+                    continue
+                if isinstance(plan, dict):
+                    self._finish(url, plan)
+                    continue
+                # the ingestor's session stays with this thread; fetches only
+                # use its HTTP / parsing side
+                ingestor.db = None
+                run = _NovelRun(url, ingestor, plan)
+                if not run.pending:
+                    self._finish(url, ingest_result(run.novel_id, 0, []))
+                    continue
+                logger.info(f"[bulk] {url}: {run.remaining} chapters queued")
+                self.scheduler.add(run)
+        finally:
+            db.close()
+
+    def _fetch_loop(self) -> None:
+        while True:
+            task = self.scheduler.next()
+            if task is None:
+                return
+            run, idx, url = task
+            try:
+                title, body, error = run.ingestor._fetch_chapter_limited(url)
+            finally:
+                self.scheduler.done(run.domain)
+            self._written.put((run, idx, url, title, body, error))
+
+    def _write_loop(self) -> None:
+        db = IngestSessionLocal()
+        try:
+            while True:
+                item = self._written.get()
+                if item is None:
+                    return
+                run, idx, url, title, body, error = item
+                try:
+                    self._store(db, run, idx, url, title, body, error)
+                except Exception as e:
+                    # keep draining so fetchers never block on a full queue
+                    db.rollback()
+                    logger.error(f"[bulk] write failed for novel_id={run.novel_id}: {e}")
+                    run.remaining = -1
+                    self._finish(run.url, {
+                        "status": "error",
+                        "novel_id": run.novel_id,
+                        "chapters_ingested": run.writer.written if run.writer else 0,
+                        "message": str(e),
+                    })
+        finally:
+            db.close()
+
+    def _store(self, db, run: _NovelRun, idx, url, title, body, error) -> None:
+        if run.remaining < 0:  # novel already failed on a write
+            return
+        if run.writer is None:
+            run.writer = run.ingestor.writer_class(
+                db, run.novel_id, report=run.ingestor.report_chapter, frontier=run.ingestor.frontier
+            )
+        if error:
+            run.ingestor.report_chapter(url, error=error)
+            run.failed.append(url)
+        else:
+            run.writer.add(idx, title, body, url)
+        run.remaining -= 1
+        if run.remaining == 0:
+            run.writer.flush()
+            logger.info(
+                f"[bulk] novel_id={run.novel_id}: {run.writer.written} chapters,"
+                f" {len(run.failed)} failed"
+            )
+            self._finish(run.url, ingest_result(
+                run.novel_id, run.writer.written, run.failed, len(run.writer.skipped)
+            ))
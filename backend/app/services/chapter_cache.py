@@ -0,0 +1,146 @@
+"""
+In-process LRU cache for the chapter read endpoint.
+
+Entries are the finished response bodies (JSON and its gzip encoding) plus
+their ETags, so a cache hit never touches the database or re-serializes
+anything. Eviction is by total byte size, and `invalidate_novel` drops every
+cached chapter of a novel when the ingestor writes to it.
+
+`invalidate_novel` only reaches this process, and chapters are also
+rewritten from other ones (the re-extract CLI, ingest workers). Everything
+that writes chapters bumps the novel's `novel_stats.last_chapter_at`, so
+that is the novel's version: each entry is tagged with the version it was
+built under, and the cache checks a novel's version against the database
+(one indexed row) at most once per CHAPTER_CACHE_REVALIDATE_SECONDS. Hits
+in between don't touch the database at all; a changed version retires
+every cached chapter of the novel. A chapter rewritten elsewhere is thus
+served stale for at most that long (0: check on every hit).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+MAX_BYTES = int(os.getenv("CHAPTER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REVALIDATE_SECONDS = float(os.getenv("CHAPTER_CACHE_REVALIDATE_SECONDS", "5"))
+
+Key = Tuple[int, int]  # (novel_id, chapter_number)
+Version = Optional[float]  # novel_stats.last_chapter_at
+_UNCHECKED = object()  # tags entries built while the novel's version was unknown
+
+
+class CachedChapter:
+    __slots__ = ("etag", "body", "gzip_etag", "gzip_body", "version")
+
+    def __init__(self, payload: dict, version=_UNCHECKED):
+        self.version = version
+        self.body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong validators differ per content-coding
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = {t.strip() for t in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+class ChapterCache:
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Key, CachedChapter]" = OrderedDict()
+        self._by_novel: Dict[int, Set[Key]] = {}
+        self._versions: Dict[int, Tuple[Version, float]] = {}  # novel_id -> (version, checked_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Key, current_version: Callable[[], Version]) -> Optional[CachedChapter]:
+        """Cached entry for `key`, if it was built under the novel's current
+        version. `current_version` (the novel's version in the database) is
+        called only when the one on record is more than REVALIDATE_SECONDS
+        old, miss or hit, so `version` is fresh for building the entry."""
+        novel_id = key[0]
+        with self._lock:
+            seen = self._versions.get(novel_id)
+        if seen is None or time.monotonic() - seen[1] >= REVALIDATE_SECONDS:
+            version = current_version()
+            with self._lock:
+                if seen is not None and seen[0] != version:
+                    self._drop_novel(novel_id)
+                self._versions[novel_id] = (version, time.monotonic())
+        with self._lock:
+            entry = self._entries.get(key)
+            seen = self._versions.get(novel_id)
+            if entry is None or seen is None or entry.version != seen[0]:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def version(self, novel_id: int):
+        """The novel's version as of the last `get`, to tag a new entry with."""
+        with self._lock:
+            seen = self._versions.get(novel_id)
+        return seen[0] if seen is not None else _UNCHECKED
+
+    def put(self, key: Key, entry: CachedChapter) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._by_novel.setdefault(key[0], set()).add(key)
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate_novel(self, novel_id: int) -> None:
+        with self._lock:
+            self._drop_novel(novel_id)
+            self._versions.pop(novel_id, None)
+
+    def _drop_novel(self, novel_id: int) -> None:
+        for key in list(self._by_novel.get(novel_id, ())):
+            self._drop(key)
+
+    def _drop(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        keys = self._by_novel.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_novel[key[0]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+chapter_cache = ChapterCache()
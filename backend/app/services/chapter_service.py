@@ -1,18 +1,49 @@
 # backend/app/services/chapter_service.py
 
-from sqlalchemy.orm import Session
-from app.models.chapter import Chapter
+from sqlalchemy.orm import Session, joinedload
+from app.models.chapter import Chapter, ChapterBody
+from app.models.novel import NovelStats
 from app.schemas.chapter import ChapterCreate
+from app.services.content_store import compress_text, store_bodies
+from app.services.novel_stats import add_chapters
 
 def create_chapter(db: Session, chapter_data: ChapterCreate) -> Chapter:
-    chapter = Chapter(**chapter_data.dict())
+    data = chapter_data.dict()
+    text = data.pop("original_content")
+    digest, blob = compress_text(text)
+    store_bodies(db, {digest: (blob, len(text.encode("utf-8")))})
+    chapter = Chapter(**data, content_hash=digest)
     db.add(chapter)
+    add_chapters(db, chapter.novel_id, 1, len(text))
     db.commit()
     db.refresh(chapter)
     return chapter
 
 def list_chapters(db: Session, novel_id: int) -> list[Chapter]:
+    # Chapter text is deferred – this never reads chapter bodies
     return db.query(Chapter).filter(Chapter.novel_id == novel_id).order_by(Chapter.chapter_number).all()
 
+def _with_body(query):
+    return query.options(
+        joinedload(Chapter.body).undefer(ChapterBody.data),
+    )
+
 def get_chapter(db: Session, chapter_id: int) -> Chapter | None:
-    return db.query(Chapter).filter(Chapter.id == chapter_id).first()
+    """Load a chapter for reading; `chapter.content` is then the decompressed text."""
+    return _with_body(db.query(Chapter)).filter(Chapter.id == chapter_id).first()
+
+def novel_version(db: Session, novel_id: int):
+    """When the novel's chapters last changed (novel_stats), for checking cached copies."""
+    return (
+        db.query(NovelStats.last_chapter_at)
+        .filter(NovelStats.novel_id == novel_id)
+        .scalar()
+    )
+
+def get_chapter_by_number(db: Session, novel_id: int, chapter_number: int) -> Chapter | None:
+    """Reader lookup by position in the novel, body included."""
+    return (
+        _with_body(db.query(Chapter))
+        .filter(Chapter.novel_id == novel_id, Chapter.chapter_number == chapter_number)
+        .first()
+    )
@@ -0,0 +1,299 @@
+"""
+Batched chapter persistence for ingestors.
+
+Chapters are buffered as plain dicts and written with one bulk INSERT per
+batch, then committed. Bodies are compressed up front and stored once per
+content hash (see content_store). Nothing is kept in the session between
+batches, so memory stays flat however long the novel is, and a failure only
+loses the current batch instead of the whole ingest. On SQLite each batch
+waits its turn in the engine's writer queue (see app.db.engine), so any
+number of ingest workers can share the file.
+
+Each chapter is screened for junk / near-duplicates as it is added (see
+junk_filter). Skipped ones never reach the batch; the rest are stored with
+their fingerprint. That screening, compression and search tokenizing is
+`prepare()`, which uses no session once `load()` has run, so async callers
+can do it in a thread and keep only the write on the event loop:
+
+    prepared = await asyncio.to_thread(writer.prepare, number, title, body, url)
+    await db.run_sync(lambda _: writer.stage(prepared))
+
+With a FrontierTracker, each batch also marks its chapters done in the
+crawl frontier (same transaction) and writes the buffered fetch states,
+which the tracker keeps until that transaction has committed.
+The novel's catalog stats (novel_stats) are bumped in the same transaction.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.engine import serialized_write
+from app.models.novel import Chapter, ChapterFingerprint
+from app.services.chapter_cache import chapter_cache
+from app.services.metrics import DB_COMMIT_SECONDS, DB_FLUSH_SECONDS
+from app.services.content_store import compress_text, store_bodies
+from app.services.crawl_frontier import FrontierTracker
+from app.services.junk_filter import SCREEN_ENABLED, ChapterScreen, persist_templates, to_db
+from app.services.novel_stats import add_chapters
+from app.services.search_index import index_chapters, is_available as search_enabled, tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "50"))
+
+
+@dataclass
+class PreparedChapter:
+    """A screened chapter, ready to be buffered by `ChapterWriter.stage`."""
+
+    row: Dict
+    blob: bytes
+    size: int  # uncompressed bytes
+    chars: int
+    title_tokens: str
+    body_tokens: str
+    fingerprint: Optional[Tuple[int, Optional[str]]]  # (simhash, flag)
+
+
+class ChapterWriter:
+    """
+    Usage:
+        writer = ChapterWriter(db, novel_id)
+        for ...:
+            writer.add(number, title, body, url)
+        writer.flush()
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        novel_id: int,
+        batch_size: Optional[int] = None,
+        report: Optional[Callable[..., None]] = None,
+        frontier: Optional[FrontierTracker] = None,
+    ):
+        self.db = db
+        self.novel_id = novel_id
+        self.batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+        # report(url) on write, report(url, error=...) on rejection,
+        # report(url, skipped=reason) when the junk screen drops it
+        self.report = report
+        self.frontier = frontier
+        self.written = 0
+        self.rejected = 0
+        self.skipped: List[str] = []  # junk / duplicates the screen dropped
+        self.flagged = 0
+        self.bodies_stored = 0
+        self._rows: List[Dict] = []
+        self._bodies: Dict[str, Tuple[bytes, int]] = {}
+        # url -> (characters, tokenized title, tokenized body) of the open batch
+        self._docs: Dict[str, Tuple[int, str, str]] = {}
+        # url -> (simhash, flag) of the open batch
+        self._fingerprints: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._screen: Optional[ChapterScreen] = None
+        self._search: Optional[bool] = None
+
+    def load(self) -> None:
+        """The database reads prepare() needs: the novel's fingerprints for
+        the screen, and whether search is on."""
+        if self._search is None:
+            self._search = search_enabled(self.db)
+        if SCREEN_ENABLED and self._screen is None:
+            self._screen = ChapterScreen(self.db, self.novel_id)
+
+    def add(self, chapter_number: int, title: str, body: str, source_url: str) -> None:
+        prepared = self.prepare(chapter_number, title, body, source_url)
+        if prepared is not None:
+            self.stage(prepared)
+
+    def prepare(
+        self, chapter_number: int, title: str, body: str, source_url: str
+    ) -> Optional[PreparedChapter]:
+        """Screen, compress and tokenize one chapter (CPU only after load());
+        None if the screen skips it."""
+        self.load()
+        fingerprint = None
+        if self._screen is not None:
+            verdict = self._screen.check(body, source_url, chapter_number)
+            if verdict.action == "skip":
+                self.skipped.append(source_url)
+                if self.report is not None:
+                    self.report(source_url, skipped=f"{verdict.kind}: {verdict.reason}")
+                return None
+            flag = verdict.kind if verdict.action == "flag" else None
+            if flag is not None:
+                self.flagged += 1
+            fingerprint = (verdict.simhash, flag)
+        digest, blob = compress_text(body)
+        return PreparedChapter(
+            row={
+                "novel_id": self.novel_id,
+                "chapter_number": chapter_number,
+                "title": title,
+                "content_hash": digest,
+                "source_url": source_url,
+            },
+            blob=blob,
+            size=len(body.encode("utf-8")),
+            chars=len(body),
+            title_tokens=tokenize(title) if self._search else "",
+            body_tokens=tokenize(body) if self._search else "",
+            fingerprint=fingerprint,
+        )
+
+    def stage(self, prepared: PreparedChapter) -> None:
+        """Buffer a prepared chapter; writes the batch once it is full."""
+        url = prepared.row["source_url"]
+        self._bodies[prepared.row["content_hash"]] = (prepared.blob, prepared.size)
+        self._docs[url] = (prepared.chars, prepared.title_tokens, prepared.body_tokens)
+        if prepared.fingerprint is not None:
+            self._fingerprints[url] = prepared.fingerprint
+        self._rows.append(prepared.row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write and commit the buffered rows. Returns how many were stored."""
+        rows, self._rows = self._rows, []
+        bodies, self._bodies = self._bodies, {}
+        docs, self._docs = self._docs, {}
+        fingerprints, self._fingerprints = self._fingerprints, {}
+        if not rows:
+            if self.frontier is not None and self.frontier.has_changes():
+                with serialized_write(self.db):
+                    try:
+                        self.frontier.write(self.db)
+                        self._commit()
+                    except Exception:
+                        self.db.rollback()
+                        raise
+            return 0
+        with serialized_write(self.db):
+            stored = self._write_batch(rows, bodies, docs, fingerprints)
+            persist_templates(self.db)
+
+        self.written += len(stored)
+        chapter_cache.invalidate_novel(self.novel_id)
+        if self.report is not None:
+            for row in stored:
+                self.report(row["source_url"])
+        logger.debug(f"[writer] novel_id={self.novel_id}: +{len(stored)} chapters")
+        return len(stored)
+
+    def _write_batch(
+        self,
+        rows: List[Dict],
+        bodies: Dict[str, Tuple[bytes, int]],
+        docs: Dict[str, Tuple[int, str, str]],
+        fingerprints: Dict[str, Tuple[int, Optional[str]]],
+    ) -> List[Dict]:
+        try:
+            # bulk_insert_mappings never builds ORM objects, so nothing from
+            # this batch lingers in the identity map after the commit.
+            start = time.perf_counter()
+            new_bodies = store_bodies(self.db, bodies)
+            self.db.bulk_insert_mappings(Chapter, rows)
+            self._index(rows, docs, fingerprints)
+            chars = sum(docs[r["source_url"]][0] for r in rows)
+            add_chapters(self.db, self.novel_id, len(rows), chars)
+            if self.frontier is not None:
+                self.frontier.write(self.db, [r["source_url"] for r in rows])
+            flushed = time.perf_counter()
+            self._commit()
+            DB_FLUSH_SECONDS.observe(value=flushed - start)
+            DB_COMMIT_SECONDS.observe(value=time.perf_counter() - flushed)
+            self.bodies_stored += new_bodies
+            return rows
+        except IntegrityError as ie:
+            self.db.rollback()
+            logger.warning(
+                f"[writer] batch of {len(rows)} hit a constraint ({ie.orig}); "
+                f"retrying row by row"
+            )
+            return self._write_individually(rows, bodies, docs, fingerprints)
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _commit(self) -> None:
+        self.db.commit()
+        if self.frontier is not None:
+            # only now may the tracker forget what this transaction wrote
+            self.frontier.committed()
+
+    def _index(
+        self,
+        rows: List[Dict],
+        docs: Dict[str, Tuple[int, str, str]],
+        fingerprints: Dict[str, Tuple[int, Optional[str]]],
+    ) -> None:
+        """Add the just-inserted rows to the full-text index and store their
+        fingerprints (same transaction)."""
+        if not self._search and not fingerprints:
+            return
+        urls = [r["source_url"] for r in rows]
+        ids = self.db.query(Chapter.id, Chapter.source_url).filter(
+            Chapter.novel_id == self.novel_id,
+            Chapter.source_url.in_(urls),
+        ).all()
+        if self._search:
+            index_chapters(
+                self.db, [(cid, docs[url][1], docs[url][2]) for cid, url in ids], tokenized=True
+            )
+        if fingerprints:
+            self.db.bulk_insert_mappings(ChapterFingerprint, [
+                {
+                    "chapter_id": cid,
+                    "novel_id": self.novel_id,
+                    "simhash": to_db(fingerprints[url][0]),
+                    "flag": fingerprints[url][1],
+                }
+                for cid, url in ids if url in fingerprints
+            ])
+
+    def _write_individually(
+        self,
+        rows: List[Dict],
+        bodies: Dict[str, Tuple[bytes, int]],
+        docs: Dict[str, Tuple[int, str, str]],
+        fingerprints: Dict[str, Tuple[int, Optional[str]]],
+    ) -> List[Dict]:
+        stored = []
+        for row in rows:
+            digest = row["content_hash"]
+            try:
+                new_bodies = store_bodies(self.db, {digest: bodies[digest]})
+                self.db.bulk_insert_mappings(Chapter, [row])
+                self._index([row], docs, fingerprints)
+                add_chapters(self.db, self.novel_id, 1, docs[row["source_url"]][0])
+                if self.frontier is not None:
+                    self.frontier.write(self.db, [row["source_url"]])
+                self._commit()
+                self.bodies_stored += new_bodies
+                stored.append(row)
+            except IntegrityError as ie:
+                self.db.rollback()
+                if self._stored_already(row["source_url"]):
+                    # fetched twice (e.g. a worker lease expired mid-fetch) and
+                    # the other copy won: the chapter is there, so it's done
+                    logger.info(f"[writer] {row['source_url']} already stored")
+                    if self.frontier is not None:
+                        self.frontier.write(self.db, [row["source_url"]])
+                        self._commit()
+                    if self.report is not None:
+                        self.report(row["source_url"])
+                    continue
+                self.rejected += 1
+                logger.error(f"[writer] skipped {row['source_url']}: {ie.orig}")
+                if self.report is not None:
+                    self.report(row["source_url"], error=f"db constraint: {ie.orig}")
+        return stored
+
+    def _stored_already(self, source_url: str) -> bool:
+        return self.db.query(Chapter.id).filter(Chapter.source_url == source_url).first() is not None
@@ -0,0 +1,124 @@
+"""
+Compressed, content-addressed chapter bodies.
+
+Chapter text lives in `chapter_bodies`, zlib-compressed and keyed by the
+SHA-256 of its UTF-8 bytes, so pages that repeat verbatim (placeholders,
+"coming soon" notices, ad interstitials) are stored once no matter how many
+chapters point at them. Chapters only carry the hash.
+
+Databases created before that (and before novels had a description) are
+brought up to date at startup by `ensure_content_schema`; their chapters
+keep their text in `original_content` until re-extracted.
+"""
+
+import hashlib
+import logging
+import zlib
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from app.models.novel import Chapter, ChapterBody
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 6
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Return (hash, compressed bytes) for a chapter body."""
+    raw = text.encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, COMPRESSION_LEVEL)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def existing_hashes(db: Session, hashes: Iterable[str]) -> Set[str]:
+    hashes = list(hashes)
+    if not hashes:
+        return set()
+    rows = db.query(ChapterBody.hash).filter(ChapterBody.hash.in_(hashes))
+    return {h for (h,) in rows}
+
+
+def store_bodies(db: Session, bodies: Dict[str, Tuple[bytes, int]]) -> int:
+    """Insert the {hash: (compressed, size)} bodies not stored yet.
+
+    Runs in the caller's transaction; returns how many new rows were added.
+    """
+    missing = set(bodies) - existing_hashes(db, bodies)
+    if missing:
+        db.bulk_insert_mappings(ChapterBody, [
+            {"hash": h, "data": bodies[h][0], "size": bodies[h][1]} for h in missing
+        ])
+    return len(missing)
+
+
+def ensure_content_schema(engine: Engine) -> None:
+    """Bring an existing database up to the chapter storage schema
+    (idempotent): novels.description, chapters.content_hash, and a nullable
+    chapters.original_content. Run before anything that reads those."""
+    schema = inspect(engine)
+    novel_columns = {c["name"] for c in schema.get_columns("novels")}
+    chapter_columns = {c["name"]: c for c in schema.get_columns("chapters")}
+    legacy_not_null = not chapter_columns["original_content"]["nullable"]
+
+    if "description" not in novel_columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE novels ADD COLUMN description TEXT"))
+        logger.info("[schema] added novels.description")
+
+    if engine.dialect.name == "sqlite" and legacy_not_null:
+        # SQLite can't drop a NOT NULL: rebuild the table (which also adds
+        # content_hash) and copy the rows over
+        _rebuild_chapters_sqlite(engine, list(chapter_columns))
+        logger.info("[schema] rebuilt chapters with a nullable original_content")
+        return
+    with engine.begin() as conn:
+        if "content_hash" not in chapter_columns:
+            conn.execute(text(
+                "ALTER TABLE chapters ADD COLUMN content_hash VARCHAR(64)"
+                " REFERENCES chapter_bodies(hash)"
+            ))
+            logger.info("[schema] added chapters.content_hash")
+        if legacy_not_null:
+            conn.execute(text("ALTER TABLE chapters ALTER COLUMN original_content DROP NOT NULL"))
+            logger.info("[schema] chapters.original_content is nullable now")
+    for index in Chapter.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def _rebuild_chapters_sqlite(engine: Engine, old_columns: list) -> None:
+    """The usual SQLite recipe: new table, copy, drop, rename, with foreign
+    key enforcement off so nothing cascades or dangles meanwhile."""
+    ddl = str(CreateTable(Chapter.__table__).compile(dialect=engine.dialect))
+    ddl = ddl.replace("CREATE TABLE chapters ", "CREATE TABLE chapters_new ", 1)
+    copied = ", ".join(c for c in old_columns if c in Chapter.__table__.c)
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA foreign_keys=OFF"))
+        try:
+            with conn.begin():
+                # the old indexes go with the old table; free their names now
+                names = conn.execute(text(
+                    "SELECT name FROM sqlite_master WHERE type = 'index'"
+                    " AND tbl_name = 'chapters' AND sql IS NOT NULL"
+                )).scalars().all()
+                for name in names:
+                    conn.execute(text(f'DROP INDEX "{name}"'))
+                conn.execute(text(ddl))
+                conn.execute(text(
+                    f"INSERT INTO chapters_new ({copied}) SELECT {copied} FROM chapters"
+                ))
+                conn.execute(text("DROP TABLE chapters"))
+                conn.execute(text("ALTER TABLE chapters_new RENAME TO chapters"))
+        finally:
+            conn.execute(text("PRAGMA foreign_keys=ON"))
@@ -0,0 +1,218 @@
+"""
+Durable crawl frontier: interrupted ingests resume where they stopped.
+
+`prepare_novel` records every chapter URL it plans to fetch in
+`crawl_frontier`, in the same transaction that creates (or updates) the
+novel row, so a novel row never exists without its plan. Each URL then moves
+
+    pending -> in_flight -> done
+                         -> failed   (fetch error)
+                         -> skipped  (kept out by the junk screen)
+
+`in_flight` (with `attempts` + 1) is recorded when a fetch starts, and
+`done` in the very transaction that stores the chapter, so "done" and "the
+chapter row exists" can't disagree. Fetch starts and failures are buffered
+in a `FrontierTracker` and written with the next chapter batch (or the
+writer's final flush), so tracking adds no commits of its own.
+
+After a crash the novel exists, and a plain (non-update) ingest of the same
+URL resumes with its pending and in_flight chapters instead of returning
+"exists": only the chapters that were in flight are fetched again. Failed
+and skipped ones wait for an update run, as before.
+
+Chapters handed to the standalone ingest workers go `queued` instead of
+`pending`; those workers lease them out of this table (see ingest_worker).
+While a worker's lease is live (`lease_expires` not yet passed) nothing
+else touches the row: resume and update runs leave it out of their plan and
+don't re-seed it, and only the holder of the claim token may mark it done
+or failed. Once the lease has expired the chapter is fair game again, for a
+worker or a local ingest. Should both end up fetching it, the unique
+`chapters.source_url` lets one copy in and the loser's writer counts the
+chapter as done (see ChapterWriter).
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.novel import CrawlFrontier
+
+PENDING, IN_FLIGHT, DONE, FAILED = "pending", "in_flight", "done", "failed"
+SKIPPED = "skipped"  # junk / duplicate, not stored
+QUEUED = "queued"  # waiting for an ingest worker
+UNFINISHED = (PENDING, IN_FLIGHT)
+CHUNK = 500  # URLs per IN (...) statement
+
+
+def _chunks(items: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(items), CHUNK):
+        yield items[i:i + CHUNK]
+
+
+def _unleased(now: float):
+    """Rows no ingest worker holds a live lease on."""
+    return or_(
+        CrawlFrontier.state != IN_FLIGHT,
+        CrawlFrontier.lease_expires.is_(None),
+        CrawlFrontier.lease_expires < now,
+    )
+
+
+_NO_LEASE = {"lease_owner": None, "lease_token": None, "lease_expires": None}
+
+
+def seed_frontier(
+    db: Session, novel_id: int, todo: List[Tuple[int, str]]
+) -> List[Tuple[int, str]]:
+    """Queue `todo` as pending: new URLs are added, known ones re-queued.
+    Chapters an ingest worker is fetching right now are left alone. Runs in
+    the caller's transaction; returns `todo` minus those."""
+    if not todo:
+        return todo
+    now = time.time()
+    urls = [url for _, url in todo]
+    known: Set[str] = set()
+    leased: Set[str] = set()
+    for chunk in _chunks(urls):
+        rows = db.query(CrawlFrontier.url, CrawlFrontier.state, CrawlFrontier.lease_expires).filter(
+            CrawlFrontier.url.in_(chunk)
+        )
+        for url, state, expires in rows:
+            known.add(url)
+            if state == IN_FLIGHT and expires is not None and expires >= now:
+                leased.add(url)
+        db.query(CrawlFrontier).filter(
+            CrawlFrontier.url.in_(chunk), CrawlFrontier.state != PENDING, _unleased(now)
+        ).update(dict(_NO_LEASE, state=PENDING, updated_at=now), synchronize_session=False)
+    db.bulk_insert_mappings(CrawlFrontier, [
+        {"novel_id": novel_id, "chapter_number": idx, "url": url, "state": PENDING,
+         "attempts": 0, "updated_at": now}
+        for idx, url in todo if url not in known
+    ])
+    return [(idx, url) for idx, url in todo if url not in leased]
+
+
+def queue_chapters(db: Session, urls: List[str]) -> int:
+    """Hand unfinished chapters over to the ingest workers. Runs in the
+    caller's transaction; returns how many were queued."""
+    now = time.time()
+    queued = 0
+    for chunk in _chunks(urls):
+        queued += db.query(CrawlFrontier).filter(
+            CrawlFrontier.url.in_(chunk), CrawlFrontier.state.in_(UNFINISHED), _unleased(now)
+        ).update(dict(_NO_LEASE, state=QUEUED, updated_at=now), synchronize_session=False)
+    return queued
+
+
+def unfinished_chapters(db: Session, novel_id: int) -> List[Tuple[int, str]]:
+    """(chapter_number, url) still pending or in flight, in order; not the
+    ones an ingest worker holds a live lease on."""
+    rows = db.query(CrawlFrontier.chapter_number, CrawlFrontier.url).filter(
+        CrawlFrontier.novel_id == novel_id,
+        CrawlFrontier.state.in_(UNFINISHED),
+        _unleased(time.time()),
+    ).order_by(CrawlFrontier.chapter_number)
+    return [(idx, url) for idx, url in rows]
+
+
+def frontier_counts(db: Session, novel_id: int) -> Dict[str, int]:
+    """Chapters per state, e.g. {"done": 120, "pending": 30}."""
+    rows = db.query(CrawlFrontier.state, func.count()).filter(
+        CrawlFrontier.novel_id == novel_id
+    ).group_by(CrawlFrontier.state)
+    return dict(rows)
+
+
+class FrontierTracker:
+    """
+    State changes of one novel's chapters, collected from fetch threads and
+    written by its ChapterWriter:
+
+        tracker.started(url)            # fetch stage
+        tracker.failed(url, error)      # via NovelIngestor.report_chapter
+        tracker.skipped(url, reason)    # likewise, for the junk screen
+        tracker.write(db, done_urls)    # ChapterWriter, inside its transaction
+        tracker.committed()             # ChapterWriter, once that commit went through
+
+    Buffered changes stay buffered until `committed()`, so a batch that is
+    rolled back writes them again with the next one.
+    """
+
+    def __init__(self, novel_id: int, lease_token: Optional[str] = None):
+        self.novel_id = novel_id
+        # set when the chapters were claimed by an ingest worker, which already
+        # marked them in flight and counted the attempt; done / failed then
+        # only land while the claim is still the row's (a lease that expired
+        # and went to another worker is theirs to finish)
+        self.lease_token = lease_token
+        self._lock = threading.Lock()
+        self._started: Set[str] = set()
+        self._failed: Dict[str, str] = {}
+        self._skipped: Dict[str, str] = {}
+        # what the last write() put in the open transaction
+        self._writing: Tuple[Set[str], Dict[str, str], Dict[str, str]] = (set(), {}, {})
+
+    def started(self, url: str) -> None:
+        if self.lease_token is not None:
+            return
+        with self._lock:
+            self._started.add(url)
+
+    def failed(self, url: str, error: str) -> None:
+        with self._lock:
+            self._failed[url] = error
+
+    def skipped(self, url: str, reason: str) -> None:
+        with self._lock:
+            self._skipped[url] = reason
+
+    def has_changes(self) -> bool:
+        with self._lock:
+            return bool(self._started or self._failed or self._skipped)
+
+    def write(self, db: Session, done: Optional[List[str]] = None) -> None:
+        """Apply the buffered changes plus `done`, in the caller's transaction."""
+        with self._lock:
+            self._writing = (set(self._started), dict(self._failed), dict(self._skipped))
+            started = list(self._started)
+            finished = ((FAILED, dict(self._failed)), (SKIPPED, dict(self._skipped)))
+        now = time.time()
+        query = db.query(CrawlFrontier)
+        if self.lease_token is not None:
+            ours = CrawlFrontier.lease_token == self.lease_token
+        else:
+            ours = CrawlFrontier.lease_token.is_(None)
+        for chunk in _chunks(started):
+            # resuming a chapter whose worker lease expired takes it over
+            query.filter(
+                CrawlFrontier.url.in_(chunk), CrawlFrontier.state != DONE, _unleased(now)
+            ).update(
+                dict(_NO_LEASE, state=IN_FLIGHT, attempts=CrawlFrontier.attempts + 1,
+                     updated_at=now),
+                synchronize_session=False,
+            )
+        for state, notes in finished:
+            for url, note in notes.items():
+                query.filter(CrawlFrontier.url == url, CrawlFrontier.state != DONE, ours).update(
+                    dict(_NO_LEASE, state=state, last_error=note[:255], updated_at=now),
+                    synchronize_session=False,
+                )
+        for chunk in _chunks(done or []):
+            query.filter(CrawlFrontier.url.in_(chunk), ours).update(
+                dict(_NO_LEASE, state=DONE, last_error=None, updated_at=now),
+                synchronize_session=False,
+            )
+
+    def committed(self) -> None:
+        """The transaction of the last write() was committed: drop what it wrote."""
+        with self._lock:
+            started, failed, skipped = self._writing
+            self._writing = (set(), {}, {})
+            self._started -= started
+            for written, buffered in ((failed, self._failed), (skipped, self._skipped)):
+                for url, note in written.items():
+                    if buffered.get(url) == note:
+                        del buffered[url]
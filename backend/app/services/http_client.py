@@ -0,0 +1,297 @@
+"""
+Shared, pooled HTTP client for all ingestors.
+
+Every ingestor goes through one `requests.Session` so chapter fetches reuse
+keep-alive connections instead of paying a TCP + TLS handshake per page.
+Each host gets its own `HTTPAdapter`, sized from the per-domain settings in
+`DOMAIN_SETTINGS` (longest domain suffix wins), and the connection pools
+count how many sockets they actually open so reuse can be checked via
+`get_http_client().stats()`. Requests are paced, retried and circuit-broken
+per host by the guards in `resilience`, and every page downloaded is kept
+in the raw page archive (see `page_archive`, which can also swap this
+client for a replaying one).
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .metrics import HTTP_BYTES, HTTP_FETCH_SECONDS, HTTP_RETRIES
+from .page_archive import archive_response
+from .resilience import (
+    MAX_ATTEMPTS,
+    RETRYABLE_STATUS,
+    CircuitOpenError,
+    backoff_delay,
+    get_guard,
+    retry_after_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+try:  # urllib3 only decodes brotli when one of these is installed
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        _ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+                  " AppleWebKit/537.36 (KHTML, like Gecko)"
+                  " Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;"
+              "q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+}
+
+
+@dataclass(frozen=True)
+class DomainSettings:
+    pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "8"))
+    connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    read_timeout: float = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    # adaptive rate limit (req/s): starts at requests_per_second, moves
+    # between the min / max bounds; responses slower than slow_latency
+    # count as back-pressure
+    requests_per_second: float = float(os.getenv("HTTP_RATE_LIMIT", "8"))
+    min_requests_per_second: float = float(os.getenv("HTTP_RATE_LIMIT_MIN", "0.5"))
+    max_requests_per_second: float = float(os.getenv("HTTP_RATE_LIMIT_MAX", "32"))
+    slow_latency: float = float(os.getenv("HTTP_SLOW_LATENCY", "5"))
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+# Per-domain overrides, matched against the request host by suffix.
+DOMAIN_SETTINGS: Dict[str, DomainSettings] = {
+    "ixdzs.tw": DomainSettings(pool_size=16, connect_timeout=5, read_timeout=15),
+}
+
+
+def configure_domain(domain: str, **settings) -> None:
+    """Override pool size / timeouts / rate limits for `domain` (and its
+    subdomains).
+
+    Only affects hosts that haven't been contacted yet by the shared client.
+    """
+    DOMAIN_SETTINGS[domain.lower()] = DomainSettings(**settings)
+
+
+def settings_for(host: str) -> DomainSettings:
+    host = host.lower()
+    best = None
+    for domain in DOMAIN_SETTINGS:
+        if host == domain or host.endswith("." + domain):
+            if best is None or len(domain) > len(best):
+                best = domain
+    return DOMAIN_SETTINGS[best] if best else DomainSettings()
+
+
+class _HostStats:
+    __slots__ = ("requests", "connections", "bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.bytes = 0
+
+
+class _CountingPoolMixin:
+    """Bumps the owning client's per-host counter whenever a socket is opened."""
+
+    stats_sink = None  # set per adapter, see _PooledAdapter.init_poolmanager
+
+    def _new_conn(self):
+        sink = self.stats_sink
+        if sink is not None:
+            sink()
+        return super()._new_conn()
+
+
+class _CountingHTTPPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _PooledAdapter(HTTPAdapter):
+    def __init__(self, on_new_conn, **kwargs):
+        self._on_new_conn = on_new_conn
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_conn = self._on_new_conn
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("HTTPPool", (_CountingHTTPPool,), {"stats_sink": staticmethod(on_new_conn)}),
+            "https": type("HTTPSPool", (_CountingHTTPSPool,), {"stats_sink": staticmethod(on_new_conn)}),
+        }
+
+
+class HttpClient:
+    """Thread-safe wrapper around one keep-alive `requests.Session`."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self._lock = threading.Lock()
+        self._mounted: Dict[str, DomainSettings] = {}
+        self._stats: Dict[str, _HostStats] = {}
+
+    def _host_stats(self, host: str) -> _HostStats:
+        st = self._stats.get(host)
+        if st is None:
+            with self._lock:
+                st = self._stats.setdefault(host, _HostStats())
+        return st
+
+    def _connection_counter(self, host: str):
+        def count():
+            with self._lock:
+                self._stats.setdefault(host, _HostStats()).connections += 1
+        return count
+
+    def _adapter_for(self, scheme: str, host: str) -> DomainSettings:
+        prefix = f"{scheme}://{host}/"
+        settings = self._mounted.get(prefix)
+        if settings is not None:
+            return settings
+        with self._lock:
+            settings = self._mounted.get(prefix)
+            if settings is None:
+                settings = settings_for(host)
+                adapter = _PooledAdapter(
+                    self._connection_counter(host),
+                    pool_connections=1,
+                    pool_maxsize=settings.pool_size,
+                    pool_block=True,
+                )
+                self.session.mount(prefix, adapter)
+                self._mounted[prefix] = settings
+                logger.debug(f"[http] mounted pool for {host} (size={settings.pool_size})")
+        return settings
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout=None) -> requests.Response:
+        """GET with per-host pacing, retries and circuit breaking.
+
+        Connection errors, timeouts and 429/5xx responses are retried up to
+        FETCH_MAX_ATTEMPTS times with jittered backoff (at least Retry-After).
+        The last error is raised, or the last retryable response returned
+        for the caller's `raise_for_status()`.
+        """
+        parts = urlparse(url)
+        host = parts.netloc.lower()
+        domain = parts.hostname or host
+        settings = self._adapter_for(parts.scheme, host)
+        guard = get_guard(host)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            last = attempt == MAX_ATTEMPTS
+            try:
+                wait = guard.acquire()
+            except CircuitOpenError as e:
+                if last:
+                    raise
+                HTTP_RETRIES.inc(domain)
+                logger.warning(f"[http] {e}; waiting before {url}")
+                time.sleep(e.retry_after)
+                continue
+
+            # from here on the guard may hold this host's half-open probe: every
+            # way out must record an outcome, or the breaker stays wedged
+            try:
+                if wait:
+                    time.sleep(wait)
+                start = time.perf_counter()
+                resp = self.session.get(url, headers=headers, timeout=timeout or settings.timeout)
+                size = len(resp.content)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                guard.record_failure()
+                if last:
+                    raise
+                delay = backoff_delay(attempt)
+                HTTP_RETRIES.inc(domain)
+                logger.warning(f"[http] {url} failed ({e}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                # ChunkedEncodingError, ContentDecodingError, TooManyRedirects...
+                guard.record_failure()
+                raise
+            except BaseException:
+                guard.release()
+                raise
+            elapsed = time.perf_counter() - start
+            HTTP_FETCH_SECONDS.observe(domain, value=elapsed)
+            HTTP_BYTES.inc(domain, amount=size)
+            st = self._host_stats(host)
+            with self._lock:
+                st.requests += 1
+                st.bytes += size
+
+            if resp.status_code not in RETRYABLE_STATUS:
+                guard.record_success(elapsed)
+                archive_response(url, resp.status_code, resp.headers, resp.content)
+                return resp
+            guard.record_failure(throttled=resp.status_code == 429)
+            if last:
+                return resp
+            delay = backoff_delay(attempt, retry_after_seconds(resp.headers))
+            HTTP_RETRIES.inc(domain)
+            logger.warning(f"[http] {url} -> {resp.status_code}, retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+        return resp
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-host request / connection counts. reused = requests served on an
+        already-open connection."""
+        with self._lock:
+            out = {}
+            for host, st in self._stats.items():
+                reused = max(0, st.requests - st.connections)
+                out[host] = {
+                    "requests": st.requests,
+                    "connections_opened": st.connections,
+                    "connections_reused": reused,
+                    "reuse_ratio": round(reused / st.requests, 3) if st.requests else 0.0,
+                    "bytes": st.bytes,
+                }
+            return out
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Process-wide client shared by every ingestor."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def set_http_client(client) -> Optional[HttpClient]:
+    """Replace the process-wide client (e.g. with page_archive's replay
+    client); returns the previous one so it can be restored."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
@@ -0,0 +1,323 @@
+"""
+Background ingest jobs.
+
+`POST /api/ingest` hands the work to `job_manager`, which runs each ingest on
+a bounded thread pool with its own DB session and returns immediately. The
+ingestor reports progress into the job (see `NovelIngestor.progress`), and
+`GET /api/ingest/{job_id}` reads a snapshot of it.
+
+`POST /api/ingest/async` runs the job as a task on the server's event loop
+through the async ingest path instead; it shows up in the same registry.
+
+`POST /api/ingest/bulk` creates one job per URL but runs them together on a
+single pool thread through `bulk_ingest.BulkIngest`, which interleaves their
+chapter fetches fairly across domains.
+
+With TRANSLATE_AFTER_INGEST set to a language code, each finished job also
+queues a translation of its novel (see translation.translate_novel).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.db.session import IngestSessionLocal
+from app.services.metrics import ACTIVE_JOBS
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS = int(os.getenv("INGEST_MAX_JOBS", "4"))
+# Async jobs don't hold a thread, so many more can run side by side
+MAX_ASYNC_JOBS = int(os.getenv("INGEST_MAX_ASYNC_JOBS", "64"))
+# Finished jobs kept around for status polling before the oldest are dropped.
+MAX_RETAINED_JOBS = int(os.getenv("INGEST_RETAINED_JOBS", "500"))
+MAX_ERRORS_PER_JOB = 50
+
+# target language to translate each ingested novel into; empty: don't
+TRANSLATE_AFTER_INGEST = os.getenv("TRANSLATE_AFTER_INGEST", "")
+
+# "partial": finished, but some chapters failed (see `errors`)
+FINISHED_STATES = {"success", "partial", "exists", "warning", "error"}
+
+
+class IngestJob:
+    """Progress of one ingest. Updated from the worker, read from the API."""
+
+    def __init__(
+        self,
+        url: str,
+        limit: Optional[int],
+        concurrency: Optional[int],
+        update: bool = False,
+    ):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.limit = limit
+        self.concurrency = concurrency
+        self.update = update
+        self.status = "queued"
+        self.novel_id: Optional[int] = None
+        self.chapters_total = 0
+        self.chapters_done = 0
+        self.chapters_failed = 0
+        self.chapters_skipped = 0  # junk / duplicates, not stored
+        self.errors: List[str] = []
+        self.message: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    # -- called by the ingestor -------------------------------------------
+    def set_total(self, total: int) -> None:
+        with self._lock:
+            self.chapters_total = total
+
+    def set_novel(self, novel_id: int) -> None:
+        self.novel_id = novel_id
+
+    def chapter_done(self) -> None:
+        with self._lock:
+            self.chapters_done += 1
+
+    def chapter_skipped(self) -> None:
+        with self._lock:
+            self.chapters_skipped += 1
+
+    def chapter_failed(self, url: str, error: str) -> None:
+        with self._lock:
+            self.chapters_failed += 1
+            if len(self.errors) < MAX_ERRORS_PER_JOB:
+                self.errors.append(f"{url}: {error}")
+
+    # -- called by the manager --------------------------------------------
+    def start(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+
+    def finish(self, status: str, message: Optional[str] = None) -> None:
+        self.status = status
+        self.message = message
+        self.finished_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = 0.0
+            if self.started_at:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                "job_id": self.id,
+                "url": self.url,
+                "status": self.status,
+                "novel_id": self.novel_id,
+                "chapters_done": self.chapters_done,
+                "chapters_failed": self.chapters_failed,
+                "chapters_skipped": self.chapters_skipped,
+                "chapters_total": self.chapters_total,
+                "elapsed_seconds": round(elapsed, 3),
+                "chapters_per_second": round(self.chapters_done / elapsed, 3) if elapsed else 0.0,
+                "errors": list(self.errors),
+                "message": self.message,
+            }
+
+
+class IngestJobManager:
+    def __init__(self, max_workers: int = MAX_JOBS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest-job")
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._async_tasks: set = set()
+
+    def submit(
+        self,
+        url: str,
+        service_role_key: str,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        update: bool = False,
+    ) -> IngestJob:
+        job = IngestJob(url, limit, concurrency, update)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, service_role_key)
+        logger.info(f"[jobs] queued {job.id} for {url}")
+        return job
+
+    def submit_async(
+        self,
+        url: str,
+        service_role_key: str,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        update: bool = False,
+    ) -> IngestJob:
+        """Schedule an async-path ingest on the running event loop."""
+        job = IngestJob(url, limit, concurrency, update)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(MAX_ASYNC_JOBS)
+        task = asyncio.get_running_loop().create_task(self._run_async(job, service_role_key))
+        # keep a reference so the task isn't garbage-collected mid-run
+        self._async_tasks.add(task)
+        task.add_done_callback(self._async_tasks.discard)
+        logger.info(f"[jobs] queued async {job.id} for {url}")
+        return job
+
+    def submit_bulk(
+        self,
+        urls: List[str],
+        service_role_key: str,
+        limit: Optional[int] = None,
+        update: bool = False,
+    ) -> List[IngestJob]:
+        """One job per distinct URL, all run by a single BulkIngest."""
+        jobs = {url: IngestJob(url, limit, None, update) for url in dict.fromkeys(urls)}
+        with self._lock:
+            for job in jobs.values():
+                self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run_bulk, jobs, service_role_key, limit, update)
+        logger.info(f"[jobs] queued bulk ingest of {len(jobs)} novels")
+        return list(jobs.values())
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.finished)
+
+    def _prune(self) -> None:
+        excess = len(self._jobs) - MAX_RETAINED_JOBS
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:excess]:
+            del self._jobs[job_id]
+
+    def _run(self, job: IngestJob, service_role_key: str) -> None:
+        from app.services.novel_ingestor import get_ingestor
+
+        job.start()
+        ACTIVE_JOBS.inc()
+        db = IngestSessionLocal()
+        try:
+            ingestor = get_ingestor(
+                db=db,
+                service_role_key=service_role_key,
+                url=job.url,
+                concurrency=job.concurrency,
+                progress=job,
+            )
+            result = ingestor.ingest_novel(url=job.url, limit=job.limit, update=job.update)
+            if result.get("novel_id") is not None:
+                job.set_novel(result["novel_id"])
+            job.finish(result.get("status", "success"), result.get("message"))
+            logger.info(f"[jobs] {job.id} finished: {job.status}")
+            self._after_ingest([job])
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"[jobs] {job.id} crashed")
+            job.finish("error", str(e))
+        finally:
+            ACTIVE_JOBS.dec()
+            db.close()
+
+    def _run_bulk(
+        self,
+        jobs: Dict[str, IngestJob],
+        service_role_key: str,
+        limit: Optional[int],
+        update: bool,
+    ) -> None:
+        from app.services.bulk_ingest import BulkIngest
+
+        def on_result(url: str, result: dict) -> None:
+            job = jobs[url]
+            if result.get("novel_id") is not None:
+                job.set_novel(result["novel_id"])
+            job.finish(result.get("status", "success"), result.get("message"))
+            logger.info(f"[jobs] {job.id} finished: {job.status}")
+
+        for job in jobs.values():
+            job.start()
+        ACTIVE_JOBS.inc(amount=len(jobs))
+        try:
+            BulkIngest(
+                service_role_key, progress_for=jobs.get, on_result=on_result
+            ).run(list(jobs), limit=limit, update=update)
+            self._after_ingest(list(jobs.values()))
+        except Exception as e:
+            logger.exception("[jobs] bulk ingest crashed")
+            for job in jobs.values():
+                if not job.finished:
+                    job.finish("error", str(e))
+        finally:
+            ACTIVE_JOBS.dec(amount=len(jobs))
+
+    def _after_ingest(self, jobs: List[IngestJob]) -> None:
+        """Queue translation of the novels these jobs stored."""
+        novel_ids = [j.novel_id for j in jobs if j.novel_id is not None and j.status != "error"]
+        if TRANSLATE_AFTER_INGEST and novel_ids:
+            self._pool.submit(self._translate, novel_ids, TRANSLATE_AFTER_INGEST)
+
+    def _translate(self, novel_ids: List[int], target: str) -> None:
+        from app.services.translation import translate_novel
+
+        db = IngestSessionLocal()
+        try:
+            for novel_id in novel_ids:
+                try:
+                    translate_novel(db, novel_id, target)
+                except Exception:
+                    db.rollback()
+                    logger.exception(f"[jobs] translation of novel_id={novel_id} failed")
+        finally:
+            db.close()
+
+    async def _run_async(self, job: IngestJob, service_role_key: str) -> None:
+        from app.db.async_session import AsyncSessionLocal
+        from app.services.async_ingestor import get_async_ingestor
+
+        async with self._async_slots:
+            job.start()
+            ACTIVE_JOBS.inc()
+            try:
+                async with AsyncSessionLocal() as db:
+                    ingestor = get_async_ingestor(
+                        db=db,
+                        service_role_key=service_role_key,
+                        url=job.url,
+                        concurrency=job.concurrency,
+                        progress=job,
+                    )
+                    result = await ingestor.ingest_novel(
+                        url=job.url, limit=job.limit, update=job.update
+                    )
+                if result.get("novel_id") is not None:
+                    job.set_novel(result["novel_id"])
+                job.finish(result.get("status", "success"), result.get("message"))
+                logger.info(f"[jobs] {job.id} finished: {job.status}")
+                self._after_ingest([job])
+            except Exception as e:
+                logger.exception(f"[jobs] {job.id} crashed")
+                job.finish("error", str(e))
+            finally:
+                ACTIVE_JOBS.dec()
+
+
+job_manager = IngestJobManager()
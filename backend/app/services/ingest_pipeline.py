@@ -0,0 +1,274 @@
+"""
+Staged chapter pipeline: fetch → parse → store.
+
+    todo ──▶ fetch threads ──[raw]──▶ parse stage ──[parsed]──▶ DB writer
+             (I/O, per-host          (process pool:            (caller's
+              semaphore)              one task per thread)      thread)
+
+The stages are joined by bounded queues. A slow writer stalls the parsers,
+and slow parsers stall the fetchers, so memory stays flat however many
+chapters are queued. Parsing runs in a process pool (INGEST_PARSE_PROCESSES,
+default: one per spare core) so BeautifulSoup can use more than one core;
+`parse_chapter_page` is module-level so the task pickles. With 0 processes
+it parses in-thread, as before.
+
+Each stage measures its own CPU time: thread_time() in the fetch threads
+and the writer, process_time() inside the parse workers. The totals are
+returned by `run()` and exported as mtlhub_ingest_stage_cpu_seconds_total.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from .html_parser import PARSER_BACKEND, parse_stats
+from .metrics import PARSE_SECONDS, counter
+
+logger = logging.getLogger(__name__)
+
+
+def _default_processes() -> int:
+    cores = os.cpu_count() or 1
+    return cores - 1 if cores > 1 else 0
+
+
+PARSE_PROCESSES = int(os.getenv("INGEST_PARSE_PROCESSES", str(_default_processes())))
+QUEUE_SIZE = int(os.getenv("INGEST_PIPELINE_QUEUE", "32"))
+
+STAGE_CPU_SECONDS = counter(
+    "mtlhub_ingest_stage_cpu_seconds_total", "CPU time spent per ingest pipeline stage", ["stage"]
+)
+
+_DONE = object()
+
+# -- parse worker (runs in the pool processes) ---------------------------------
+
+_worker_parsers: Dict[type, object] = {}
+
+
+def parse_chapter_page(ingestor_class: type, html: str, url: str) -> Tuple[str, str, float, float]:
+    """Parse one chapter page with `ingestor_class.parse_chapter`.
+
+    Returns (title, body, cpu_seconds, wall_seconds). The ingestor is built
+    once per worker process, without a DB session.
+    """
+    parser = _worker_parsers.get(ingestor_class)
+    if parser is None:
+        parser = _worker_parsers[ingestor_class] = ingestor_class(None, "")
+    cpu, wall = time.process_time(), time.perf_counter()
+    title, body = parser.parse_chapter(html, url)
+    return title, body, time.process_time() - cpu, time.perf_counter() - wall
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Process-wide parse pool, or None when INGEST_PARSE_PROCESSES is 0."""
+    global _pool
+    if PARSE_PROCESSES <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that runs server / fetch threads
+                # can copy locks in a held state
+                _pool = ProcessPoolExecutor(
+                    max_workers=PARSE_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"[pipeline] started {PARSE_PROCESSES} parse processes")
+    return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            logger.warning("[pipeline] parse pool broke, restarting it")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_chapter(ingestor, html: str, url: str) -> Tuple[str, str, float]:
+    """(title, body, cpu_seconds) for a downloaded chapter page, parsed in the
+    pool when there is one, else in the calling thread."""
+    pool = get_parse_pool()
+    if pool is None:
+        cpu = time.thread_time()
+        title, body = ingestor.parse_chapter(html, url)
+        return title, body, time.thread_time() - cpu
+    try:
+        title, body, cpu, wall = pool.submit(parse_chapter_page, type(ingestor), html, url).result()
+    except BrokenProcessPool:
+        # a worker died (OOM, killed): start a fresh pool for later pages
+        # and parse this one here
+        _reset_pool(pool)
+        cpu = time.thread_time()
+        title, body = ingestor.parse_chapter(html, url)
+        return title, body, time.thread_time() - cpu
+    # parse_html's own accounting stays in the worker process
+    parse_stats.record(PARSER_BACKEND, wall, len(html))
+    PARSE_SECONDS.observe(PARSER_BACKEND, value=wall)
+    return title, body, cpu
+
+
+class _StageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = 0
+        self.cpu = 0.0
+
+    def add(self, cpu: float, items: int = 1) -> None:
+        with self._lock:
+            self.items += items
+            self.cpu += cpu
+
+
+class ChapterPipeline:
+    """
+    Usage:
+        written, failed, stages = ChapterPipeline(ingestor).run(writer, todo)
+
+    `ingestor` supplies fetch_text / parse_chapter / report_fetching /
+    report_chapter; `writer` is a ChapterWriter on the caller's session, used
+    only from the calling thread.
+    """
+
+    def __init__(self, ingestor, fetch_workers: Optional[int] = None, queue_size: int = QUEUE_SIZE):
+        self.ingestor = ingestor
+        self.fetch_workers = max(1, fetch_workers or ingestor.concurrency)
+        self.parse_workers = max(1, PARSE_PROCESSES)
+        self._raw: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._parsed: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._stats = {name: _StageStats() for name in ("fetch", "parse", "store")}
+
+    def run(self, writer, todo: List[Tuple[int, str]]) -> Tuple[int, List[str], Dict[str, dict]]:
+        """Returns (chapters written, failed URLs, per-stage CPU stats)."""
+        from .novel_ingestor import _host_semaphore
+
+        start = time.perf_counter()
+        pending: "queue.Queue" = queue.Queue()
+        for item in todo:
+            pending.put(item)
+
+        fetchers_left = [self.fetch_workers]
+        parsers_left = [self.parse_workers]
+        lock = threading.Lock()
+
+        def fetch_loop():
+            stats = self._stats["fetch"]
+            try:
+                while not self._stop.is_set():
+                    try:
+                        idx, url = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    self.ingestor.report_fetching(url)
+                    cpu = time.thread_time()
+                    try:
+                        with _host_semaphore(url):
+                            html = self.ingestor.fetch_text(url)
+                    except Exception as e:
+                        logger.error(f"chapter fetch failed for {url}: {e}")
+                        self._parsed.put((idx, url, "", "", f"{type(e).__name__}: {e}"))
+                        continue
+                    finally:
+                        stats.add(time.thread_time() - cpu)
+                    self._raw.put((idx, url, html))
+            finally:
+                with lock:
+                    fetchers_left[0] -= 1
+                    last = fetchers_left[0] == 0
+                if last:
+                    for _ in range(self.parse_workers):
+                        self._raw.put(_DONE)
+
+        def parse_loop():
+            stats = self._stats["parse"]
+            try:
+                while True:
+                    item = self._raw.get()
+                    if item is _DONE:
+                        return
+                    idx, url, html = item
+                    try:
+                        title, body, cpu = parse_chapter(self.ingestor, html, url)
+                    except Exception as e:
+                        logger.error(f"chapter parse failed for {url}: {e}")
+                        self._parsed.put((idx, url, "", "", f"{type(e).__name__}: {e}"))
+                        continue
+                    stats.add(cpu)
+                    error = None if body else "empty chapter body"
+                    self._parsed.put((idx, url, title, body, error))
+            finally:
+                with lock:
+                    parsers_left[0] -= 1
+                    last = parsers_left[0] == 0
+                if last:
+                    self._parsed.put(_DONE)
+
+        threads = [
+            threading.Thread(target=fetch_loop, name=f"pipeline-fetch-{i}", daemon=True)
+            for i in range(self.fetch_workers)
+        ] + [
+            threading.Thread(target=parse_loop, name=f"pipeline-parse-{i}", daemon=True)
+            for i in range(self.parse_workers)
+        ]
+        for t in threads:
+            t.start()
+
+        failed: List[str] = []
+        store = self._stats["store"]
+        try:
+            while True:
+                item = self._parsed.get()
+                if item is _DONE:
+                    break
+                idx, url, title, body, error = item
+                cpu = time.thread_time()
+                if error:
+                    self.ingestor.report_chapter(url, error=error)
+                    failed.append(url)
+                else:
+                    writer.add(idx, title, body, url)
+                store.add(time.thread_time() - cpu)
+            cpu = time.thread_time()
+            writer.flush()
+            store.add(time.thread_time() - cpu, items=0)
+        except BaseException:
+            # stop fetching and drain so no stage stays blocked on a full queue
+            self._stop.set()
+            while self._parsed.get() is not _DONE:
+                pass
+            raise
+        finally:
+            for t in threads:
+                t.join()
+
+        stages = self._report(time.perf_counter() - start)
+        return writer.written, failed, stages
+
+    def _report(self, wall: float) -> Dict[str, dict]:
+        out = {}
+        for name, st in self._stats.items():
+            STAGE_CPU_SECONDS.inc(name, amount=st.cpu)
+            out[name] = {
+                "items": st.items,
+                "cpu_seconds": round(st.cpu, 4),
+                "cpu_share": round(st.cpu / wall, 3) if wall else 0.0,
+            }
+        logger.info(
+            "[pipeline] "
+            + ", ".join(f"{n}: {s['cpu_seconds']}s cpu / {s['items']}" for n, s in out.items())
+            + f" in {wall:.2f}s wall"
+        )
+        return out
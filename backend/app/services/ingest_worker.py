@@ -0,0 +1,291 @@
+"""
+Distributed ingest workers: chapter fetches leased from a shared DB queue.
+
+The queue is the crawl frontier. `enqueue_novel` prepares a novel the usual
+way (`get_ingestor(...).prepare_novel`: novel row, chapter URLs) and marks
+its chapters `queued`. Any number of `IngestWorker` processes, on any node
+that reaches the database, then loop:
+
+1. claim up to `batch` queued chapters: one UPDATE over the rows picked by
+   `SELECT ... ORDER BY id LIMIT n FOR UPDATE SKIP LOCKED`, tagging them
+   with the worker id, a fresh claim token and a lease expiry. On Postgres,
+   concurrent claimers skip each other's locked rows instead of waiting. On
+   SQLite, FOR UPDATE is not rendered; the UPDATE alone takes the database
+   write lock, so the subquery and the update are still one atomic step;
+2. fetch and parse them through the novel's ingestor
+   (`_fetch_chapter_limited`, as the bulk scheduler does), `concurrency` at a
+   time. A heartbeat thread pushes the worker's leases forward every
+   LEASE_SECONDS / 3 meanwhile;
+3. store them with a ChapterWriter per novel, which marks them done (or
+   failed) in the frontier in the same transaction, provided the row still
+   carries the batch's claim token.
+
+A worker that dies stops renewing, and once its leases expire the chapters
+are claimable again. A chapter claimed WORKER_MAX_ATTEMPTS times without
+finishing is marked failed, so one page that kills its worker can't take
+down the others in turn. If a slow worker's lease expires and the chapter
+is fetched twice, the unique source_url lets only one copy in; the other
+worker's writer finds the chapter stored and marks it done.
+
+Capacity scales with the number of worker processes, up to the database's
+write rate. Politeness limits (INGEST_PER_HOST_LIMIT, the HTTP client's
+adaptive per-domain rate) are per process: N workers may send a host up to
+N times what one would, so lower HTTP_RATE_LIMIT when adding many.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from pydantic import HttpUrl
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.engine import serialized_write
+from app.db.session import IngestSessionLocal
+from app.models.novel import CrawlFrontier
+from .crawl_frontier import _NO_LEASE, FAILED, IN_FLIGHT, QUEUED, FrontierTracker, queue_chapters
+from .metrics import counter, gauge
+from .novel_ingestor import get_ingestor
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "120"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+WORKER_MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))
+
+TASKS = counter(
+    "mtlhub_worker_tasks_total", "Chapter tasks handled by ingest workers", ["outcome"]
+)
+LEASES_HELD = gauge("mtlhub_worker_leases", "Chapter leases held by this worker process")
+
+
+@dataclass
+class Task:
+    id: int
+    novel_id: int
+    chapter_number: int
+    url: str
+    attempts: int
+    token: str  # claim token, shared by the batch
+
+
+def worker_name() -> str:
+    """host:pid:random, unique per worker process."""
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# -- queue operations -------------------------------------------------------------
+
+
+def enqueue_novel(
+    db: Session,
+    url: Union[str, HttpUrl],
+    service_role_key: str,
+    limit: Optional[int] = None,
+    update: bool = False,
+) -> dict:
+    """Prepare the novel and queue its missing chapters for the workers."""
+    url = str(url)
+    ingestor = get_ingestor(db, service_role_key, url)
+    plan = ingestor.prepare_novel(url, limit=limit, update=update)
+    if isinstance(plan, dict):
+        return plan
+    with serialized_write(db):
+        queued = queue_chapters(db, [u for _, u in plan.todo])
+        db.commit()
+    logger.info(f"[worker] novel_id={plan.novel_id}: {queued} chapters queued")
+    return {"status": "queued", "novel_id": plan.novel_id, "chapters_queued": queued}
+
+
+def claim_tasks(
+    db: Session, worker_id: str, limit: int, lease_seconds: float = LEASE_SECONDS
+) -> List[Task]:
+    """Lease up to `limit` queued (or abandoned) chapters to `worker_id`."""
+    now = time.time()
+    token = uuid.uuid4().hex
+    expired = and_(CrawlFrontier.state == IN_FLIGHT, CrawlFrontier.lease_expires < now)
+    claimable = select(CrawlFrontier.id).where(
+        or_(CrawlFrontier.state == QUEUED,
+            and_(expired, CrawlFrontier.attempts < WORKER_MAX_ATTEMPTS))
+    ).order_by(CrawlFrontier.id).limit(limit).with_for_update(skip_locked=True)
+    with serialized_write(db):
+        # abandoned too often: give up on it rather than hand it out again
+        db.query(CrawlFrontier).filter(
+            expired, CrawlFrontier.attempts >= WORKER_MAX_ATTEMPTS
+        ).update(
+            dict(_NO_LEASE, state=FAILED,
+                 last_error=f"lease expired {WORKER_MAX_ATTEMPTS} times", updated_at=now),
+            synchronize_session=False,
+        )
+        db.query(CrawlFrontier).filter(CrawlFrontier.id.in_(claimable)).update(
+            {"state": IN_FLIGHT, "attempts": CrawlFrontier.attempts + 1,
+             "lease_owner": worker_id, "lease_token": token,
+             "lease_expires": now + lease_seconds, "updated_at": now},
+            synchronize_session=False,
+        )
+        db.commit()
+    rows = db.query(
+        CrawlFrontier.id, CrawlFrontier.novel_id, CrawlFrontier.chapter_number,
+        CrawlFrontier.url, CrawlFrontier.attempts, CrawlFrontier.lease_token,
+    ).filter(CrawlFrontier.lease_token == token).order_by(CrawlFrontier.id)
+    tasks = [Task(*row) for row in rows]
+    db.commit()  # end the read transaction; SQLite readers pin the WAL
+    return tasks
+
+
+def renew_leases(db: Session, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> int:
+    """Push the expiry of every lease `worker_id` still holds; returns how many."""
+    with serialized_write(db):
+        renewed = db.query(CrawlFrontier).filter(
+            CrawlFrontier.lease_owner == worker_id, CrawlFrontier.state == IN_FLIGHT
+        ).update({"lease_expires": time.time() + lease_seconds}, synchronize_session=False)
+        db.commit()
+    return renewed
+
+
+def release_tasks(db: Session, worker_id: str, tasks: List[Task], error: str) -> None:
+    """Give back the chapters of a batch this worker could not finish: queued
+    again, or failed once they have used up their attempts."""
+    now = time.time()
+    ids = [t.id for t in tasks]
+    held = and_(
+        CrawlFrontier.id.in_(ids),
+        CrawlFrontier.lease_owner == worker_id,
+        CrawlFrontier.state == IN_FLIGHT,
+    )
+    released = dict(_NO_LEASE, updated_at=now)
+    with serialized_write(db):
+        db.query(CrawlFrontier).filter(held, CrawlFrontier.attempts >= WORKER_MAX_ATTEMPTS).update(
+            dict(released, state=FAILED, last_error=error[:255]), synchronize_session=False
+        )
+        db.query(CrawlFrontier).filter(held).update(
+            dict(released, state=QUEUED), synchronize_session=False
+        )
+        db.commit()
+
+
+def queue_stats(db: Session) -> dict:
+    """Frontier rows per state, and the workers holding live leases."""
+    now = time.time()
+    states = dict(db.query(CrawlFrontier.state, func.count()).group_by(CrawlFrontier.state))
+    workers = db.query(CrawlFrontier.lease_owner, func.count()).filter(
+        CrawlFrontier.state == IN_FLIGHT, CrawlFrontier.lease_expires >= now
+    ).group_by(CrawlFrontier.lease_owner)
+    expired = db.query(func.count()).select_from(CrawlFrontier).filter(
+        CrawlFrontier.state == IN_FLIGHT, CrawlFrontier.lease_expires < now
+    ).scalar()
+    return {"states": states, "workers": dict(workers), "expired_leases": expired}
+
+
+# -- worker ---------------------------------------------------------------------------
+
+
+class IngestWorker:
+    """
+    Usage:
+        worker = IngestWorker(service_role_key)
+        worker.run()              # until stop(); drain=True: until the queue is empty
+
+    Single DB session for claims and writes (this thread); fetch threads only
+    use the ingestors' HTTP and parsing side.
+    """
+
+    def __init__(
+        self,
+        service_role_key: str,
+        concurrency: Optional[int] = None,
+        batch: Optional[int] = None,
+        lease_seconds: float = LEASE_SECONDS,
+        worker_id: Optional[str] = None,
+    ):
+        self.service_role_key = service_role_key
+        self.concurrency = max(1, concurrency or WORKER_CONCURRENCY)
+        self.batch = max(1, batch or 2 * self.concurrency)
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or worker_name()
+        self.done = 0
+        self.failed = 0
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Finish the current batch, then return from run()."""
+        self._stop.set()
+
+    def run(self, drain: bool = False) -> dict:
+        logger.info(f"[worker] {self.worker_id} started (concurrency={self.concurrency})")
+        heartbeat = threading.Thread(target=self._heartbeat, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+        db = IngestSessionLocal()
+        try:
+            with ThreadPoolExecutor(self.concurrency, thread_name_prefix="worker-fetch") as pool:
+                while not self._stop.is_set():
+                    tasks = claim_tasks(db, self.worker_id, self.batch, self.lease_seconds)
+                    if not tasks:
+                        if drain:
+                            break
+                        self._stop.wait(WORKER_POLL_SECONDS)
+                        continue
+                    self._process(db, pool, tasks)
+        finally:
+            self._stop.set()
+            db.close()
+            heartbeat.join()
+        logger.info(f"[worker] {self.worker_id} stopped: {self.done} done, {self.failed} failed")
+        return {"worker_id": self.worker_id, "done": self.done, "failed": self.failed}
+
+    def _process(self, db: Session, pool: ThreadPoolExecutor, tasks: List[Task]) -> None:
+        LEASES_HELD.inc(amount=len(tasks))
+        ingestors: Dict[int, object] = {}
+        writers: Dict[int, object] = {}
+        try:
+            for task in tasks:
+                if task.novel_id not in ingestors:
+                    ingestor = get_ingestor(db, self.service_role_key, task.url)
+                    ingestor.frontier = FrontierTracker(task.novel_id, lease_token=task.token)
+                    ingestors[task.novel_id] = ingestor
+                    writers[task.novel_id] = ingestor.writer_class(
+                        db, task.novel_id, report=ingestor.report_chapter, frontier=ingestor.frontier
+                    )
+            futures = {
+                pool.submit(ingestors[t.novel_id]._fetch_chapter_limited, t.url): t for t in tasks
+            }
+            for future in as_completed(futures):
+                task = futures[future]
+                title, body, error = future.result()
+                if error:
+                    ingestors[task.novel_id].report_chapter(task.url, error=error)
+                    self.failed += 1
+                    TASKS.inc("failed")
+                else:
+                    writers[task.novel_id].add(task.chapter_number, title, body, task.url)
+            for writer in writers.values():
+                writer.flush()
+                self.done += writer.written
+                TASKS.inc("done", amount=writer.written)
+                TASKS.inc("skipped", amount=len(writer.skipped))
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[worker] batch of {len(tasks)} failed: {e}")
+            release_tasks(db, self.worker_id, tasks, f"{type(e).__name__}: {e}")
+        finally:
+            LEASES_HELD.dec(amount=len(tasks))
+
+    def _heartbeat(self) -> None:
+        db = IngestSessionLocal()
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    renew_leases(db, self.worker_id, self.lease_seconds)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"[worker] heartbeat failed: {e}")
+        finally:
+            db.close()
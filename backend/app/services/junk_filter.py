@@ -0,0 +1,299 @@
+"""
+Junk and near-duplicate chapter detection.
+
+Sites like ixdzs serve placeholder ("內容更新中"), anti-scraping and ad pages
+in place of chapters that aren't up yet. Before a chapter reaches the DB,
+ChapterWriter runs it through a `ChapterScreen`:
+
+* the body is fingerprinted with a 64-bit simhash over 4-character shingles
+  of its normalized text (whitespace and punctuation dropped, numbers
+  folded; the first SIMHASH_CHARS characters), so pages that differ only in a chapter number or a line of noise
+  land within a few bits of each other;
+* junk: a short body (under JUNK_MAX_CHARS) containing a known placeholder
+  phrase, or matching a junk template. Templates are learned process-wide
+  when the same short page shows up in JUNK_MIN_NOVELS different novels,
+  and persisted in `junk_templates` so every worker knows them;
+* duplicate: within HAMMING_DISTANCE bits of another chapter of the same
+  novel, stored or earlier in this ingest.
+
+What happens next is policy. INGEST_JUNK_POLICY / INGEST_DUPLICATE_POLICY
+are "skip" (not stored, counted in the result's chapters_skipped; an update
+run fetches it again, by then hopefully with the real text), "flag" (stored, marked in
+`chapter_fingerprints.flag`) or "off". Defaults: skip junk, flag duplicates.
+
+Lookups use a banded index. The 64 bits are cut into HAMMING_DISTANCE + 1
+bands, and two fingerprints that close must agree on at least one whole
+band, so a lookup only compares against that band's bucket.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.novel import Chapter, ChapterFingerprint, JunkTemplate
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+SHINGLE = 4
+# only the start of a chapter is fingerprinted: enough to tell chapters apart
+# and to catch re-posts, and it bounds the cost per chapter
+SIMHASH_CHARS = int(os.getenv("JUNK_SIMHASH_CHARS", "2000"))
+HAMMING_DISTANCE = int(os.getenv("JUNK_HAMMING_DISTANCE", "3"))
+JUNK_MAX_CHARS = int(os.getenv("JUNK_MAX_CHARS", "1500"))
+JUNK_MIN_NOVELS = int(os.getenv("JUNK_MIN_NOVELS", "3"))
+# short bodies remembered for template learning, per process
+JUNK_CANDIDATES = int(os.getenv("JUNK_CANDIDATES", "100000"))
+
+POLICIES = ("skip", "flag", "off")
+JUNK_POLICY = os.getenv("INGEST_JUNK_POLICY", "skip")
+DUPLICATE_POLICY = os.getenv("INGEST_DUPLICATE_POLICY", "flag")
+SCREEN_ENABLED = not (JUNK_POLICY == DUPLICATE_POLICY == "off")
+
+# Placeholder / anti-scraping notices, traditional and simplified. Only
+# checked on short bodies: a real chapter may quote one in passing.
+JUNK_PHRASES = (
+    "正在手打中", "內容更新中", "内容更新中", "章節內容正在", "章节内容正在",
+    "請稍後再來", "请稍后再来", "稍後再看", "稍后再看", "防盜章節", "防盗章节",
+    "章節錯誤", "章节错误", "暫無內容", "暂无内容", "內容加載失敗", "内容加载失败",
+)
+
+CHAPTERS_SCREENED = counter(
+    "mtlhub_chapters_screened_total", "Chapters checked for junk / near-duplicates",
+    ["verdict", "action"],
+)
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_DIGITS_RE = re.compile(r"\d+")
+
+# -- fingerprints -----------------------------------------------------------------
+
+
+def normalize(text: str) -> str:
+    """Lowercase, every number folded to "0", whitespace / punctuation dropped."""
+    return _NON_WORD_RE.sub("", _DIGITS_RE.sub("0", text.lower()))
+
+
+# _BIT_TABLES[b] maps a byte to 1 if its bit b is set: counting a bit over
+# all shingle hashes is then one translate() + count() in C.
+_BIT_TABLES = [bytes((i >> b) & 1 for i in range(256)) for b in range(8)]
+
+
+def simhash(text: str) -> int:
+    """Unsigned 64-bit simhash of `text` (stable across processes)."""
+    data = normalize(text)[:SIMHASH_CHARS].encode("utf-32-le")  # 4 bytes per character
+    width = SHINGLE * 4
+    if len(data) <= width:
+        shingles = {data}
+    else:
+        shingles = {data[i:i + width] for i in range(0, len(data) - width + 4, 4)}
+    digests = b"".join(hashlib.blake2b(s, digest_size=8).digest() for s in shingles)
+    half = len(shingles) / 2
+    fp = 0
+    for k in range(8):
+        column = digests[k::8]  # byte k of every hash
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) > half:
+                fp |= 1 << (8 * k + bit)
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_db(fp: int) -> int:
+    """Unsigned fingerprint -> signed BIGINT."""
+    return fp - (1 << 64) if fp >= 1 << 63 else fp
+
+
+def from_db(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+V = TypeVar("V")
+
+
+class SimhashIndex(Generic[V]):
+    """Fingerprints (with a value each) searchable by Hamming distance."""
+
+    def __init__(self, distance: int = HAMMING_DISTANCE):
+        self.distance = distance
+        self.bands = distance + 1
+        self._width = 64 // self.bands
+        self._buckets: List[Dict[int, List[Tuple[int, V]]]] = [{} for _ in range(self.bands)]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _keys(self, fp: int) -> Iterator[Tuple[int, int]]:
+        for band in range(self.bands):
+            shift = band * self._width
+            bits = self._width if band < self.bands - 1 else 64 - shift
+            yield band, (fp >> shift) & ((1 << bits) - 1)
+
+    def add(self, fp: int, value: V) -> None:
+        for band, key in self._keys(fp):
+            self._buckets[band].setdefault(key, []).append((fp, value))
+        self._size += 1
+
+    def near(self, fp: int) -> Optional[Tuple[int, V]]:
+        """Some (fingerprint, value) within `distance` bits of `fp`, or None."""
+        for band, key in self._keys(fp):
+            for other, value in self._buckets[band].get(key, ()):
+                if hamming(fp, other) <= self.distance:
+                    return other, value
+        return None
+
+
+# -- global junk templates --------------------------------------------------------
+
+
+class JunkTemplates:
+    """Process-wide junk fingerprints: the `junk_templates` table, plus
+    short pages learned from repeating across novels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: SimhashIndex[str] = SimhashIndex()
+        self._candidates: SimhashIndex[set] = SimhashIndex()
+        self._loaded: set = set()
+        self._pending: List[int] = []
+
+    def load(self, db: Session) -> None:
+        """Read the stored templates once per database."""
+        key = str(db.get_bind().url)
+        if key in self._loaded:
+            return
+        rows = db.query(JunkTemplate.simhash, JunkTemplate.label).all()
+        with self._lock:
+            if key in self._loaded:
+                return
+            for value, label in rows:
+                fp = from_db(value)
+                if self._templates.near(fp) is None:
+                    self._templates.add(fp, label)
+            self._loaded.add(key)
+        if rows:
+            logger.info(f"[junk] {len(rows)} junk templates loaded")
+
+    def match(self, fp: int) -> Optional[str]:
+        with self._lock:
+            hit = self._templates.near(fp)
+        return hit[1] if hit else None
+
+    def observe(self, fp: int, novel_id: int) -> bool:
+        """Count a short page for `novel_id`; True once it has been seen in
+        JUNK_MIN_NOVELS novels (it then becomes a template)."""
+        with self._lock:
+            hit = self._candidates.near(fp)
+            if hit is None:
+                if len(self._candidates) < JUNK_CANDIDATES:
+                    self._candidates.add(fp, {novel_id})
+                return False
+            novels = hit[1]
+            novels.add(novel_id)
+            if len(novels) < JUNK_MIN_NOVELS:
+                return False
+            if self._templates.near(fp) is None:
+                self._templates.add(fp, "learned")
+                self._pending.append(fp)
+                logger.info(f"[junk] learned template {fp:016x} (seen in {len(novels)} novels)")
+            return True
+
+    def take_pending(self) -> List[int]:
+        """Learned templates not persisted yet."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+
+junk_templates = JunkTemplates()
+
+
+def persist_templates(db: Session) -> None:
+    """Store newly learned templates, in their own transaction; another
+    worker storing the same one first is fine."""
+    pending = junk_templates.take_pending()
+    if not pending:
+        return
+    values = [to_db(fp) for fp in pending]
+    known = {v for (v,) in db.query(JunkTemplate.simhash).filter(JunkTemplate.simhash.in_(values))}
+    db.bulk_insert_mappings(JunkTemplate, [
+        {"simhash": v, "label": "learned"} for v in values if v not in known
+    ])
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+# -- per-novel screen ---------------------------------------------------------------
+
+
+@dataclass
+class Verdict:
+    simhash: int
+    kind: Optional[str] = None  # None, "junk" or "duplicate"
+    reason: str = ""
+
+    @property
+    def action(self) -> str:
+        """One of "store", "flag", "skip"."""
+        if self.kind is None:
+            return "store"
+        policy = JUNK_POLICY if self.kind == "junk" else DUPLICATE_POLICY
+        return "store" if policy == "off" else policy
+
+
+class ChapterScreen:
+    """
+    Usage:
+        screen = ChapterScreen(db, novel_id)
+        verdict = screen.check(body, url)   # verdict.action: store / flag / skip
+
+    Knows the fingerprints of the novel's stored chapters and of every
+    chapter checked through it since.
+    """
+
+    def __init__(self, db: Session, novel_id: int):
+        self.novel_id = novel_id
+        self._novel: SimhashIndex[str] = SimhashIndex()
+        rows = db.query(ChapterFingerprint.simhash, Chapter.chapter_number).join(
+            Chapter, Chapter.id == ChapterFingerprint.chapter_id
+        ).filter(ChapterFingerprint.novel_id == novel_id)
+        for value, number in rows:
+            self._novel.add(from_db(value), f"chapter {number}")
+        junk_templates.load(db)
+
+    def check(self, body: str, url: str, chapter_number: Optional[int] = None) -> Verdict:
+        verdict = Verdict(simhash(body))
+        fp = verdict.simhash
+        if JUNK_POLICY != "off" and len(body) < JUNK_MAX_CHARS:
+            phrase = next((p for p in JUNK_PHRASES if p in body), None)
+            if phrase is not None:
+                verdict.kind, verdict.reason = "junk", f"placeholder text {phrase!r}"
+            elif junk_templates.match(fp) is not None:
+                verdict.kind, verdict.reason = "junk", "matches a junk template"
+            elif junk_templates.observe(fp, self.novel_id):
+                verdict.kind, verdict.reason = "junk", f"same page in {JUNK_MIN_NOVELS}+ novels"
+        if verdict.kind is None and DUPLICATE_POLICY != "off":
+            hit = self._novel.near(fp)
+            if hit is not None:
+                verdict.kind, verdict.reason = "duplicate", f"near-duplicate of {hit[1]}"
+
+        action = verdict.action
+        if action != "skip":
+            self._novel.add(fp, f"chapter {chapter_number}" if chapter_number is not None else url)
+        CHAPTERS_SCREENED.inc(verdict.kind or "ok", action)
+        if verdict.kind is not None:
+            logger.info(f"[junk] {url}: {verdict.kind} ({verdict.reason}) -> {action}")
+        return verdict
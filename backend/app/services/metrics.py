@@ -0,0 +1,238 @@
+"""
+Minimal Prometheus-style metrics, rendered in the text exposition format at
+`GET /metrics`.
+
+Counters, gauges and histograms keep one small state object per label
+combination behind a single lock each; an update is a dict lookup plus a
+few additions, cheap enough to leave on the ingest hot path. Metrics are
+registered at import time in this module so every instrumented call site
+shares one `REGISTRY`.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, *labels: str, value: float) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_fmt_labels(self.label_names, key)} {_fmt_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[idx] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_fmt_labels(self.label_names, key, le)} {cumulative}"
+                )
+            labels = _fmt_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_fmt_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labels))
+
+
+def histogram(
+    name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+
+# -- ingest metrics -------------------------------------------------------------
+
+HTTP_FETCH_SECONDS = histogram(
+    "mtlhub_http_fetch_seconds", "Page download latency", ["domain"]
+)
+HTTP_BYTES = counter(
+    "mtlhub_http_downloaded_bytes_total", "Decoded response bytes downloaded", ["domain"]
+)
+HTTP_RETRIES = counter(
+    "mtlhub_http_retries_total", "Page fetches retried after an error", ["domain"]
+)
+PARSE_SECONDS = histogram(
+    "mtlhub_html_parse_seconds", "HTML parse time", ["backend"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+DB_FLUSH_SECONDS = histogram(
+    "mtlhub_db_flush_seconds", "Chapter batch insert time (before commit)"
+)
+DB_COMMIT_SECONDS = histogram(
+    "mtlhub_db_commit_seconds", "Chapter batch commit time"
+)
+CHAPTERS_INGESTED = counter(
+    "mtlhub_chapters_ingested_total", "Chapters stored by ingestors"
+)
+CHAPTERS_FAILED = counter(
+    "mtlhub_chapters_failed_total", "Chapters that could not be fetched or stored"
+)
+ACTIVE_JOBS = gauge(
+    "mtlhub_ingest_jobs_active", "Ingest jobs currently running"
+)
+
+# -- database metrics ---------------------------------------------------------
+
+DB_POOL_CHECKED_OUT = gauge(
+    "mtlhub_db_pool_checked_out", "Pooled connections currently in use", ["pool"]
+)
+DB_POOL_OPEN = gauge(
+    "mtlhub_db_pool_connections", "Open DB connections (idle + in use)", ["pool"]
+)
+DB_POOL_CAPACITY = gauge(
+    "mtlhub_db_pool_capacity", "Configured pool_size + max_overflow", ["pool"]
+)
+DB_WRITE_QUEUE = gauge(
+    "mtlhub_db_write_queue", "Ingest writers waiting for the SQLite write slot"
+)
+DB_WRITE_WAIT_SECONDS = histogram(
+    "mtlhub_db_write_wait_seconds", "Time an ingest writer waited for the SQLite write slot"
+)
@@ -0,0 +1,283 @@
+"""
+Whole-novel downloads (EPUB / plain text), streamed.
+
+An export walks the novel's chapters in `chapter_number` order with a
+server-side cursor (`yield_per`), decompressing one body at a time, and
+hands the output to the response in pieces as it is produced: text chapter
+by chapter, EPUB through a zipfile writing to a drainable buffer. Memory stays
+flat however long the novel is: chapter text is never held beyond its own
+piece, and for EPUB only a few hundred bytes per chapter (the zip directory
+entry and the title, for the navigation files) are kept until the end.
+
+Finished exports are kept under EXPORT_CACHE_DIR, named after the novel's
+revision: a hash of its metadata and of each chapter's number, title and
+content hash (read without touching bodies). Any ingest, update or
+re-extract changes the revision, so a stale file is never served; it is
+deleted when the next export of that novel is stored. Set
+EXPORT_CACHE_DIR to an empty string to turn the cache off.
+"""
+
+import glob
+import hashlib
+import html
+import io
+import logging
+import os
+import time
+import uuid
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.novel import Chapter, ChapterBody, Novel
+from .content_store import decompress_text
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("epub", "txt")
+MEDIA_TYPES = {"epub": "application/epub+zip", "txt": "text/plain; charset=utf-8"}
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "./export_cache")
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", "50"))  # rows per cursor fetch
+# bump when the output layout changes, so cached files are rebuilt
+EXPORT_VERSION = 2
+
+EXPORTS = counter("mtlhub_exports_total", "Novel exports served", ["format", "source"])
+
+
+def export_revision(db: Session, novel: Novel) -> str:
+    """Short hash that changes whenever the novel or any chapter does."""
+    h = hashlib.sha256(f"v{EXPORT_VERSION}".encode())
+    for value in (novel.title, novel.author, novel.description, novel.cover_url):
+        h.update(b"\x1f" + (value or "").encode("utf-8"))
+    rows = db.query(
+        Chapter.chapter_number,
+        Chapter.title,
+        Chapter.content_hash,
+        func.length(Chapter.original_content),  # legacy rows without a hash
+    ).filter(Chapter.novel_id == novel.id).order_by(Chapter.chapter_number, Chapter.id)
+    for row in rows.yield_per(1000):
+        h.update(b"\x1e" + "\x1f".join("" if v is None else str(v) for v in row).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def iter_chapters(db: Session, novel_id: int) -> Iterator[Tuple[int, str, str]]:
+    """(chapter_number, title, text) in reading order, one body in memory at a time."""
+    rows = db.query(
+        Chapter.chapter_number, Chapter.title, Chapter.original_content, ChapterBody.data
+    ).outerjoin(
+        ChapterBody, ChapterBody.hash == Chapter.content_hash
+    ).filter(Chapter.novel_id == novel_id).order_by(Chapter.chapter_number, Chapter.id)
+    for number, title, legacy, data in rows.yield_per(EXPORT_BATCH):
+        text = decompress_text(data) if data is not None else (legacy or "")
+        yield number, title or f"Chapter {number}", text
+
+
+# -- txt --------------------------------------------------------------------------
+
+
+def render_txt(db: Session, novel: Novel) -> Iterator[bytes]:
+    head = [novel.title]
+    if novel.author:
+        head.append(f"Author: {novel.author}")
+    if novel.description:
+        head += ["", novel.description.strip()]
+    yield ("\n".join(head) + "\n\n").encode("utf-8")
+    for _, title, text in iter_chapters(db, novel.id):
+        yield f"\n{title}\n\n{text.strip()}\n".encode("utf-8")
+
+
+# -- epub ---------------------------------------------------------------------------
+
+
+class _Drain(io.RawIOBase):
+    """Write-only, unseekable sink for ZipFile; `take()` hands over what was
+    written since the last call."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _write_stored(sink: _Drain, name: str, data: bytes) -> zipfile.ZipInfo:
+    """Write an uncompressed entry (local header + data) to `sink` by hand.
+
+    ZipFile on an unseekable stream gives every entry a data descriptor
+    (flag bit 3), which streaming readers such as Java's ZipInputStream
+    refuse on STORED entries. Here CRC and size go in the header up front.
+    The returned ZipInfo must be added to the ZipFile's central directory."""
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    info.external_attr = 0o600 << 16
+    info.file_size = info.compress_size = len(data)
+    info.CRC = zlib.crc32(data)
+    info.header_offset = sink.tell()
+    sink.write(info.FileHeader())
+    sink.write(data)
+    return info
+
+
+_CONTAINER = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+_XHTML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><meta charset="utf-8"/><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _paragraphs(text: str) -> str:
+    return "\n".join(f"<p>{html.escape(line.strip())}</p>" for line in text.splitlines() if line.strip())
+
+
+def _chapter_xhtml(title: str, text: str) -> str:
+    t = html.escape(title)
+    return _XHTML.format(title=t, body=f"<h2>{t}</h2>\n{_paragraphs(text)}")
+
+
+def _nav_xhtml(novel: Novel, toc: List[Tuple[str, str]]) -> str:
+    items = "\n".join(f'<li><a href="{name}">{html.escape(title)}</a></li>' for name, title in toc)
+    body = f'<nav epub:type="toc" id="toc"><h1>{html.escape(novel.title)}</h1>\n<ol>\n{items}\n</ol></nav>'
+    return _XHTML.format(title=html.escape(novel.title), body=body)
+
+
+def _content_opf(novel: Novel, revision: str, toc: List[Tuple[str, str]]) -> str:
+    modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    meta = [
+        f'<dc:identifier id="book-id">urn:mtlhub:novel:{novel.id}:{revision}</dc:identifier>',
+        f"<dc:title>{html.escape(novel.title)}</dc:title>",
+        "<dc:language>zh</dc:language>",
+        f'<meta property="dcterms:modified">{modified}</meta>',
+    ]
+    if novel.author:
+        meta.append(f"<dc:creator>{html.escape(novel.author)}</dc:creator>")
+    if novel.description:
+        meta.append(f"<dc:description>{html.escape(novel.description)}</dc:description>")
+    manifest = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+    manifest += [
+        f'<item id="c{i}" href="{name}" media-type="application/xhtml+xml"/>' for i, (name, _) in enumerate(toc)
+    ]
+    spine = [f'<itemref idref="c{i}"/>' for i in range(len(toc))]
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n' + "\n".join(meta) + "\n</metadata>\n"
+        "<manifest>\n" + "\n".join(manifest) + "\n</manifest>\n"
+        "<spine>\n" + "\n".join(spine) + "\n</spine>\n"
+        "</package>\n"
+    )
+
+
+def render_epub(db: Session, novel: Novel, revision: str = "") -> Iterator[bytes]:
+    """EPUB 3, yielded as the zip is written (one chapter per piece)."""
+    sink = _Drain()
+    toc: List[Tuple[str, str]] = []
+    # the mimetype entry must come first, uncompressed and descriptor-free
+    mimetype = _write_stored(sink, "mimetype", MEDIA_TYPES["epub"].encode("ascii"))
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.filelist.append(mimetype)
+        zf.NameToInfo[mimetype.filename] = mimetype
+        zf.writestr("META-INF/container.xml", _CONTAINER)
+        for i, (_, title, text) in enumerate(iter_chapters(db, novel.id)):
+            name = f"c{i:05d}.xhtml"
+            zf.writestr(f"OEBPS/{name}", _chapter_xhtml(title, text))
+            toc.append((name, title))
+            yield sink.take()
+        zf.writestr("OEBPS/nav.xhtml", _nav_xhtml(novel, toc))
+        zf.writestr("OEBPS/content.opf", _content_opf(novel, revision, toc))
+    yield sink.take()
+
+
+def render(db: Session, novel: Novel, fmt: str, revision: str = "") -> Iterator[bytes]:
+    if fmt == "epub":
+        return render_epub(db, novel, revision)
+    if fmt == "txt":
+        return render_txt(db, novel)
+    raise ValueError(f"unknown export format {fmt!r}")
+
+
+# -- disk cache -----------------------------------------------------------------------
+
+
+def cached_export(novel_id: int, fmt: str, revision: str) -> Optional[str]:
+    """Path of the finished export for this revision, if there is one."""
+    if not EXPORT_CACHE_DIR:
+        return None
+    path = os.path.join(EXPORT_CACHE_DIR, f"novel-{novel_id}-{revision}.{fmt}")
+    return path if os.path.exists(path) else None
+
+
+def stream_export(db: Session, novel: Novel, fmt: str, revision: str) -> Iterator[bytes]:
+    """Render `novel`, copying the output into the cache as it streams. The
+    file only takes its final name once complete, so an interrupted
+    download never leaves a truncated export behind. `revision` is the one
+    the caller worked out (and sent as the ETag), possibly in another
+    session: if the novel changes before or while this renders, the output
+    is still streamed but not cached under it."""
+    if not EXPORT_CACHE_DIR:
+        EXPORTS.inc(fmt, "rendered")
+        yield from render(db, novel, fmt, revision)
+        return
+    current = export_revision(db, novel) == revision
+
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    final = os.path.join(EXPORT_CACHE_DIR, f"novel-{novel.id}-{revision}.{fmt}")
+    part = f"{final}.{uuid.uuid4().hex[:8]}.part"
+    out = open(part, "wb")
+    try:
+        for piece in render(db, novel, fmt, revision):
+            out.write(piece)
+            yield piece
+        out.close()
+        db.refresh(novel)
+        current = current and export_revision(db, novel) == revision
+        if not current:
+            os.remove(part)
+            EXPORTS.inc(fmt, "rendered")
+            logger.info(f"[export] novel_id={novel.id} changed while exporting, not cached")
+            return
+        os.replace(part, final)
+    except BaseException:  # including GeneratorExit when the client goes away
+        out.close()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    EXPORTS.inc(fmt, "rendered")
+    logger.info(f"[export] novel_id={novel.id} {fmt} stored as {os.path.basename(final)}")
+
+    # older revisions of this export are stale now
+    for old in glob.glob(os.path.join(EXPORT_CACHE_DIR, f"novel-{novel.id}-*.{fmt}")):
+        if old != final:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
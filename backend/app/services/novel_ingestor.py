@@ -1,48 +1,167 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from urllib.parse import urlparse
-from typing import Union
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 from pydantic import HttpUrl
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
+from .charset import decode_page
+from .html_parser import parse_html
+from .http_client import get_http_client
+from .metrics import CHAPTERS_FAILED, CHAPTERS_INGESTED
+
 logger = logging.getLogger(__name__)
 
-def get_ingestor(db: Session, service_role_key: str, url: Union[str, HttpUrl]):
+# Chapter fetch parallelism. DEFAULT_CONCURRENCY applies per ingest when the
+# caller doesn't pick one; PER_HOST_LIMIT caps requests in flight to a single
+# host across *all* running ingests so parallel jobs can't gang up on a site.
+DEFAULT_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "1"))
+PER_HOST_LIMIT = int(os.getenv("INGEST_PER_HOST_LIMIT", "4"))
+
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_host_limits_lock = threading.Lock()
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Process-wide semaphore bounding concurrent requests to the URL's host."""
+    host = urlparse(url).netloc.lower()
+    with _host_limits_lock:
+        sem = _host_limits.get(host)
+        if sem is None:
+            sem = _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return sem
+
+
+def get_ingestor(
+    db: Session,
+    service_role_key: str,
+    url: Union[str, HttpUrl],
+    concurrency: Optional[int] = None,
+    progress=None,
+):
     """Return the correct ingestor based on the URL's domain.
-    Dynamically imports domain-specific classes to avoid circular imports.
+    Sites are declared in site_registry (imported here to avoid circular imports).
     """
-    hostname = urlparse(str(url)).netloc.lower()  # ✅ FIXED: convert HttpUrl to str
-    if hostname.endswith("ixdzs.tw"):
-        from .ixdzs_ingestor import IxdzsIngestor
-        return IxdzsIngestor(db, service_role_key)
-    # add more domains here with similar dynamic imports...
-    return NovelIngestor(db, service_role_key)
+    from .site_registry import ingestor_class_for
+
+    hostname = urlparse(str(url)).hostname or ""
+    cls = ingestor_class_for(hostname) or NovelIngestor
+    return cls(db, service_role_key, concurrency=concurrency, progress=progress)
+
+
+@dataclass
+class IngestPlan:
+    """A stored novel row plus the (chapter_number, url) pairs still to fetch."""
+
+    novel_id: int
+    todo: List[Tuple[int, str]]
+
+
+def ingest_result(novel_id: int, written: int, failed: List[str], skipped: int = 0) -> dict:
+    """Result dict of a finished chapter loop; any failed chapter makes it
+    "partial" so callers never mistake a gappy ingest for a complete one.
+    `skipped`: chapters the junk screen kept out (see junk_filter); they
+    aren't stored either, so an update run re-checks them."""
+    result = {
+        "status": "partial" if failed else "success",
+        "novel_id": novel_id,
+        "chapters_ingested": written,
+        "chapters_failed": len(failed),
+        "chapters_skipped": skipped,
+        "failed_urls": failed,
+    }
+    if failed:
+        result["message"] = f"{len(failed)} chapters failed; re-run with update=True to retry them"
+    elif skipped:
+        result["message"] = f"{skipped} junk / duplicate chapters skipped"
+    return result
+
 
 class NovelIngestor:
     """Generic ingestor for unsupported domains.
     Handles metadata extraction, chapter loops, DB writes, and error handling.
     """
 
-    def __init__(self, db: Session, service_role_key: str):
+    accept_language = "zh-TW,zh;q=0.8,en-US;q=0.5,en;q=0.3"
+    # tried when a page declares no charset, before full detection
+    default_encoding: Optional[str] = None
+
+    def __init__(
+        self,
+        db: Session,
+        service_role_key: str,
+        concurrency: Optional[int] = None,
+        progress=None,
+    ):
         self.db = db
         self.service_role_key = service_role_key
+        self.concurrency = max(1, concurrency or DEFAULT_CONCURRENCY)
+        # Optional progress sink (an ingest_jobs.IngestJob); None for plain calls
+        self.progress = progress
+        # crawl_frontier.FrontierTracker of the novel being ingested (set by
+        # prepare_novel); None when nothing is tracked
+        self.frontier = None
+
+    def report_total(self, total: int) -> None:
+        if self.progress is not None:
+            self.progress.set_total(total)
 
-    def fetch_html(self, url: str) -> BeautifulSoup:
+    def report_novel(self, novel_id: int) -> None:
+        if self.progress is not None:
+            self.progress.set_novel(novel_id)
+
+    def report_fetching(self, url: str) -> None:
+        if self.frontier is not None:
+            self.frontier.started(url)
+
+    def report_chapter(
+        self, url: str, error: Optional[str] = None, skipped: Optional[str] = None
+    ) -> None:
+        """A chapter is stored, failed (`error`) or kept out by the junk
+        screen (`skipped`: the reason; counted by the screen's own metric)."""
+        if skipped is not None:
+            if self.frontier is not None:
+                self.frontier.skipped(url, skipped)
+            if self.progress is not None:
+                self.progress.chapter_skipped()
+            return
+        if error is None:
+            CHAPTERS_INGESTED.inc()
+        else:
+            CHAPTERS_FAILED.inc()
+            if self.frontier is not None:
+                self.frontier.failed(url, error)
+        if self.progress is None:
+            return
+        if error is None:
+            self.progress.chapter_done()
+        else:
+            self.progress.chapter_failed(url, error)
+
+    def fetch_text(self, url: str) -> str:
+        """Download a page and return it decoded, without parsing it."""
         headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Accept-Language": "zh-TW,zh;q=0.8,en-US;q=0.5,en;q=0.3",
+            "Accept-Language": self.accept_language,
         }
         try:
-            resp = requests.get(url, headers=headers, timeout=30)
+            resp = get_http_client().get(url, headers=headers)
             resp.raise_for_status()
-            resp.encoding = resp.apparent_encoding or "utf-8"
-            return BeautifulSoup(resp.text, "html5lib")
+            return decode_page(
+                resp.content, resp.url or url, resp.headers.get("Content-Type"), self.default_encoding
+            )
         except Exception as e:
             logger.error(f"fetch_html failed for {url}: {e}")
             raise
 
+    def fetch_html(self, url: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        return parse_html(self.fetch_text(url), parse_only=parse_only)
+
     def extract_metadata(self, soup: BeautifulSoup, url: str) -> dict:
         # Generic metadata via OpenGraph
         meta_title = soup.find("meta", property="og:title")
@@ -55,20 +174,111 @@ class NovelIngestor:
             "source_url": url[:500],
         }
 
+    def get_chapter_urls(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+        # A generic page gives no reliable way to find chapter links
+        return []
+
     def fetch_chapter_content(self, url: str) -> tuple[str, str]:
+        return self.parse_chapter(self.fetch_text(url), url)
+
+    def parse_chapter(self, html: str, url: str) -> Tuple[str, str]:
         # Generic fallback: grab all <p> text
-        soup = self.fetch_html(url)
+        soup = parse_html(html, parse_only=SoupStrainer("p"))
         paras = soup.find_all("p")
         text = "\n".join(p.get_text(strip=True) for p in paras)
         return "Chapter", text
 
-    def ingest_novel(self, url: str, limit: int = 5) -> dict:
+    def _fetch_chapter_limited(self, url: str) -> Tuple[str, str, Optional[str]]:
+        """(title, body, error): a failed or empty fetch comes back with the
+        reason instead of raising, so one bad page can't abort the ingest."""
+        from .ingest_pipeline import parse_chapter
+
+        self.report_fetching(url)
+        try:
+            # the host slot is only held for the download; parsing goes to
+            # the parse pool when there is one
+            with _host_semaphore(url):
+                html = self.fetch_text(url)
+            title, body, _ = parse_chapter(self, html, url)
+        except Exception as e:
+            logger.error(f"chapter fetch failed for {url}: {e}")
+            return "", "", f"{type(e).__name__}: {e}"
+        if not body:
+            return title, "", "empty chapter body"
+        return title, body, None
+
+    def known_chapter_urls(self, novel_id: int) -> Set[str]:
+        """Source URLs of the chapters already stored for a novel."""
+        from app.models.novel import Chapter
+
+        rows = self.db.query(Chapter.source_url).filter(Chapter.novel_id == novel_id)
+        return {u for (u,) in rows}
+
+    def fetch_chapters(
+        self, chapters: List[Tuple[int, str]]
+    ) -> Iterator[Tuple[int, str, str, str, Optional[str]]]:
+        """Yield (order, url, title, body, error) for each (order, url) pair, in
+        list order. `error` is None on success; otherwise body is empty and the
+        caller must report the chapter as failed.
+
+        With concurrency > 1 chapters are fetched on a thread pool. Only a small
+        window of fetches is kept in flight so results are handed back in order
+        without buffering the whole novel in memory. Only the fetching runs on
+        worker threads; the caller keeps sole use of the DB session.
+        """
+        if self.concurrency <= 1:
+            for idx, url in chapters:
+                title, body, error = self._fetch_chapter_limited(url)
+                yield idx, url, title, body, error
+            return
+
+        window = self.concurrency * 2
+        todo = iter(chapters)
+        pending = deque()
+        pool = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="chapter-fetch"
+        )
+        try:
+            for idx, url in todo:
+                pending.append((idx, url, pool.submit(self._fetch_chapter_limited, url)))
+                if len(pending) >= window:
+                    break
+            while pending:
+                idx, url, fut = pending.popleft()
+                title, body, error = fut.result()
+                yield idx, url, title, body, error
+                nxt = next(todo, None)
+                if nxt is not None:
+                    n_idx, n_url = nxt
+                    pending.append(
+                        (n_idx, n_url, pool.submit(self._fetch_chapter_limited, n_url))
+                    )
+        finally:
+            # Caller may stop early (e.g. `limit` reached) – drop queued work.
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def prepare_novel(
+        self, url: str, limit: Optional[int] = None, update: bool = False
+    ) -> Union[IngestPlan, dict]:
+        """Create / refresh the novel row and list the chapters still missing.
+
+        Returns an IngestPlan for the chapter loop, or a finished result dict
+        when there's nothing to fetch. The generic ingestor can't list
+        chapters, so it runs its whole ingest here.
+        """
+        return self.ingest_novel(url, limit=limit, update=update)
+
+    def ingest_novel(self, url: str, limit: int = 5, update: bool = False) -> dict:
         """Main orchestration:
         1) fetch_html listing page
         2) extract_metadata
         3) loop chapters (calls fetch_chapter_content)
         4) write Novel + Chapter to DB
         5) commit & return status dict
+
+        `update` asks subclasses that can list chapters to fetch only the ones
+        not stored yet instead of returning "exists"; the generic ingestor
+        can't list chapters, so it is ignored here.
         """
         from app.models.novel import Novel, Chapter
 
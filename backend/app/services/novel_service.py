@@ -1,12 +1,15 @@
 # backend/app/services/novel_service.py
 
 from sqlalchemy.orm import Session
-from app.models.novel import Novel
+from app.models.novel import Novel, NovelStats
 from app.schemas.novel import NovelCreate
+from app.services.search_index import index_novel
 
 def create_novel(db: Session, novel_data: NovelCreate) -> Novel:
     novel = Novel(**novel_data.dict())
     db.add(novel)
+    db.flush()
+    index_novel(db, novel.id, novel.title, novel.author, novel.description)
     db.commit()
     db.refresh(novel)
     return novel
@@ -17,5 +20,28 @@ def get_novel(db: Session, novel_id: int) -> Novel | None:
 def get_novel_by_url(db: Session, source_url: str) -> Novel | None:
     return db.query(Novel).filter(Novel.source_url == source_url).first()
 
-def list_novels(db: Session) -> list[Novel]:
-    return db.query(Novel).order_by(Novel.id.desc()).all()
+def list_novels(
+    db: Session,
+    limit: int = 50,
+    before: int | None = None,
+    author: str | None = None,
+    status: str | None = None,
+) -> tuple[list[tuple[Novel, NovelStats | None]], int | None]:
+    """
+    One catalog page, newest first: (novel, stats) pairs plus the cursor of
+    the next page (None on the last one). Keyset pagination: `before` is the
+    last id of the previous page, so any page is an index range scan
+    (ix_novels_author_id / ix_novels_status_id when filtered) of `limit` rows
+    however deep it is.
+    """
+    query = db.query(Novel, NovelStats).outerjoin(NovelStats, NovelStats.novel_id == Novel.id)
+    if author is not None:
+        query = query.filter(Novel.author == author)
+    if status is not None:
+        query = query.filter(Novel.status == status)
+    if before is not None:
+        query = query.filter(Novel.id < before)
+    rows = query.order_by(Novel.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][0].id
+    return rows, None
@@ -0,0 +1,110 @@
+"""
+Per-novel catalog aggregates, maintained incrementally.
+
+`novel_stats` holds, per novel, how many chapters are actually stored, their
+total length in characters and when the last one was written. Nothing ever
+counts over `chapters` to fill it:
+
+* a row is inserted with every new Novel (mapper event in app.models.novel,
+  same flush);
+* ChapterWriter adds each batch's chapters and characters in the batch's
+  own transaction (`add_chapters`), as do create_chapter and, for the
+  change in length, the re-extract rewriter. Since every chapter write
+  moves `last_chapter_at`, the chapter cache uses it as the novel's version.
+
+A novel stored before this table existed has no row; `ensure_novel_stats`
+fills those in at startup (decompressing their bodies once), and
+`add_chapters` recounts one if it still finds none. The same function adds
+the `novels.status` column to databases created without it, set from the
+"狀態：" part of the stored descriptions.
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.novel import Chapter, ChapterBody, Novel, NovelStats
+from .content_store import decompress_text
+
+logger = logging.getLogger(__name__)
+
+# listing labels -> Novel.status
+STATUS_LABELS = {
+    "連載中": "ongoing",
+    "连载中": "ongoing",
+    "已完結": "completed",
+    "已完结": "completed",
+    "完本": "completed",
+}
+STATUSES = ("ongoing", "completed")
+
+
+def normalize_status(label: Optional[str]) -> Optional[str]:
+    return STATUS_LABELS.get((label or "").strip())
+
+
+def count_chapters(db: Session, novel_id: int) -> Dict:
+    """novel_stats row for `novel_id`, counted from its stored chapters."""
+    chapters = chars = 0
+    rows = db.query(Chapter.original_content, ChapterBody.data).outerjoin(
+        ChapterBody, ChapterBody.hash == Chapter.content_hash
+    ).filter(Chapter.novel_id == novel_id)
+    for legacy, data in rows.yield_per(200):
+        chapters += 1
+        chars += len(decompress_text(data) if data is not None else (legacy or ""))
+    return {"novel_id": novel_id, "chapter_count": chapters, "total_chars": chars,
+            "last_chapter_at": None}
+
+
+def add_chapters(db: Session, novel_id: int, chapters: int, chars: int) -> None:
+    """Count `chapters` more chapters (`chars` characters, may be negative)
+    for the novel, in the caller's transaction."""
+    updated = db.query(NovelStats).filter(NovelStats.novel_id == novel_id).update(
+        {
+            "chapter_count": NovelStats.chapter_count + chapters,
+            "total_chars": NovelStats.total_chars + chars,
+            "last_chapter_at": time.time(),
+        },
+        synchronize_session=False,
+    )
+    if not updated:
+        # stored before novel_stats existed: count everything once (the
+        # caller's new chapters are already visible in this transaction)
+        row = count_chapters(db, novel_id)
+        row["last_chapter_at"] = time.time()
+        db.bulk_insert_mappings(NovelStats, [row])
+
+
+def ensure_novel_stats(engine: Engine) -> None:
+    """Bring an existing database up to the catalog schema (idempotent):
+    the novels.status column and its indexes, and a stats row per novel."""
+    columns = {c["name"] for c in inspect(engine).get_columns("novels")}
+    if "status" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE novels ADD COLUMN status VARCHAR(16)"))
+            for label, status in STATUS_LABELS.items():
+                conn.execute(
+                    text("UPDATE novels SET status = :status WHERE status IS NULL"
+                         " AND description LIKE :pattern"),
+                    {"status": status, "pattern": f"%狀態：{label}%"},
+                )
+        logger.info("[catalog] added novels.status")
+    for index in Novel.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    db = Session(bind=engine)
+    try:
+        missing = [novel_id for (novel_id,) in db.query(Novel.id).outerjoin(
+            NovelStats, NovelStats.novel_id == Novel.id
+        ).filter(NovelStats.novel_id.is_(None))]
+        for novel_id in missing:
+            db.bulk_insert_mappings(NovelStats, [count_chapters(db, novel_id)])
+            db.commit()
+        if missing:
+            logger.info(f"[catalog] counted chapters of {len(missing)} novels into novel_stats")
+    finally:
+        db.close()
@@ -0,0 +1,337 @@
+"""
+Append-only archive of raw fetched pages, with a replay mode.
+
+Every page the HTTP clients download successfully (status < 400) is
+appended, byte for byte as the server sent it (after transfer decoding), to
+WARC/1.0 segment files under PAGE_ARCHIVE_DIR:
+
+    page_archive/
+        pages-20261016-101500-4242-0.warc.gz   one gzip member per record
+        index.sqlite3                          (url, fetched_at) -> segment, offset
+
+Each record is its own gzip member, so a lookup reads and inflates just that
+record; segments roll over at PAGE_ARCHIVE_SEGMENT_MB and are never
+rewritten. Each process writes its own segments, and only the index is
+shared. Standard WARC tools can read the segments too. Set PAGE_ARCHIVE_DIR
+to an empty string to turn archiving off.
+
+`replay()` swaps the process-wide HTTP clients (sync and async) for ones
+that answer from the archive: the latest capture of each URL, or the latest
+one at or before `as_of`. Any ingestor then runs unchanged against stored
+pages, with no pacing, retries or network, so re-extracting is bound by
+parsing. A URL that was never archived raises PageNotArchived.
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("PAGE_ARCHIVE_DIR", "./page_archive")
+SEGMENT_BYTES = int(os.getenv("PAGE_ARCHIVE_SEGMENT_MB", "256")) * 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+ARCHIVE_BYTES = counter(
+    "mtlhub_archive_bytes_total", "Compressed bytes appended to the page archive"
+)
+REPLAY_LOOKUPS = counter(
+    "mtlhub_archive_replay_total", "Pages served from the archive in replay mode", ["result"]
+)
+
+# hop-by-hop or describing the wire encoding, which the stored body no longer has
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class PageNotArchived(LookupError):
+    """Replay asked for a URL the archive has no capture of."""
+
+    def __init__(self, url: str):
+        super().__init__(f"no archived copy of {url}")
+        self.url = url
+
+
+@dataclass
+class ArchivedPage:
+    url: str
+    fetched_at: float
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+
+
+def _warc_record(url: str, fetched_at: float, status: int, headers: Mapping[str, str], content: bytes) -> bytes:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ""
+    http_head = [f"HTTP/1.1 {status} {reason}"]
+    http_head += [f"{k}: {v}" for k, v in headers.items() if k.lower() not in _DROP_HEADERS]
+    http_head.append(f"Content-Length: {len(content)}")
+    block = ("\r\n".join(http_head) + "\r\n\r\n").encode("latin-1", "replace") + content
+    date = datetime.fromtimestamp(fetched_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    warc_head = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {date}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(block)}\r\n"
+        "\r\n"
+    )
+    return warc_head.encode("utf-8") + block + b"\r\n\r\n"
+
+
+def _parse_record(data: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """(status, headers, body) from one inflated WARC response record."""
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    length = 0
+    for line in warc_head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    block = rest[:length]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    lines = http_head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    return status, headers, body
+
+
+class PageArchive:
+    """
+    Usage:
+        archive = PageArchive("./page_archive")
+        archive.append(url, 200, resp.headers, resp.content)
+        page = archive.get(url)            # latest capture
+        page = archive.get(url, as_of=ts)  # latest capture at/before ts
+    """
+
+    def __init__(self, root: str, segment_bytes: int = SEGMENT_BYTES):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,  # autocommit: one row per record
+            timeout=30,
+        )
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT NOT NULL, fetched_at REAL NOT NULL, status INTEGER NOT NULL,"
+            " segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._index.execute("CREATE INDEX IF NOT EXISTS pages_url_time ON pages (url, fetched_at)")
+        self._out = None
+        self._segment: Optional[str] = None
+        self._segment_seq = 0
+        self._readers: Dict[str, int] = {}
+
+    # -- writing ------------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        if self._out is not None:
+            self._out.close()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        self._segment = f"pages-{stamp}-{os.getpid()}-{self._segment_seq}.warc.gz"
+        self._segment_seq += 1
+        self._out = open(os.path.join(self.root, self._segment), "ab")
+        logger.info(f"[archive] writing {self._segment}")
+
+    def append(
+        self,
+        url: str,
+        status: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        fetched_at = fetched_at or time.time()
+        blob = gzip.compress(
+            _warc_record(url, fetched_at, status, headers, content), compresslevel=COMPRESSION_LEVEL
+        )
+        with self._lock:
+            if self._out is None or self._out.tell() + len(blob) > self.segment_bytes:
+                self._open_segment()
+            offset = self._out.tell()
+            self._out.write(blob)
+            self._out.flush()
+            self._index.execute(
+                "INSERT INTO pages (url, fetched_at, status, segment, offset, length)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, fetched_at, status, self._segment, offset, len(blob)),
+            )
+        ARCHIVE_BYTES.inc(amount=len(blob))
+
+    # -- reading ------------------------------------------------------------
+
+    def _fd(self, segment: str) -> int:
+        fd = self._readers.get(segment)
+        if fd is None:
+            with self._lock:
+                fd = self._readers.get(segment)
+                if fd is None:
+                    fd = self._readers[segment] = os.open(os.path.join(self.root, segment), os.O_RDONLY)
+        return fd
+
+    def get(self, url: str, as_of: Optional[float] = None) -> ArchivedPage:
+        sql = "SELECT fetched_at, segment, offset, length FROM pages WHERE url = ?"
+        params: tuple = (url,)
+        if as_of is not None:
+            sql += " AND fetched_at <= ?"
+            params += (as_of,)
+        with self._lock:
+            row = self._index.execute(sql + " ORDER BY fetched_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            raise PageNotArchived(url)
+        fetched_at, segment, offset, length = row
+        # pread: no shared file position, so replay threads read in parallel
+        data = zlib.decompress(os.pread(self._fd(segment), length, offset), 31)
+        status, headers, body = _parse_record(data)
+        return ArchivedPage(url, fetched_at, status, headers, body)
+
+    def captures(self, url: str) -> List[Tuple[float, int]]:
+        """(fetched_at, status) of every capture of `url`, oldest first."""
+        with self._lock:
+            return self._index.execute(
+                "SELECT fetched_at, status FROM pages WHERE url = ? ORDER BY fetched_at", (url,)
+            ).fetchall()
+
+    def stats(self) -> dict:
+        with self._lock:
+            records, urls, size = self._index.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(length), 0) FROM pages"
+            ).fetchone()
+        return {"records": records, "urls": urls, "compressed_bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers.clear()
+            self._index.close()
+
+
+_archive: Optional[PageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[PageArchive]:
+    """Process-wide archive, or None when PAGE_ARCHIVE_DIR is empty."""
+    global _archive
+    if not ARCHIVE_DIR:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PageArchive(ARCHIVE_DIR)
+    return _archive
+
+
+def archive_response(url: str, status: int, headers: Mapping[str, str], content: bytes) -> None:
+    """Called by the HTTP clients for each final response. A full disk or
+    broken index is logged, never raised: archiving must not fail a fetch."""
+    if status >= 400:
+        return
+    archive = get_archive()
+    if archive is None:
+        return
+    try:
+        archive.append(url, status, headers, content)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"[archive] could not store {url}: {e}")
+
+
+# -- replay -------------------------------------------------------------------
+
+class ReplayHttpClient:
+    """Stands in for HttpClient: `get()` returns the archived response."""
+
+    def __init__(self, archive: PageArchive, as_of: Optional[float] = None):
+        self.archive = archive
+        self.as_of = as_of
+
+    def _page(self, url: str) -> ArchivedPage:
+        try:
+            page = self.archive.get(url, self.as_of)
+        except PageNotArchived:
+            REPLAY_LOOKUPS.inc("miss")
+            raise
+        REPLAY_LOOKUPS.inc("hit")
+        return page
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout=None):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        page = self._page(url)
+        resp = requests.Response()
+        resp.status_code = page.status
+        resp.headers = CaseInsensitiveDict(page.headers)
+        resp._content = page.content
+        resp.url = url
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        return resp
+
+    def stats(self) -> Dict[str, dict]:
+        return {"replay": self.archive.stats()}
+
+
+class ReplayAsyncHttpClient(ReplayHttpClient):
+    """Stands in for AsyncHttpClient."""
+
+    async def get(self, url: str, headers: Optional[dict] = None):
+        import httpx
+
+        page = self._page(url)
+        return httpx.Response(
+            page.status,
+            headers=page.headers,
+            content=page.content,
+            request=httpx.Request("GET", url),
+        )
+
+    async def aclose(self) -> None:
+        pass
+
+
+@contextmanager
+def replay(as_of: Optional[float] = None, archive: Optional[PageArchive] = None) -> Iterator[PageArchive]:
+    """Serve every fetch in this process from the archive while the block runs."""
+    from .async_http_client import set_async_http_client
+    from .http_client import set_http_client
+
+    archive = archive or get_archive()
+    if archive is None:
+        raise RuntimeError("replay needs PAGE_ARCHIVE_DIR")
+    previous = set_http_client(ReplayHttpClient(archive, as_of))
+    previous_async = set_async_http_client(ReplayAsyncHttpClient(archive, as_of))
+    logger.info(f"[archive] replay on ({archive.stats()['records']} records)")
+    try:
+        yield archive
+    finally:
+        set_http_client(previous)
+        set_async_http_client(previous_async)
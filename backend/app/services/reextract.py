@@ -0,0 +1,199 @@
+"""
+Re-extract stored novels from the raw page archive.
+
+After a fix to `extract_metadata` or `parse_chapter`, `reextract_novel`
+replays the novel's listing and chapter pages from `page_archive` through
+its usual ingestor and rewrites whatever now parses differently: the novel's
+metadata, and each chapter's title and body (plus their search index rows).
+Chapter pages go through a ChapterPipeline as in a normal ingest, but the
+fetch stage only reads the archive, so the parse pool sets the pace.
+
+Run it inside `page_archive.replay()` (the re-extract script does); outside
+it the ingestor would download the pages again.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from app.db.engine import serialized_write
+from app.models.novel import Chapter, ChapterBody, ChapterFingerprint, ChapterTranslation, Novel
+from .chapter_cache import chapter_cache
+from .chapter_writer import DEFAULT_BATCH_SIZE
+from .content_store import compress_text, decompress_text, store_bodies
+from .ingest_pipeline import ChapterPipeline
+from .junk_filter import SCREEN_ENABLED, simhash, to_db
+from .novel_ingestor import PER_HOST_LIMIT, get_ingestor
+from .novel_stats import add_chapters
+from .search_index import index_chapters, index_novel, is_available as search_enabled, unindex_chapters
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ("title", "author", "cover_url", "total_chapters", "description", "status")
+
+
+class ChapterRewriter:
+    """
+    ChapterWriter counterpart for re-extraction, usable as a ChapterPipeline
+    writer: `add()` takes a freshly parsed chapter, and if its title or body
+    differ from the stored row (matched by source_url) `flush()` updates that
+    row, its search entry and its fingerprint in place, drops its
+    translations and adjusts the novel's character count (novel_stats).
+    Bodies nothing points at any more are deleted.
+    """
+
+    def __init__(self, db: Session, novel_id: int, batch_size: Optional[int] = None):
+        self.db = db
+        self.novel_id = novel_id
+        self.batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+        self.written = 0  # chapters rewritten
+        self.unchanged = 0
+        self.unknown = 0  # parsed pages with no stored chapter
+        # source_url -> (chapter id, title, content hash)
+        self._stored: Dict[str, Tuple[int, Optional[str], Optional[str]]] = {
+            url: (cid, title, digest)
+            for cid, url, title, digest in db.query(
+                Chapter.id, Chapter.source_url, Chapter.title, Chapter.content_hash
+            ).filter(Chapter.novel_id == novel_id)
+        }
+        self._rows: List[Dict] = []
+        self._bodies: Dict[str, Tuple[bytes, int]] = {}
+        self._texts: Dict[int, str] = {}
+        self._old_hashes: set = set()
+
+    def add(self, chapter_number: int, title: str, body: str, source_url: str) -> None:
+        stored = self._stored.get(source_url)
+        if stored is None:
+            self.unknown += 1
+            return
+        chapter_id, old_title, old_hash = stored
+        digest, blob = compress_text(body)
+        if title == old_title and digest == old_hash:
+            self.unchanged += 1
+            return
+        self._bodies[digest] = (blob, len(body.encode("utf-8")))
+        self._texts[chapter_id] = body
+        if old_hash is not None:
+            self._old_hashes.add(old_hash)
+        self._rows.append({
+            "id": chapter_id,
+            "title": title,
+            "content_hash": digest,
+            "original_content": None,
+        })
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Update and commit the buffered chapters. Returns how many changed."""
+        rows, self._rows = self._rows, []
+        bodies, self._bodies = self._bodies, {}
+        texts, self._texts = self._texts, {}
+        old_hashes, self._old_hashes = self._old_hashes, set()
+        if not rows:
+            return 0
+        with serialized_write(self.db):
+            try:
+                store_bodies(self.db, bodies)
+                old = self._old_chapters([r["id"] for r in rows])
+                if search_enabled(self.db):
+                    self._reindex(rows, texts, old)
+                self.db.bulk_update_mappings(Chapter, rows)
+                add_chapters(self.db, self.novel_id, 0, sum(
+                    len(texts[cid]) - len(old_text) for cid, (_, old_text) in old.items()
+                ))
+                if SCREEN_ENABLED:
+                    self._refingerprint(rows, texts)
+                # translations of the old text are stale; translate_novel redoes them
+                stale = self.db.query(ChapterTranslation).filter(
+                    ChapterTranslation.chapter_id.in_([r["id"] for r in rows])
+                )
+                old_hashes.update(h for (h,) in stale.with_entities(ChapterTranslation.content_hash))
+                stale.delete(synchronize_session=False)
+                if old_hashes:
+                    self.db.query(ChapterBody).filter(
+                        ChapterBody.hash.in_(old_hashes),
+                        ~exists().where(Chapter.content_hash == ChapterBody.hash),
+                        ~exists().where(ChapterTranslation.content_hash == ChapterBody.hash),
+                    ).delete(synchronize_session=False)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+        self.written += len(rows)
+        # this process only; API processes notice the bumped
+        # last_chapter_at on their own (see chapter_cache)
+        chapter_cache.invalidate_novel(self.novel_id)
+        logger.debug(f"[reextract] novel_id={self.novel_id}: {len(rows)} chapters rewritten")
+        return len(rows)
+
+    def _refingerprint(self, rows: List[Dict], texts: Dict[int, str]) -> None:
+        ids = [r["id"] for r in rows]
+        self.db.query(ChapterFingerprint).filter(
+            ChapterFingerprint.chapter_id.in_(ids)
+        ).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(ChapterFingerprint, [
+            {"chapter_id": cid, "novel_id": self.novel_id, "simhash": to_db(simhash(texts[cid]))}
+            for cid in ids
+        ])
+
+    def _old_chapters(self, ids: List[int]) -> Dict[int, Tuple[Optional[str], str]]:
+        """chapter id -> (title, text) as stored, before the rewrite."""
+        rows = self.db.query(
+            Chapter.id, Chapter.title, Chapter.original_content, ChapterBody.data
+        ).outerjoin(ChapterBody, ChapterBody.hash == Chapter.content_hash).filter(Chapter.id.in_(ids))
+        return {
+            cid: (title, decompress_text(data) if data is not None else (legacy or ""))
+            for cid, title, legacy, data in rows
+        }
+
+    def _reindex(
+        self, rows: List[Dict], texts: Dict[int, str], old: Dict[int, Tuple[Optional[str], str]]
+    ) -> None:
+        unindex_chapters(self.db, [(cid, title, text) for cid, (title, text) in old.items()])
+        index_chapters(self.db, [(r["id"], r["title"], texts[r["id"]]) for r in rows])
+
+
+def reextract_novel(
+    db: Session,
+    novel: Novel,
+    service_role_key: str = "",
+    concurrency: Optional[int] = None,
+) -> dict:
+    """Re-parse one stored novel from (replayed) pages; see module docstring."""
+    ingestor = get_ingestor(
+        db=db,
+        service_role_key=service_role_key,
+        url=novel.source_url,
+        # archive reads are local: use every per-host slot
+        concurrency=concurrency or PER_HOST_LIMIT,
+    )
+
+    soup = ingestor.fetch_html(novel.source_url)
+    meta = ingestor.extract_metadata(soup, novel.source_url)
+    changed = [f for f in METADATA_FIELDS if f in meta and meta[f] != getattr(novel, f)]
+    if changed:
+        with serialized_write(db):
+            for field in changed:
+                setattr(novel, field, meta[field])
+            index_novel(db, novel.id, novel.title, novel.author, novel.description)
+            db.commit()
+        logger.info(f"[reextract] novel_id={novel.id}: metadata changed ({', '.join(changed)})")
+
+    todo = db.query(Chapter.chapter_number, Chapter.source_url).filter(
+        Chapter.novel_id == novel.id
+    ).order_by(Chapter.chapter_number).all()
+    rewriter = ChapterRewriter(db, novel.id)
+    rewritten, failed, stages = ChapterPipeline(ingestor).run(rewriter, todo)
+    return {
+        "novel_id": novel.id,
+        "metadata_changed": changed,
+        "chapters_checked": len(todo),
+        "chapters_rewritten": rewritten,
+        "chapters_unchanged": rewriter.unchanged,
+        "chapters_failed": len(failed),
+        "failed_urls": failed,
+        "stages": stages,
+    }
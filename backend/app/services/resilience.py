@@ -0,0 +1,229 @@
+"""
+Per-domain politeness and resilience for page fetches.
+
+Each source host gets a `DomainGuard` combining:
+
+* an adaptive token bucket: the request rate grows slowly while responses
+  are fast and clean, and is halved on throttling (429/503), errors, or
+  latency above the domain's target (AIMD);
+* a circuit breaker that opens after a run of consecutive failures, fails
+  fast for a cooldown, then lets a single probe through (half-open);
+* a retry policy with full-jitter exponential backoff that never waits less
+  than the server's `Retry-After`.
+
+The HTTP clients (sync and async) drive the guards. This module only holds
+state and does the arithmetic; it never sleeps itself.
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+from .metrics import gauge
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+MAX_ATTEMPTS = int(os.getenv("FETCH_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.getenv("FETCH_BACKOFF_CAP", "30"))
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+DECREASE_HOLD = 1.0
+
+RATE_LIMIT = gauge(
+    "mtlhub_domain_rate_limit", "Current adaptive request rate (req/s)", ["domain"]
+)
+CIRCUIT_STATE = gauge(
+    "mtlhub_domain_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["domain"]
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose breaker is open."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"circuit open for {host}, retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff for the given (1-based) attempt."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_CAP * 4))
+    return delay
+
+
+class AdaptiveTokenBucket:
+    def __init__(self, rate: float, min_rate: float, max_rate: float, slow_latency: float):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.slow_latency = slow_latency
+        self.burst = max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _decrease(self, factor: float) -> None:
+        # one multiplicative decrease per DECREASE_HOLD: a burst of errors from
+        # requests already in flight is one congestion signal, not many
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_HOLD:
+            return
+        self._last_decrease = now
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.burst = max(1.0, self.rate)
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            if latency > self.slow_latency:
+                self._decrease(0.8)
+            else:
+                # additive increase: ~+1 req/s per `rate` clean responses
+                self.rate = min(self.max_rate, self.rate + 1.0 / max(self.rate, 1.0))
+                self.burst = max(1.0, self.rate)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self._decrease(0.5)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self.state == self.OPEN and remaining > 0:
+                raise CircuitOpenError(host, remaining)
+            # cooldown over: half-open, let exactly one probe through
+            self.state = self.HALF_OPEN
+            if self._probe_in_flight:
+                raise CircuitOpenError(host, 1.0)
+            self._probe_in_flight = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class DomainGuard:
+    def __init__(self, host: str):
+        from .http_client import settings_for
+
+        settings = settings_for(host.rsplit(":", 1)[0])
+        self.host = host
+        self.bucket = AdaptiveTokenBucket(
+            rate=settings.requests_per_second,
+            min_rate=settings.min_requests_per_second,
+            max_rate=settings.max_requests_per_second,
+            slow_latency=settings.slow_latency,
+        )
+        self.breaker = CircuitBreaker()
+        self._publish()
+
+    def acquire(self) -> float:
+        """Check the breaker and take a rate token; returns seconds to wait."""
+        self.breaker.before_request(self.host)
+        return self.bucket.reserve()
+
+    def record_success(self, latency: float) -> None:
+        self.breaker.on_success()
+        self.bucket.on_success(latency)
+        self._publish()
+
+    def record_failure(self, throttled: bool = False) -> None:
+        """Errors and throttling both halve the rate; a 429 (`throttled`) means
+        the host is up, so it doesn't count toward opening the breaker."""
+        if not throttled:
+            self.breaker.on_failure()
+        else:
+            self.breaker.release_probe()
+        self.bucket.on_throttle()
+        self._publish()
+
+    def release(self) -> None:
+        """The request was abandoned (cancelled, interrupted) without telling
+        anything about the host: just free the half-open probe slot."""
+        self.breaker.release_probe()
+        self._publish()
+
+    def _publish(self) -> None:
+        RATE_LIMIT.set(self.host, value=round(self.bucket.rate, 3))
+        CIRCUIT_STATE.set(self.host, value=self.breaker.state)
+
+
+_guards: Dict[str, DomainGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(host: str) -> DomainGuard:
+    """Process-wide guard for a host (shared by the sync and async clients)."""
+    guard = _guards.get(host)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(host)
+            if guard is None:
+                guard = _guards[host] = DomainGuard(host)
+    return guard
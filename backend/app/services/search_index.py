@@ -0,0 +1,370 @@
+"""
+Full-text search over novels and chapters.
+
+Chinese has no word boundaries, so text is pre-tokenized here into
+overlapping character bigrams (latin words are kept whole and lowercased)
+and the engine's own tokenizer only has to split on spaces. The last
+character of each CJK run is indexed once more on its own, so that every
+character starts some token:
+
+    SQLite:   FTS5 virtual tables `chapter_fts` (contentless) / `novel_fts`,
+              rowid = chapters.id / novels.id, ranked with bm25().
+    Postgres: `chapter_search` / `novel_search` tables holding a 'simple'
+              tsvector under a GIN index, ranked with ts_rank().
+
+A query term becomes a phrase of its bigrams, so it matches as a substring
+of the original text; a single character is a prefix query. Chapters are
+indexed by ChapterWriter in the same transaction that inserts them.
+
+`search_meta` records which tokenization the index was built with; when
+TOKENS_VERSION is newer, ensure_search_index rebuilds the index from the
+stored chapters and novels (once, at startup).
+"""
+
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.novel import Chapter, ChapterBody, Novel
+from .content_store import decompress_text
+
+logger = logging.getLogger(__name__)
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W{_CJK}]+)")
+
+# bump when index_tokens changes: existing indexes are rebuilt at startup
+TOKENS_VERSION = 2
+REBUILD_BATCH = 500
+
+# database URL -> whether the search tables exist there
+_available: Dict[str, bool] = {}
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chapter_fts USING fts5("
+    "title, body, content='', tokenize='unicode61')",
+    # novels are small; keep their content so rows can be replaced on update
+    "CREATE VIRTUAL TABLE IF NOT EXISTS novel_fts USING fts5("
+    "title, author, description, tokenize='unicode61')",
+    "CREATE TABLE IF NOT EXISTS search_meta (key VARCHAR(32) PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS chapter_search ("
+    "chapter_id INTEGER PRIMARY KEY REFERENCES chapters(id) ON DELETE CASCADE, "
+    "tsv tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_chapter_search_tsv ON chapter_search USING gin(tsv)",
+    "CREATE TABLE IF NOT EXISTS novel_search ("
+    "novel_id INTEGER PRIMARY KEY REFERENCES novels(id) ON DELETE CASCADE, "
+    "tsv tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_novel_search_tsv ON novel_search USING gin(tsv)",
+    "CREATE TABLE IF NOT EXISTS search_meta (key VARCHAR(32) PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+
+def bigram_tokens(value: Optional[str]) -> List[str]:
+    """Split text into CJK bigrams and lowercased latin/digit words."""
+    tokens: List[str] = []
+    for cjk, word in _TOKEN_RE.findall(value or ""):
+        if word:
+            tokens.append(word.lower())
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def index_tokens(value: Optional[str]) -> List[str]:
+    """bigram_tokens plus the last character of every CJK run: a character
+    that ends a run is otherwise only the second half of a bigram, which a
+    prefix query can't reach."""
+    tokens: List[str] = []
+    for cjk, word in _TOKEN_RE.findall(value or ""):
+        if word:
+            tokens.append(word.lower())
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+            tokens.append(cjk[-1])
+    return tokens
+
+
+def tokenize(value: Optional[str]) -> str:
+    return " ".join(index_tokens(value))
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """Create the search tables for this engine's dialect (idempotent)."""
+    dialect = engine.dialect.name
+    key = str(engine.url)
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(dialect)
+    if ddl is None:
+        logger.warning(f"[search] no full-text index for dialect {dialect}")
+        _available[key] = False
+        return False
+    try:
+        with engine.begin() as conn:
+            for stmt in ddl:
+                conn.execute(text(stmt))
+        _available[key] = True
+    except Exception as e:
+        logger.error(f"[search] could not create search index: {e}")
+        _available[key] = False
+        return False
+    with engine.connect() as conn:
+        version = conn.execute(
+            text("SELECT value FROM search_meta WHERE key = 'tokens'")
+        ).scalar()
+    if version != TOKENS_VERSION:
+        rebuild_search_index(engine)
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Re-index every novel and chapter with the current tokenization."""
+    sqlite = engine.dialect.name == "sqlite"
+    start = time.perf_counter()
+    db = Session(bind=engine)
+    try:
+        if sqlite:
+            db.execute(text("INSERT INTO chapter_fts(chapter_fts) VALUES ('delete-all')"))
+            db.execute(text("DELETE FROM novel_fts"))
+        else:
+            db.execute(text("DELETE FROM chapter_search"))
+            db.execute(text("DELETE FROM novel_search"))
+        for novel_id, title, author, description in db.query(
+            Novel.id, Novel.title, Novel.author, Novel.description
+        ).all():
+            index_novel(db, novel_id, title, author, description)
+        db.commit()
+
+        last = chapters = 0
+        while True:
+            rows = db.query(
+                Chapter.id, Chapter.title, Chapter.original_content, ChapterBody.data
+            ).outerjoin(ChapterBody, ChapterBody.hash == Chapter.content_hash).filter(
+                Chapter.id > last
+            ).order_by(Chapter.id).limit(REBUILD_BATCH).all()
+            if not rows:
+                break
+            index_chapters(db, [
+                (cid, title, decompress_text(data) if data is not None else (legacy or ""))
+                for cid, title, legacy, data in rows
+            ])
+            db.commit()
+            last = rows[-1][0]
+            chapters += len(rows)
+
+        db.execute(text("DELETE FROM search_meta WHERE key = 'tokens'"))
+        db.execute(
+            text("INSERT INTO search_meta (key, value) VALUES ('tokens', :v)"),
+            {"v": TOKENS_VERSION},
+        )
+        db.commit()
+    finally:
+        db.close()
+    logger.info(
+        f"[search] rebuilt index: {chapters} chapters in {time.perf_counter() - start:.1f}s"
+    )
+
+
+def is_available(db: Session) -> bool:
+    """Whether the search tables exist (checked once per database)."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _available:
+        if bind.dialect.name == "sqlite":
+            sql = "SELECT count(*) FROM sqlite_master WHERE name IN ('chapter_fts', 'novel_fts')"
+        elif bind.dialect.name == "postgresql":
+            sql = (
+                "SELECT (to_regclass('chapter_search') IS NOT NULL)::int"
+                " + (to_regclass('novel_search') IS NOT NULL)::int"
+            )
+        else:
+            _available[key] = False
+            return False
+        _available[key] = db.execute(text(sql)).scalar() == 2
+    return _available[key]
+
+
+# -- indexing -----------------------------------------------------------------
+
+def index_chapters(
+    db: Session, docs: Iterable[Tuple[int, str, str]], tokenized: bool = False
+) -> None:
+    """Index (chapter_id, title, body) rows in the caller's transaction.
+    `tokenized`: title and body already went through tokenize()."""
+    if not is_available(db):
+        return
+    prepare = (lambda value: value) if tokenized else tokenize
+    params = [
+        {"id": cid, "title": prepare(title), "body": prepare(body)}
+        for cid, title, body in docs
+    ]
+    if not params:
+        return
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(
+            text("INSERT INTO chapter_fts(rowid, title, body) VALUES (:id, :title, :body)"),
+            params,
+        )
+    else:
+        db.execute(
+            text(
+                "INSERT INTO chapter_search(chapter_id, tsv) VALUES "
+                "(:id, setweight(to_tsvector('simple', :title), 'A') || "
+                "to_tsvector('simple', :body)) "
+                "ON CONFLICT (chapter_id) DO UPDATE SET tsv = EXCLUDED.tsv"
+            ),
+            params,
+        )
+
+
+def unindex_chapters(db: Session, docs: Iterable[Tuple[int, str, str]]) -> None:
+    """Drop (chapter_id, title, body) rows from the index before they are
+    re-indexed. `chapter_fts` is contentless, so FTS5 needs the text that
+    was indexed to remove it."""
+    if not is_available(db):
+        return
+    params = [
+        {"id": cid, "title": tokenize(title), "body": tokenize(body)}
+        for cid, title, body in docs
+    ]
+    if not params:
+        return
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(
+            text(
+                "INSERT INTO chapter_fts(chapter_fts, rowid, title, body) "
+                "VALUES ('delete', :id, :title, :body)"
+            ),
+            params,
+        )
+    else:
+        db.execute(
+            text("DELETE FROM chapter_search WHERE chapter_id = :id"),
+            [{"id": p["id"]} for p in params],
+        )
+
+
+def index_novel(
+    db: Session,
+    novel_id: int,
+    title: Optional[str],
+    author: Optional[str],
+    description: Optional[str],
+) -> None:
+    """(Re)index one novel's title/author/description in the caller's transaction."""
+    if not is_available(db):
+        return
+    params = {
+        "id": novel_id,
+        "title": tokenize(title),
+        "author": tokenize(author),
+        "description": tokenize(description),
+    }
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("DELETE FROM novel_fts WHERE rowid = :id"), {"id": novel_id})
+        db.execute(
+            text(
+                "INSERT INTO novel_fts(rowid, title, author, description) "
+                "VALUES (:id, :title, :author, :description)"
+            ),
+            params,
+        )
+    else:
+        db.execute(
+            text(
+                "INSERT INTO novel_search(novel_id, tsv) VALUES "
+                "(:id, setweight(to_tsvector('simple', :title), 'A') || "
+                "setweight(to_tsvector('simple', :author), 'B') || "
+                "to_tsvector('simple', :description)) "
+                "ON CONFLICT (novel_id) DO UPDATE SET tsv = EXCLUDED.tsv"
+            ),
+            params,
+        )
+
+
+# -- querying -----------------------------------------------------------------
+
+def _fts5_query(q: str) -> Optional[str]:
+    terms = []
+    for term in q.split():
+        tokens = bigram_tokens(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1:
+            # a lone CJK char starts a bigram, or is the unigram ending its run
+            terms.append(f'"{tokens[0]}" *')
+        else:
+            terms.append('"' + " ".join(tokens) + '"')
+    return " AND ".join(terms) or None
+
+
+def _tsquery(q: str) -> Optional[str]:
+    terms = []
+    for term in q.split():
+        tokens = bigram_tokens(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1:
+            terms.append(f"'{tokens[0]}':*")
+        else:
+            terms.append("(" + " <-> ".join(f"'{t}'" for t in tokens) + ")")
+    return " & ".join(terms) or None
+
+
+def search(
+    db: Session, q: str, scope: str = "chapters", page: int = 1, page_size: int = 20
+) -> Tuple[List[dict], bool]:
+    """Return (hits, has_more) for one page of ranked results."""
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    match = _fts5_query(q) if sqlite else _tsquery(q)
+    if not match:
+        return [], False
+
+    params = {"q": match, "limit": page_size + 1, "offset": (page - 1) * page_size}
+    if scope == "novels":
+        if sqlite:
+            sql = (
+                "SELECT n.id AS novel_id, n.title, n.author, bm25(novel_fts, 10.0, 5.0, 1.0) AS score "
+                "FROM novel_fts JOIN novels n ON n.id = novel_fts.rowid "
+                "WHERE novel_fts MATCH :q ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+        else:
+            sql = (
+                "SELECT n.id AS novel_id, n.title, n.author, -ts_rank(s.tsv, query) AS score "
+                "FROM novel_search s, to_tsquery('simple', :q) query, novels n "
+                "WHERE n.id = s.novel_id AND s.tsv @@ query "
+                "ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+    else:
+        if sqlite:
+            sql = (
+                "SELECT c.novel_id, c.chapter_number, c.title, n.title AS novel_title, "
+                "bm25(chapter_fts, 5.0, 1.0) AS score "
+                "FROM chapter_fts JOIN chapters c ON c.id = chapter_fts.rowid "
+                "JOIN novels n ON n.id = c.novel_id "
+                "WHERE chapter_fts MATCH :q ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+        else:
+            sql = (
+                "SELECT c.novel_id, c.chapter_number, c.title, n.title AS novel_title, "
+                "-ts_rank(s.tsv, query) AS score "
+                "FROM chapter_search s, to_tsquery('simple', :q) query, chapters c, novels n "
+                "WHERE c.id = s.chapter_id AND n.id = c.novel_id AND s.tsv @@ query "
+                "ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+
+    rows = [dict(r._mapping) for r in db.execute(text(sql), params)]
+    has_more = len(rows) > page_size
+    hits = rows[:page_size]
+    for hit in hits:
+        # lower-is-better from both engines; flip so clients sort descending
+        hit["score"] = round(-float(hit["score"]), 6)
+    return hits, has_more
@@ -0,0 +1,454 @@
+"""
+Declarative site extractors.
+
+Each supported site is a `SiteSpec`: regexes and CSS selectors for listing
+metadata, chapter links and chapter bodies. They are compiled once, when the
+spec is declared at import time. `register()` turns a spec into a
+`SiteIngestor` subclass and maps each of the site's domains to it, so
+`ingestor_class_for(host)` is a dict lookup per domain suffix rather than a
+chain of `endswith` checks. A new site is one more spec at the bottom of
+this module; it adds no per-page work for the others.
+
+Generated classes are bound as module globals (`IxdzsIngestor`, ...) so the
+parse pool can pickle them by reference.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple, Type, Union
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from pydantic import HttpUrl
+
+from app.models.novel import Novel
+from .chapter_writer import ChapterWriter
+from .charset import decode_page
+from .crawl_frontier import FrontierTracker, seed_frontier, unfinished_chapters
+from .html_parser import parse_html
+from .http_client import get_http_client
+from .ingest_pipeline import ChapterPipeline
+from .novel_ingestor import IngestPlan, NovelIngestor, ingest_result
+from .novel_stats import normalize_status
+from .search_index import index_novel
+
+logger = logging.getLogger(__name__)
+
+
+def _compile(pattern: Optional[str]) -> Optional[Pattern]:
+    return re.compile(pattern) if pattern else None
+
+
+class SiteSpec:
+    """
+    name:                short id, used in logs and the class name
+    domains:             hosts served (subdomains match too)
+    book_id:             regex with a `book` group, searched in the listing URL
+    chapter_url:         regex searched in each absolute link URL; group
+                         `num` orders chapters, optional group `book` must
+                         equal the listing's book id
+    chapter_links:       CSS selector for candidate <a> tags on the listing
+    title_selector:      CSS for the novel title; None = first text line
+    author / total / words / status / updated:
+                         regexes over the listing text (group 1 is the value)
+    chapter_title:       CSS for the chapter title; chapter_title_split cuts
+                         the site-name suffix off (`第1章 xx_書名_ixdzs`)
+    paragraphs:          CSS whose matches are one paragraph each
+    content:             CSS candidates for a single body block, tried in
+                         order, split into lines
+    chapter_tags:        tags to build when parsing a chapter page
+                         (SoupStrainer); None parses the whole page
+    encoding:            tried when a page declares no charset, before
+                         full detection (see charset.decode_page)
+    min_paragraphs:      fewer paragraphs than this logs a short-chapter warning
+    """
+
+    def __init__(
+        self,
+        name: str,
+        domains: Sequence[str],
+        chapter_url: str,
+        book_id: Optional[str] = None,
+        chapter_links: str = "a[href]",
+        title_selector: Optional[str] = None,
+        author: Optional[str] = r"作者[:：]\s*([^\n\r]+)",
+        total: Optional[str] = r"共\s*(\d+)\s*章",
+        words: Optional[str] = r"(\d+(?:\.\d+)?)萬字",
+        status: Optional[str] = r"(連載中|已完結)",
+        updated: Optional[str] = r"更新[:：]\s*(\d{4}-\d{2}-\d{2}[^\n]+)",
+        chapter_title: str = "title",
+        chapter_title_split: Optional[str] = None,
+        paragraphs: Optional[str] = None,
+        content: Sequence[str] = (),
+        chapter_tags: Optional[Sequence[str]] = None,
+        encoding: str = "utf-8",
+        accept_language: str = "zh-CN,zh;q=0.9,en;q=0.8",
+        min_paragraphs: int = 3,
+    ):
+        self.name = name
+        self.domains = tuple(d.lower() for d in domains)
+        self.chapter_url = re.compile(chapter_url)
+        self.book_id = _compile(book_id)
+        self.chapter_links = soupsieve.compile(chapter_links)
+        self.title_selector = soupsieve.compile(title_selector) if title_selector else None
+        self.author = _compile(author)
+        self.total = _compile(total)
+        self.words = _compile(words)
+        self.status = _compile(status)
+        self.updated = _compile(updated)
+        self.chapter_title = soupsieve.compile(chapter_title)
+        self.chapter_title_split = chapter_title_split
+        self.paragraphs = soupsieve.compile(paragraphs) if paragraphs else None
+        self.content = tuple(soupsieve.compile(c) for c in content)
+        self.chapter_strainer = SoupStrainer(list(chapter_tags)) if chapter_tags else None
+        self.encoding = encoding
+        self.accept_language = accept_language
+        self.min_paragraphs = min_paragraphs
+
+
+def _lines(text: str) -> List[str]:
+    return [ln.strip() for ln in text.splitlines() if ln.strip()]
+
+
+def _first(regex: Optional[Pattern], text: str) -> Optional[str]:
+    if regex is None:
+        return None
+    m = regex.search(text)
+    return m.group(1).strip() if m else None
+
+
+class SiteIngestor(NovelIngestor):
+    """Ingestor driven entirely by `spec`; see register()."""
+
+    spec: SiteSpec = None
+    writer_class = ChapterWriter
+
+    @property
+    def accept_language(self) -> str:
+        return self.spec.accept_language
+
+    @property
+    def default_encoding(self) -> str:
+        return self.spec.encoding
+
+    def fetch_text(self, url: str) -> str:
+        headers = {"Accept-Language": self.spec.accept_language}
+        try:
+            resp = get_http_client().get(url, headers=headers)
+            resp.raise_for_status()
+            logger.debug(f"[{self.spec.name}] fetched {url}")
+            return decode_page(
+                resp.content, resp.url or url, resp.headers.get("Content-Type"), self.spec.encoding
+            )
+        except Exception as e:
+            logger.error(f"[{self.spec.name}] fetch_html failed for {url}: {e}")
+            raise
+
+    def extract_metadata(self, soup: BeautifulSoup, url: Union[str, HttpUrl]) -> dict:
+        spec = self.spec
+        text = soup.get_text("\n")
+
+        title = None
+        if spec.title_selector is not None:
+            el = spec.title_selector.select_one(soup)
+            title = el.get_text(strip=True) if el else None
+        if not title:
+            title = next(
+                (l for l in _lines(text)[:20]
+                 if len(l) > 2 and not any(d in l for d in spec.domains)),
+                "Unknown",
+            )
+        author = _first(spec.author, text) or "Unknown"
+        total = int(_first(spec.total, text) or 0)
+
+        desc_parts = []
+        words = _first(spec.words, text)
+        if words:
+            desc_parts.append(f"字數：{words}萬字")
+        status = _first(spec.status, text)
+        if status:
+            desc_parts.append(f"狀態：{status}")
+        updated = _first(spec.updated, text)
+        if updated:
+            desc_parts.append(f"更新：{updated}")
+        description = " | ".join(desc_parts) if desc_parts else None
+
+        logger.info(f"[{spec.name}] metadata: title={title}, author={author}, total={total}")
+        return {
+            "title": title[:255],
+            "author": author[:100],
+            "cover_url": None,
+            "total_chapters": total,
+            "source_url": str(url)[:500],
+            "description": description and description[:1000],
+            "status": normalize_status(status),
+        }
+
+    def get_chapter_urls(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+        """Every link matching spec.chapter_url, deduped and in chapter order."""
+        spec = self.spec
+        book = None
+        if spec.book_id is not None:
+            m = spec.book_id.search(base_url)
+            if not m:
+                logger.error(f"[{spec.name}] cannot extract book id from {base_url}")
+                return []
+            book = m.group("book")
+
+        found: Dict[str, int] = {}
+        for a in spec.chapter_links.select(soup):
+            full = urljoin(base_url, a.get("href", "").strip())
+            m = spec.chapter_url.search(full)
+            if not m or (book is not None and m.group("book") != book):
+                continue
+            found.setdefault(full, int(m.group("num")))
+
+        # sort key captured with the match; nothing is re-searched here
+        urls = sorted(found, key=found.__getitem__)
+        logger.info(f"[{spec.name}] found {len(urls)} chapters")
+        if urls:
+            logger.debug(f"[{spec.name}] sample urls: {urls[:3]} ... {urls[-3:]}")
+        return urls
+
+    def fetch_chapter_content(self, url: str) -> Tuple[str, str]:
+        """
+        Return (chapter_title, body_text). Errors propagate so the caller
+        records the chapter as failed (see NovelIngestor._fetch_chapter_limited).
+        """
+        return self.parse_chapter(self.fetch_text(url), url)
+
+    def parse_chapter(self, html: str, url: str) -> Tuple[str, str]:
+        """Extract (chapter_title, body_text) from a downloaded chapter page."""
+        spec = self.spec
+        soup = parse_html(html, parse_only=spec.chapter_strainer)
+
+        title_el = spec.chapter_title.select_one(soup)
+        chap_title = title_el.get_text().strip() if title_el else "Unknown Chapter"
+        if spec.chapter_title_split and spec.chapter_title_split in chap_title:
+            chap_title = chap_title.split(spec.chapter_title_split)[0].strip()
+
+        paras: List[str] = []
+        if spec.paragraphs is not None:
+            paras = [t for t in (p.get_text(strip=True) for p in spec.paragraphs.select(soup)) if t]
+        if not paras:
+            for selector in spec.content:
+                el = selector.select_one(soup)
+                if el is not None:
+                    paras = _lines(el.get_text("\n"))
+                    if paras:
+                        break
+        if not paras:
+            # fallback: full parse, split the page text on newline
+            paras = _lines(parse_html(html).get_text("\n"))
+
+        body = "\n\n".join(paras).strip()
+        if len(paras) < spec.min_paragraphs:
+            logger.warning(f"[{spec.name}] very short chapter at {url} ({len(paras)} paras)")
+
+        logger.debug(f"[{spec.name}] fetched chapter '{chap_title}' ({len(body)} chars)")
+        return chap_title[:255], body
+
+    def prepare_novel(
+        self, url: Union[str, HttpUrl], limit: Optional[int] = None, update: bool = False
+    ) -> Union[IngestPlan, dict]:
+        """
+        Steps 1-4 of ingest_novel: create the novel row (or, with update=True,
+        refresh an existing one) and list the chapter URLs not stored yet,
+        recording them in the crawl frontier. Without update, a novel whose
+        frontier still has unfinished chapters resumes with those. Also used
+        by the bulk scheduler, which fetches the chapters itself.
+        """
+        name = self.spec.name
+        url_str = str(url)
+        logger.info(f"[{name}] ingest_novel start: {url_str} (update={update})")
+
+        # 1) listing page + metadata
+        lst_soup = self.fetch_html(url_str)
+        meta = self.extract_metadata(lst_soup, url_str)
+        self.report_total(meta["total_chapters"])
+
+        # 2) avoid duplicates – or pick up where the stored copy ends
+        novel = self.db.query(Novel).filter(Novel.source_url == meta["source_url"]).first()
+        known = set()
+        if novel:
+            if not update:
+                # an earlier run that stopped part-way left chapters in the frontier
+                todo = unfinished_chapters(self.db, novel.id)
+                if not todo:
+                    logger.info(f"[{name}] already exists: novel_id={novel.id}")
+                    return {"status": "exists", "novel_id": novel.id, "chapters_ingested": 0}
+                if limit:
+                    todo = todo[:limit]
+                logger.info(f"[{name}] resuming novel_id={novel.id}: {len(todo)} chapters left")
+                self.report_novel(novel.id)
+                self.report_total(len(todo))
+                self.frontier = FrontierTracker(novel.id)
+                return IngestPlan(novel.id, todo)
+            logger.info(f"[{name}] updating existing novel id={novel.id}")
+            novel.total_chapters = meta["total_chapters"]
+            novel.description = meta["description"]
+            novel.status = meta["status"] or novel.status
+            known = self.known_chapter_urls(novel.id)
+        else:
+            # 3) create novel record
+            novel = Novel(**meta)
+            self.db.add(novel)
+            self.db.flush()
+            logger.info(f"[{name}] created novel id={novel.id}")
+        self.report_novel(novel.id)
+        index_novel(self.db, novel.id, novel.title, novel.author, novel.description)
+
+        # 4) chapter URLs, minus the ones already stored
+        chap_urls = self.get_chapter_urls(lst_soup, url_str)
+        if not chap_urls:
+            logger.warning(f"[{name}] no chapters found for {url_str}")
+            self.db.commit()
+            return {"status": "warning", "novel_id": novel.id, "chapters_ingested": 0}
+        if not meta["total_chapters"]:
+            novel.total_chapters = len(chap_urls)
+            self.report_total(len(chap_urls))
+
+        todo = [(idx, u) for idx, u in enumerate(chap_urls, start=1) if u not in known]
+        if limit:
+            todo = todo[:limit]
+        if known or limit:
+            logger.info(f"[{name}] {len(known)} chapters stored, {len(todo)} to fetch")
+            self.report_total(len(todo))
+
+        # Persist the novel row, with its frontier, now so chapter batches can
+        # commit on their own
+        todo = seed_frontier(self.db, novel.id, todo)
+        plan = IngestPlan(novel.id, todo)
+        self.db.commit()
+        self.frontier = FrontierTracker(novel.id)
+        return plan
+
+    def ingest_novel(
+        self, url: Union[str, HttpUrl], limit: int = None, update: bool = False
+    ) -> dict:
+        """
+        1-4) prepare_novel: novel row + the chapter URLs still missing
+        5) fetch (self.concurrency at a time) each missing chapter, parse it
+           in the parse process pool
+        6) write + commit them in batches of ChapterWriter.batch_size
+        (5-6 run as a ChapterPipeline; `stages` in the result is its per-stage
+        CPU time)
+
+        Chapters that still fail after the HTTP client's retries are reported
+        to the job, listed in `failed_urls` and turn the status into
+        "partial"; they stay unstored, so an update=True run picks them up.
+        """
+        name = self.spec.name
+        plan = self.prepare_novel(url, limit=limit, update=update)
+        if isinstance(plan, dict):
+            return plan
+        novel_id = plan.novel_id
+
+        # 5) + 6) fetch → parse → write in batches; chapter_number is explicit,
+        # so batches can be in completion order
+        writer = self.writer_class(
+            self.db, novel_id, report=self.report_chapter, frontier=self.frontier
+        )
+        failed: List[str] = []
+        try:
+            _, failed, stages = ChapterPipeline(self).run(writer, plan.todo)
+        except Exception as e:
+            logger.error(
+                f"[{name}] write failed for novel_id={novel_id} after "
+                f"{writer.written} chapters: {e}"
+            )
+            return {
+                "status": "error",
+                "novel_id": novel_id,
+                "chapters_ingested": writer.written,
+                "chapters_failed": len(failed),
+                "failed_urls": failed,
+                "message": str(e),
+            }
+
+        logger.info(
+            f"[{name}] committed {writer.written} chapters for novel_id={novel_id}"
+            f" ({writer.rejected} rejected, {len(writer.skipped)} skipped,"
+            f" {writer.flagged} flagged, {len(failed)} failed)"
+        )
+        logger.debug(f"[{name}] http stats: {get_http_client().stats()}")
+        result = ingest_result(novel_id, writer.written, failed, len(writer.skipped))
+        result["stages"] = stages
+        return result
+
+
+# -- registry -------------------------------------------------------------------
+
+SITES: Dict[str, Type[SiteIngestor]] = {}
+
+
+def register(spec: SiteSpec) -> Type[SiteIngestor]:
+    """Build the spec's ingestor class and route its domains to it."""
+    name = f"{spec.name.capitalize()}Ingestor"
+    cls = type(name, (SiteIngestor,), {
+        "__module__": __name__,
+        "__doc__": f"Ingestor for {', '.join(spec.domains)}, generated from its SiteSpec.",
+        "spec": spec,
+    })
+    globals()[name] = cls
+    for domain in spec.domains:
+        SITES[domain] = cls
+    return cls
+
+
+def ingestor_class_for(host: str) -> Optional[Type[SiteIngestor]]:
+    """Registered class for `host` or its closest parent domain, else None."""
+    host = host.lower().split(":", 1)[0]
+    while host:
+        cls = SITES.get(host)
+        if cls is not None:
+            return cls
+        _, _, host = host.partition(".")
+    return None
+
+
+# -- built-in sites -------------------------------------------------------------
+
+IXDZS = SiteSpec(
+    name="ixdzs",
+    domains=["ixdzs.tw"],
+    # /read/{book}/p{n}.html, only for the book being listed
+    book_id=r"/read/(?P<book>\d+)",
+    chapter_url=r"/read/(?P<book>\d+)/p(?P<num>\d+)\.html$",
+    chapter_title="title",
+    chapter_title_split="_",
+    paragraphs="p",
+    # Only <title> and <p> are read; the rest of the page isn't built
+    chapter_tags=["title", "p"],
+)
+
+TWKAN = SiteSpec(
+    name="twkan",
+    domains=["twkan.com"],
+    # book page /book/{book}.html, chapters /txt/{book}/{n}.html
+    book_id=r"/(?:book|txt)/(?P<book>\d+)",
+    chapter_url=r"/txt/(?P<book>\d+)/(?P<num>\d+)\.html$",
+    chapter_links="div.chapter-list a[href], ul.chapter-list a[href], a[href*='/txt/']",
+    title_selector="h1",
+    chapter_title="h1",
+    content=["#txtcontent0", ".chapter-content", "#chapter-content", ".content"],
+    accept_language="zh-TW,zh;q=0.9,en;q=0.8",
+)
+
+PIAOTIA = SiteSpec(
+    name="piaotia",
+    domains=["piaotia.com"],
+    # index /html/{shelf}/{book}/index.html, chapters /html/{shelf}/{book}/{n}.html
+    book_id=r"/(?:html|bookinfo)/\d+/(?P<book>\d+)",
+    chapter_url=r"/html/\d+/(?P<book>\d+)/(?P<num>\d+)\.html$",
+    chapter_links="div.centent a[href], ul a[href]",
+    title_selector="h1",
+    chapter_title="h1",
+    chapter_title_split="_",
+    content=["#content", "body"],
+    encoding="gb18030",
+)
+
+for _spec in (IXDZS, TWKAN, PIAOTIA):
+    register(_spec)
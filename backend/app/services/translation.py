@@ -0,0 +1,376 @@
+"""
+Machine translation of stored chapters, with a segment-level translation memory.
+
+`translate_novel` runs after ingest (ingest jobs queue it when
+TRANSLATE_AFTER_INGEST names a target language; app.scripts.translate
+catches up on the rest of the library). It takes the novel's chapters that have
+no translation into the target language yet, a batch of chapters at a time:
+
+1. every chapter (title and body) is split into sentence segments, keeping
+   the paragraph layout so the translation can be put back together;
+2. each segment is looked up in `translation_memory` by `segment_key`, the
+   hash of its normalized text (NFKC, whitespace collapsed) and language
+   pair. Boilerplate, names and recurring lines are translated once, ever;
+3. the remaining distinct segments go to the translation backend in
+   batches of at most `max_segments` / `max_chars`;
+4. new memory rows and the chapter translations (stored through the content
+   store, like chapter bodies) are committed together.
+
+Backends are pluggable: `register_backend(name, cls)`; TRANSLATION_BACKEND
+picks one. "stub" (the default) tags each segment instead of translating it,
+for tests and local runs; "libretranslate" talks to a LibreTranslate
+compatible server at TRANSLATION_API_URL.
+
+Each run reports segments/s and where segments came from (memory, repeated
+within the run, or the backend); the same counts are exported as
+mtlhub_translation_segments_total.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple, Type
+
+import requests
+from sqlalchemy.orm import Session
+
+from app.db.engine import serialized_write
+from app.models.novel import Chapter, ChapterBody, ChapterTranslation, TranslationMemory
+from .content_store import compress_text, decompress_text, store_bodies
+from .metrics import counter, histogram
+from .resilience import MAX_ATTEMPTS, RETRYABLE_STATUS, backoff_delay, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+SOURCE_LANG = os.getenv("TRANSLATION_SOURCE_LANG", "zh")
+CHAPTER_BATCH = int(os.getenv("TRANSLATION_CHAPTER_BATCH", "20"))
+MAX_SEGMENT_CHARS = 400
+LOOKUP_CHUNK = 500  # keys per IN (...) query
+
+SEGMENTS = counter(
+    "mtlhub_translation_segments_total", "Translated segments by where the translation came from",
+    ["source"],
+)
+BACKEND_SECONDS = histogram(
+    "mtlhub_translation_backend_seconds", "Time per translation backend call", ["backend"]
+)
+
+# -- segmenting --------------------------------------------------------------------
+
+# a sentence: text up to and including its terminal punctuation, plus any
+# closing quotes / brackets right after it
+_SENTENCE_RE = re.compile(r"[^。！？!?…]+(?:[。！？!?…]+[」』”’\"'）)]*)?|[。！？!?…]+[」』”’\"'）)]*")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    out = []
+    for sentence in _SENTENCE_RE.findall(paragraph):
+        sentence = sentence.strip()
+        # no punctuation for a long stretch: cut it so one batch item stays small
+        while len(sentence) > MAX_SEGMENT_CHARS:
+            out.append(sentence[:MAX_SEGMENT_CHARS])
+            sentence = sentence[MAX_SEGMENT_CHARS:]
+        if sentence:
+            out.append(sentence)
+    return out
+
+
+def segment(text: str) -> List[List[str]]:
+    """Paragraphs (non-empty lines) of sentence segments."""
+    return [split_sentences(line) for line in text.splitlines() if line.strip()]
+
+
+def normalize_segment(text: str) -> str:
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def segment_key(text: str, source: str, target: str) -> str:
+    """Translation memory key: same for segments that only differ in width
+    or spacing."""
+    return hashlib.sha256(f"{source}>{target}\n{normalize_segment(text)}".encode("utf-8")).hexdigest()
+
+
+def joiner(target: str) -> str:
+    """What goes between translated sentences of one paragraph."""
+    return "" if target.split("-")[0] in ("zh", "ja", "ko", "th") else " "
+
+
+# -- backends -----------------------------------------------------------------------
+
+
+class TranslationBackend:
+    """Translates batches of segments. Subclasses set `name` and the batch
+    limits and implement `translate` (one output per input, same order)."""
+
+    name = "base"
+    max_segments = 64
+    max_chars = 5000
+
+    def translate(self, segments: List[str], source: str, target: str) -> List[str]:
+        raise NotImplementedError
+
+
+class StubBackend(TranslationBackend):
+    """No model: returns each segment tagged with the target language.
+    TRANSLATION_STUB_LATENCY_MS adds a fixed delay per batch, to stand in
+    for a remote call."""
+
+    name = "stub"
+
+    def __init__(self):
+        self.latency = float(os.getenv("TRANSLATION_STUB_LATENCY_MS", "0")) / 1000
+
+    def translate(self, segments: List[str], source: str, target: str) -> List[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [f"[{target}] {s}" for s in segments]
+
+
+class LibreTranslateBackend(TranslationBackend):
+    """LibreTranslate-compatible HTTP API (POST /translate, `q` as a list)."""
+
+    name = "libretranslate"
+    max_segments = 50
+
+    def __init__(self):
+        self.url = os.getenv("TRANSLATION_API_URL", "http://localhost:5000").rstrip("/") + "/translate"
+        self.api_key = os.getenv("TRANSLATION_API_KEY", "")
+        self.session = requests.Session()
+
+    def translate(self, segments: List[str], source: str, target: str) -> List[str]:
+        payload = {"q": segments, "source": source, "target": target, "format": "text"}
+        if self.api_key:
+            payload["api_key"] = self.api_key
+        for attempt in range(MAX_ATTEMPTS):
+            resp = self.session.post(self.url, json=payload, timeout=(5, 120))
+            if resp.status_code not in RETRYABLE_STATUS or attempt == MAX_ATTEMPTS - 1:
+                break
+            time.sleep(backoff_delay(attempt, retry_after_seconds(resp.headers)))
+        resp.raise_for_status()
+        translated = resp.json()["translatedText"]
+        if len(translated) != len(segments):
+            raise ValueError(f"{self.name}: {len(segments)} segments in, {len(translated)} out")
+        return translated
+
+
+BACKENDS: Dict[str, Type[TranslationBackend]] = {
+    "stub": StubBackend,
+    "libretranslate": LibreTranslateBackend,
+}
+
+
+def register_backend(name: str, cls: Type[TranslationBackend]) -> None:
+    BACKENDS[name] = cls
+
+
+def get_backend(name: Optional[str] = None) -> TranslationBackend:
+    name = name or os.getenv("TRANSLATION_BACKEND", "stub")
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown translation backend {name!r} (known: {', '.join(BACKENDS)})")
+
+
+# -- the stage ------------------------------------------------------------------------
+
+
+class TranslationStats:
+    def __init__(self):
+        self.chapters = 0
+        self.segments = 0
+        self.memory_hits = 0  # found in translation_memory
+        self.repeats = 0  # seen earlier in this run (within a batch)
+        self.translated = 0  # sent to the backend
+        self.backend_calls = 0
+        self.backend_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "chapters": self.chapters,
+            "segments": self.segments,
+            "memory_hits": self.memory_hits,
+            "repeats": self.repeats,
+            "translated": self.translated,
+            "hit_rate": round((self.memory_hits + self.repeats) / self.segments, 3) if self.segments else 0.0,
+            "backend_calls": self.backend_calls,
+            "backend_seconds": round(self.backend_seconds, 3),
+            "segments_per_second": round(self.segments / elapsed, 1) if elapsed else 0.0,
+            "seconds": round(elapsed, 3),
+        }
+
+
+class Translator:
+    """
+    Usage:
+        translator = Translator(db, target="en")
+        translator.translate_chapters(chapter_ids)
+        translator.stats.snapshot()
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        target: str,
+        backend: Optional[TranslationBackend] = None,
+        source: str = SOURCE_LANG,
+    ):
+        self.db = db
+        self.target = target
+        self.source = source
+        self.backend = backend or get_backend()
+        self.stats = TranslationStats()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            rows = self.db.query(TranslationMemory.key, TranslationMemory.translated_text).filter(
+                TranslationMemory.key.in_(keys[i:i + LOOKUP_CHUNK])
+            )
+            found.update(rows)
+        return found
+
+    def _call_backend(self, texts: List[str]) -> List[str]:
+        start = time.perf_counter()
+        out = self.backend.translate(texts, self.source, self.target)
+        elapsed = time.perf_counter() - start
+        BACKEND_SECONDS.observe(self.backend.name, value=elapsed)
+        self.stats.backend_calls += 1
+        self.stats.backend_seconds += elapsed
+        return out
+
+    def _translate_missing(self, missing: Dict[str, str]) -> Dict[str, str]:
+        """{key: source text} -> {key: translation}, in backend-sized batches."""
+        done: Dict[str, str] = {}
+        batch: List[Tuple[str, str]] = []
+        chars = 0
+        for key, text in list(missing.items()) + [(None, "")]:
+            full = len(batch) >= self.backend.max_segments or chars + len(text) > self.backend.max_chars
+            if batch and (key is None or full):
+                out = self._call_backend([t for _, t in batch])
+                done.update((k, t) for (k, _), t in zip(batch, out))
+                batch, chars = [], 0
+            if key is not None:
+                batch.append((key, text))
+                chars += len(text)
+        return done
+
+    def translate_chapters(self, chapter_ids: List[int]) -> int:
+        """Translate and store the given chapters; returns how many."""
+        rows = self.db.query(
+            Chapter.id, Chapter.title, Chapter.original_content, ChapterBody.data
+        ).outerjoin(ChapterBody, ChapterBody.hash == Chapter.content_hash).filter(
+            Chapter.id.in_(chapter_ids)
+        ).all()
+
+        # chapter id -> (title segments, body paragraphs of segments)
+        layouts: Dict[int, Tuple[List[str], List[List[str]]]] = {}
+        sources: Dict[str, str] = {}  # key -> first text seen for it
+        occurrences = 0
+        for cid, title, legacy, data in rows:
+            text = decompress_text(data) if data is not None else (legacy or "")
+            layout = (split_sentences(title or ""), segment(text))
+            layouts[cid] = layout
+            for seg in layout[0] + [s for para in layout[1] for s in para]:
+                sources.setdefault(segment_key(seg, self.source, self.target), seg)
+                occurrences += 1
+        if not layouts:
+            return 0
+
+        known = self._lookup(list(sources))
+        missing = {k: t for k, t in sources.items() if k not in known}
+        fresh = self._translate_missing(missing) if missing else {}
+        translations = {**known, **fresh}
+
+        memory_hits = sum(1 for k in sources if k in known)
+        self.stats.segments += occurrences
+        self.stats.memory_hits += memory_hits
+        self.stats.translated += len(fresh)
+        self.stats.repeats += occurrences - memory_hits - len(fresh)
+        SEGMENTS.inc("memory", amount=memory_hits)
+        SEGMENTS.inc("backend", amount=len(fresh))
+        SEGMENTS.inc("repeat", amount=occurrences - memory_hits - len(fresh))
+
+        sep = joiner(self.target)
+
+        def put_back(segs: List[str]) -> str:
+            return sep.join(translations[segment_key(s, self.source, self.target)] for s in segs)
+
+        bodies: Dict[str, Tuple[bytes, int]] = {}
+        chapter_rows = []
+        for cid, (title_segs, paragraphs) in layouts.items():
+            body = "\n".join(put_back(p) for p in paragraphs)
+            digest, blob = compress_text(body)
+            bodies[digest] = (blob, len(body.encode("utf-8")))
+            chapter_rows.append({
+                "chapter_id": cid,
+                "lang": self.target,
+                "title": put_back(title_segs) or None,
+                "content_hash": digest,
+                "backend": self.backend.name,
+            })
+
+        with serialized_write(self.db):
+            try:
+                store_bodies(self.db, bodies)
+                # another worker may have stored some of these segments meanwhile
+                stored = set(self._lookup(list(fresh)))
+                self.db.bulk_insert_mappings(TranslationMemory, [
+                    {
+                        "key": k,
+                        "source_lang": self.source,
+                        "target_lang": self.target,
+                        "source_text": missing[k],
+                        "translated_text": t,
+                        "backend": self.backend.name,
+                    }
+                    for k, t in fresh.items() if k not in stored
+                ])
+                self.db.query(ChapterTranslation).filter(
+                    ChapterTranslation.chapter_id.in_(list(layouts)),
+                    ChapterTranslation.lang == self.target,
+                ).delete(synchronize_session=False)
+                self.db.bulk_insert_mappings(ChapterTranslation, chapter_rows)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+        self.stats.chapters += len(chapter_rows)
+        return len(chapter_rows)
+
+
+def untranslated_chapter_ids(db: Session, novel_id: int, target: str) -> List[int]:
+    translated = db.query(ChapterTranslation.chapter_id).filter(
+        ChapterTranslation.chapter_id == Chapter.id, ChapterTranslation.lang == target
+    ).exists()
+    rows = db.query(Chapter.id).filter(Chapter.novel_id == novel_id, ~translated).order_by(
+        Chapter.chapter_number, Chapter.id
+    )
+    return [cid for (cid,) in rows]
+
+
+def translate_novel(
+    db: Session,
+    novel_id: int,
+    target: str,
+    backend: Optional[TranslationBackend] = None,
+) -> dict:
+    """Translate every chapter of the novel not yet translated into `target`."""
+    translator = Translator(db, target, backend)
+    todo = untranslated_chapter_ids(db, novel_id, target)
+    for i in range(0, len(todo), CHAPTER_BATCH):
+        translator.translate_chapters(todo[i:i + CHAPTER_BATCH])
+    stats = translator.stats.snapshot()
+    if todo:
+        logger.info(
+            f"[translate] novel_id={novel_id} -> {target}: {stats['chapters']} chapters, "
+            f"{stats['segments']} segments ({stats['hit_rate']:.0%} from memory), "
+            f"{stats['translated']} translated in {stats['backend_calls']} calls, "
+            f"{stats['segments_per_second']} segments/s"
+        )
+    return {"novel_id": novel_id, "lang": target, **stats}
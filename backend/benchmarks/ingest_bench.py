@@ -0,0 +1,276 @@
+"""
+Offline ingest benchmark.
+
+Starts a local stand-in for ixdzs.tw in a separate process (listing page
+with `/read/{id}/pX.html` links, `作者：` / `共 N 章` metadata, and synthetic
+chapter pages of configurable size and latency), runs
+`IxdzsIngestor.ingest_novel` against it end to end into a throwaway SQLite
+database, and reports chapters/second, p50/p95 per stage (fetch, parse, DB
+batch write), CPU seconds per pipeline stage and peak RSS. Results are
+written as JSON so runs can be compared between versions:
+
+    cd backend
+    python -m benchmarks.ingest_bench --chapters 500 --latency-ms 20 --concurrency 8
+    python -m benchmarks.ingest_bench --parse-processes 4
+    python -m benchmarks.ingest_bench --compare benchmarks/results/<older>.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+NOVEL_ID = 424242
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# A few hundred common characters; enough for realistic compression / tokens
+_CHARS = (
+    "的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動"
+    "同工也能下過子說產種面而方後多定行學法所民得經十三之進著等部度家電力裡如水化高自"
+    "二理起小物現實加量都兩體制機當使點從業本去把性好應開它合還因由其些然前外天政四日那"
+    "社義事平形相全表間樣與關各重新線內數正心反你明看原又麼利比或但質氣第向道命此變條只"
+)
+
+
+# -- stand-in server ------------------------------------------------------------
+
+def _chapter_page(n: int, size: int) -> bytes:
+    rng = random.Random(n)
+    paras, total = [], 0
+    while total < size:
+        para = "".join(rng.choice(_CHARS) for _ in range(rng.randint(40, 160))) + "。"
+        paras.append(f"<p>{para}</p>")
+        total += len(para)
+    return (
+        f"<html><head><title>第{n}章 基準_基準測試小說_ixdzs</title></head>"
+        f"<body><div class='nav'>上一章 目錄 下一章</div>"
+        f"<article>{''.join(paras)}</article></body></html>"
+    ).encode("utf-8")
+
+
+def _make_handler(chapters: int, size: int, latency: float):
+    listing = (
+        "<html><head><title>基準測試小說_ixdzs</title></head><body>"
+        "<h1>基準測試小說</h1><p>作者：基準</p>"
+        f"<p>共 {chapters} 章</p><p>連載中</p><p>更新：2025-01-01 00:00</p><ul>"
+        + "".join(
+            f'<li><a href="/read/{NOVEL_ID}/p{i}.html">第{i}章</a></li>'
+            for i in range(1, chapters + 1)
+        )
+        + "</ul></body></html>"
+    ).encode("utf-8")
+    # Built up front so page generation doesn't show up as fetch latency
+    pages = {i: _chapter_page(i, size) for i in range(1, chapters + 1)}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # keep-alive + separate header/body writes would otherwise hit
+        # Nagle / delayed-ACK stalls and dominate the measured fetch time
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            prefix = f"/read/{NOVEL_ID}/p"
+            if self.path.startswith(prefix) and self.path.endswith(".html"):
+                body = pages.get(int(self.path[len(prefix):-5]))
+                if body is None:
+                    self.send_error(404)
+                    return
+            elif self.path.rstrip("/") == f"/read/{NOVEL_ID}":
+                body = listing
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def _serve(port_queue, chapters: int, size: int, latency: float) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(chapters, size, latency))
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+# -- instrumentation ------------------------------------------------------------
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "total_s": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "total_s": round(sum(ordered), 4),
+    }
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ingest-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # archive the pages like a real ingest would, but not into the checkout
+    os.environ.setdefault("PAGE_ARCHIVE_DIR", os.path.join(workdir, "page_archive"))
+    if args.parse_processes is not None:
+        os.environ["INGEST_PARSE_PROCESSES"] = str(args.parse_processes)
+
+    # app modules read DATABASE_URL / INGEST_PARSE_PROCESSES / PAGE_ARCHIVE_DIR
+    # at import time
+    from app.db.session import Base, IngestSessionLocal, engine
+    from app.models.novel import Chapter
+    from app.services.http_client import configure_domain
+    from app.services.ingest_pipeline import PARSE_PROCESSES
+    from app.services.search_index import ensure_search_index
+
+    from .instrumented import STAGES as stages, TimedIngestor, TimedWriter
+
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    # the stand-in is local: measure the pipeline, not the politeness limits
+    configure_domain("127.0.0.1", requests_per_second=10000, max_requests_per_second=10000)
+
+    TimedWriter.batch_size_override = args.batch_size
+
+    ctx = multiprocessing.get_context("spawn")
+    port_queue = ctx.Queue()
+    server = ctx.Process(
+        target=_serve,
+        args=(port_queue, args.chapters, args.chapter_size, args.latency_ms / 1000),
+        daemon=True,
+    )
+    server.start()
+    try:
+        port = port_queue.get(timeout=10)
+        url = f"http://127.0.0.1:{port}/read/{NOVEL_ID}/"
+
+        db = IngestSessionLocal()
+        ingestor = TimedIngestor(db, service_role_key="bench", concurrency=args.concurrency)
+
+        start = time.perf_counter()
+        result = ingestor.ingest_novel(url)
+        elapsed = time.perf_counter() - start
+        stored = db.query(Chapter).count()
+        db.close()
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "config": {
+            "chapters": args.chapters,
+            "chapter_size": args.chapter_size,
+            "latency_ms": args.latency_ms,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "parse_processes": PARSE_PROCESSES,
+            "cpus": os.cpu_count(),
+        },
+        "result": {
+            "status": result.get("status"),
+            "chapters_ingested": result.get("chapters_ingested", 0),
+            "chapters_stored": stored,
+            "elapsed_s": round(elapsed, 3),
+            "chapters_per_second": round(stored / elapsed, 2) if elapsed else 0.0,
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            "peak_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / (1024 * 1024 if sys.platform == "darwin" else 1024),
+                1,
+            ),
+            "db_size_mb": round(os.path.getsize(db_path) / 1024 / 1024, 2),
+        },
+        "stages": {name: _percentiles(samples) for name, samples in stages.items()},
+        "stage_cpu": result.get("stages", {}),
+    }
+
+
+def _compare(current: dict, previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as fh:
+        previous = json.load(fh)
+    if previous.get("config") != current["config"]:
+        print("⚠️  configs differ, comparison is indicative only")
+    before = previous["result"]["chapters_per_second"]
+    after = current["result"]["chapters_per_second"]
+    change = (after - before) / before * 100 if before else 0.0
+    print(f"chapters/s: {before} → {after} ({change:+.1f}%)")
+    for stage, stats in current["stages"].items():
+        old = previous.get("stages", {}).get(stage)
+        if old:
+            print(f"{stage:>9} p95: {old['p95_ms']} → {stats['p95_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chapters", type=int, default=300)
+    parser.add_argument("--chapter-size", type=int, default=3000,
+                        help="approximate characters per chapter")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="server-side delay per request")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--parse-processes", type=int, default=None,
+                        help="parse pool size (default INGEST_PARSE_PROCESSES; 0 = in-thread)")
+    parser.add_argument("--out", default=None, help="result JSON path")
+    parser.add_argument("--compare", default=None, help="previous result JSON to diff against")
+    args = parser.parse_args()
+
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run(args)
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"ingest-{report['git_rev']}-{int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    res = report["result"]
+    print(f"{res['chapters_stored']} chapters in {res['elapsed_s']} s "
+          f"→ {res['chapters_per_second']} ch/s, peak RSS {res['peak_rss_mb']} MB")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:>9}: n={stats['count']} p50={stats['p50_ms']} ms p95={stats['p95_ms']} ms")
+    for stage, cpu in report["stage_cpu"].items():
+        print(f"{stage:>9} cpu: {cpu['cpu_seconds']} s ({cpu['cpu_share']:.0%} of wall)")
+    print(f"📄 {out}")
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
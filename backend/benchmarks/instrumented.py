@@ -0,0 +1,59 @@
+"""
+Timed ingestor / writer subclasses for ingest_bench.
+
+Kept in their own module, imported once DATABASE_URL points at the
+benchmark database, so the parse pool's worker processes can unpickle
+`TimedIngestor` by reference.
+"""
+
+import time
+from typing import Dict, List
+
+from app.services import ingest_pipeline
+from app.services.chapter_writer import ChapterWriter
+from app.services.ixdzs_ingestor import IxdzsIngestor
+
+STAGES: Dict[str, List[float]] = {"fetch": [], "parse": [], "db_write": []}
+
+
+class TimedWriter(ChapterWriter):
+    batch_size_override = None
+
+    def __init__(self, db, novel_id, batch_size=None, report=None, frontier=None):
+        super().__init__(
+            db, novel_id, batch_size=batch_size or self.batch_size_override, report=report,
+            frontier=frontier,
+        )
+
+    def flush(self) -> int:
+        start = time.perf_counter()
+        try:
+            return super().flush()
+        finally:
+            STAGES["db_write"].append(time.perf_counter() - start)
+
+
+class TimedIngestor(IxdzsIngestor):
+    writer_class = TimedWriter
+
+    def fetch_text(self, url: str) -> str:
+        start = time.perf_counter()
+        try:
+            return super().fetch_text(url)
+        finally:
+            STAGES["fetch"].append(time.perf_counter() - start)
+
+
+_parse_chapter = ingest_pipeline.parse_chapter
+
+
+def _timed_parse_chapter(ingestor, html, url):
+    # wall time per page as the pipeline sees it (pool round trip included)
+    start = time.perf_counter()
+    try:
+        return _parse_chapter(ingestor, html, url)
+    finally:
+        STAGES["parse"].append(time.perf_counter() - start)
+
+
+ingest_pipeline.parse_chapter = _timed_parse_chapter
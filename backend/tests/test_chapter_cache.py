@@ -0,0 +1,85 @@
+"""Chapter cache: one version check per novel per revalidation window."""
+
+import pytest
+
+from app.services import chapter_cache as cache_module
+from app.services.chapter_cache import CachedChapter, ChapterCache
+
+
+class Versions:
+    """Stands in for novel_version(): counts the database round trips."""
+
+    def __init__(self):
+        self.current = {1: 10.0, 2: 20.0}
+        self.calls = 0
+
+    def of(self, novel_id):
+        def current_version():
+            self.calls += 1
+            return self.current[novel_id]
+        return current_version
+
+
+def read(cache, versions, key):
+    entry = cache.get(key, versions.of(key[0]))
+    if entry is None:
+        entry = CachedChapter({"chapter": key}, version=cache.version(key[0]))
+        cache.put(key, entry)
+    return entry
+
+
+@pytest.fixture
+def window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(cache_module, "REVALIDATE_SECONDS", 5)
+    return now
+
+
+def test_hits_within_window_skip_the_database(window):
+    cache, versions = ChapterCache(), Versions()
+    for number in range(1, 11):
+        read(cache, versions, (1, number))
+    for number in range(1, 11):
+        assert cache.get((1, number), versions.of(1)) is not None
+    assert versions.calls == 1
+
+    window[0] += 6
+    for number in range(1, 11):
+        assert cache.get((1, number), versions.of(1)) is not None
+    assert versions.calls == 2
+
+
+def test_changed_version_retires_the_whole_novel(window):
+    cache, versions = ChapterCache(), Versions()
+    for key in [(1, 1), (1, 2), (2, 1)]:
+        read(cache, versions, key)
+    versions.current[1] = 11.0  # rewritten by another process
+
+    assert cache.get((1, 1), versions.of(1)) is not None  # still within the window
+    window[0] += 6
+    assert cache.get((1, 1), versions.of(1)) is None
+    assert cache.get((1, 2), versions.of(1)) is None
+    assert cache.get((2, 1), versions.of(2)) is not None
+    assert cache.stats()["entries"] == 1
+
+
+def test_entry_built_before_a_change_is_not_served(window):
+    cache, versions = ChapterCache(), Versions()
+    assert cache.get((1, 1), versions.of(1)) is None
+    stale = CachedChapter({"chapter": "old"}, version=cache.version(1))
+    # the chapter changes and another reader notices before `stale` is stored
+    versions.current[1] = 11.0
+    window[0] += 6
+    read(cache, versions, (1, 2))
+    cache.put((1, 1), stale)
+    assert cache.get((1, 1), versions.of(1)) is None
+
+
+def test_local_invalidation_rechecks(window):
+    cache, versions = ChapterCache(), Versions()
+    read(cache, versions, (1, 1))
+    cache.invalidate_novel(1)
+    versions.current[1] = 11.0
+    assert cache.get((1, 1), versions.of(1)) is None
+    assert versions.calls == 2
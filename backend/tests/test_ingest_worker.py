@@ -0,0 +1,93 @@
+"""Ingest worker leases: claim, expiry and reclaim, and fencing stale claims."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.session import Base
+from app.models.novel import CrawlFrontier, Novel
+from app.services import ingest_worker
+from app.services.crawl_frontier import DONE, FAILED, IN_FLIGHT, QUEUED, FrontierTracker
+from app.services.ingest_worker import claim_tasks, release_tasks
+
+URLS = [f"http://example.test/c{n}" for n in range(1, 4)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = Session(bind=engine)
+    novel = Novel(title="書", author="某人", source_url="http://example.test/n")
+    session.add(novel)
+    session.flush()
+    session.add_all(
+        CrawlFrontier(novel_id=novel.id, chapter_number=n, url=url, state=QUEUED, attempts=0)
+        for n, url in enumerate(URLS, 1)
+    )
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def expire(db):
+    db.query(CrawlFrontier).filter(CrawlFrontier.state == IN_FLIGHT).update(
+        {"lease_expires": 0}, synchronize_session=False
+    )
+    db.commit()
+
+
+def row(db, url):
+    db.expire_all()
+    return db.query(CrawlFrontier).filter(CrawlFrontier.url == url).one()
+
+
+def test_claim_expire_reclaim(db):
+    first = claim_tasks(db, "worker-a", limit=2)
+    assert [t.url for t in first] == URLS[:2]
+    assert claim_tasks(db, "worker-b", limit=5)[0].url == URLS[2]
+    assert claim_tasks(db, "worker-c", limit=5) == []  # all leased
+
+    expire(db)
+    again = claim_tasks(db, "worker-c", limit=5)
+    assert [t.url for t in again] == URLS
+    assert {t.token for t in again} != {first[0].token}
+    claimed = row(db, URLS[0])
+    assert (claimed.state, claimed.lease_owner, claimed.attempts) == (IN_FLIGHT, "worker-c", 2)
+
+
+def test_expired_too_often_fails_and_drops_the_lease(db, monkeypatch):
+    monkeypatch.setattr(ingest_worker, "WORKER_MAX_ATTEMPTS", 2)
+    for _ in range(2):
+        assert len(claim_tasks(db, "worker-a", limit=5)) == 3
+        expire(db)
+    assert claim_tasks(db, "worker-b", limit=5) == []
+
+    failed = row(db, URLS[0])
+    assert failed.state == FAILED
+    assert failed.last_error == "lease expired 2 times"
+    assert (failed.lease_owner, failed.lease_token, failed.lease_expires) == (None, None, None)
+
+
+def test_stale_claim_cannot_write(db):
+    stale = claim_tasks(db, "worker-a", limit=1)[0]
+    expire(db)
+    fresh = claim_tasks(db, "worker-b", limit=1)[0]
+    assert fresh.url == stale.url and fresh.token != stale.token
+
+    # the slow first worker finishes after all: its writes must not land
+    tracker = FrontierTracker(stale.novel_id, lease_token=stale.token)
+    tracker.failed(stale.url, "timed out")
+    tracker.write(db, done=[stale.url])
+    db.commit()
+    current = row(db, stale.url)
+    assert (current.state, current.lease_token) == (IN_FLIGHT, fresh.token)
+    release_tasks(db, "worker-a", [stale], "gave up")
+    assert row(db, stale.url).lease_owner == "worker-b"
+
+    tracker = FrontierTracker(fresh.novel_id, lease_token=fresh.token)
+    tracker.write(db, done=[fresh.url])
+    db.commit()
+    current = row(db, fresh.url)
+    assert (current.state, current.lease_token) == (DONE, None)
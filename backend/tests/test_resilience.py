@@ -0,0 +1,106 @@
+"""Circuit breaker: a half-open probe must be released however the request ends."""
+
+import asyncio
+import time
+import uuid
+
+import httpx
+import pytest
+import requests
+
+from app.services.async_http_client import AsyncHttpClient
+from app.services.http_client import HttpClient
+from app.services.resilience import CircuitBreaker, CircuitOpenError, get_guard
+
+
+def half_open_guard(host):
+    """Guard for `host` whose breaker is open with the cooldown over, so the
+    next request is the half-open probe."""
+    guard = get_guard(host)
+    breaker = guard.breaker
+    breaker.state = CircuitBreaker.OPEN
+    breaker._opened_at = time.monotonic() - breaker.cooldown - 1
+    return guard
+
+
+def cool_down(guard):
+    guard.breaker._opened_at = time.monotonic() - guard.breaker.cooldown - 1
+
+
+def new_host():
+    return f"probe-{uuid.uuid4().hex[:8]}.test"
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("truncated"),
+    requests.exceptions.ContentDecodingError("bad gzip"),
+    requests.exceptions.TooManyRedirects("loop"),
+])
+def test_sync_probe_released_on_unexpected_error(monkeypatch, error):
+    host = new_host()
+    guard = half_open_guard(host)
+    client = HttpClient()
+
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(client.session, "get", fail)
+    with pytest.raises(type(error)):
+        client.get(f"http://{host}/chapter")
+
+    assert not guard.breaker._probe_in_flight
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    cool_down(guard)
+    guard.acquire()  # next probe is let through, not CircuitOpenError
+
+
+class _FailingClient:
+    def __init__(self, error):
+        self.error = error
+
+    async def get(self, url, headers=None):
+        raise self.error
+
+
+class _HangingClient:
+    async def get(self, url, headers=None):
+        await asyncio.sleep(3600)
+
+
+def test_async_probe_released_on_decoding_error():
+    host = new_host()
+    guard = half_open_guard(host)
+    client = AsyncHttpClient()
+    client._clients[host] = _FailingClient(httpx.DecodingError("bad gzip"))
+    client._limits[host] = asyncio.Semaphore(1)
+
+    with pytest.raises(httpx.DecodingError):
+        asyncio.run(client.get(f"http://{host}/chapter"))
+
+    assert not guard.breaker._probe_in_flight
+    cool_down(guard)
+    guard.acquire()
+
+
+def test_async_probe_released_on_cancel():
+    host = new_host()
+    guard = half_open_guard(host)
+    client = AsyncHttpClient()
+    client._clients[host] = _HangingClient()
+
+    async def cancel_probe():
+        client._limits[host] = asyncio.Semaphore(1)
+        task = asyncio.create_task(client.get(f"http://{host}/chapter"))
+        await asyncio.sleep(0.05)
+        assert guard.breaker._probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+
+    # cancelling says nothing about the host: the probe is free again at once
+    assert not guard.breaker._probe_in_flight
+    guard.acquire()
+    with pytest.raises(CircuitOpenError):
+        guard.acquire()  # ...and that one is the probe now
@@ -0,0 +1,65 @@
+"""Startup upgrade of a database created before compressed chapter bodies."""
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.db.session import Base
+from app.models.novel import Chapter, Novel
+from app.services.content_store import ensure_content_schema
+from app.services.novel_stats import ensure_novel_stats
+from app.services.search_index import ensure_search_index
+
+BASELINE = [
+    "CREATE TABLE novels (id INTEGER NOT NULL, title VARCHAR NOT NULL, author VARCHAR,"
+    " cover_url VARCHAR, source_url VARCHAR, total_chapters INTEGER, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_novels_source_url ON novels (source_url)",
+    "CREATE INDEX ix_novels_id ON novels (id)",
+    "CREATE TABLE chapters (id INTEGER NOT NULL, novel_id INTEGER NOT NULL,"
+    " chapter_number INTEGER, title VARCHAR, original_content TEXT NOT NULL,"
+    " source_url VARCHAR, PRIMARY KEY (id), FOREIGN KEY(novel_id) REFERENCES novels (id))",
+    "CREATE INDEX ix_chapters_novel_id ON chapters (novel_id)",
+    "CREATE INDEX ix_chapters_chapter_number ON chapters (chapter_number)",
+    "CREATE UNIQUE INDEX ix_chapters_source_url ON chapters (source_url)",
+    "CREATE INDEX ix_chapters_id ON chapters (id)",
+    "INSERT INTO novels (id, title, source_url, total_chapters) VALUES (1, '書', 'http://example.test/n', 1)",
+    "INSERT INTO chapters (id, novel_id, chapter_number, title, original_content, source_url)"
+    " VALUES (7, 1, 1, '第一章', '舊的內容', 'http://example.test/c1')",
+]
+
+
+def upgrade(engine):
+    Base.metadata.create_all(bind=engine)
+    ensure_content_schema(engine)
+    ensure_search_index(engine)
+    ensure_novel_stats(engine)
+
+
+def test_baseline_database_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE:
+            conn.execute(text(statement))
+
+    upgrade(engine)
+    upgrade(engine)  # idempotent
+
+    schema = inspect(engine)
+    columns = {c["name"]: c for c in schema.get_columns("chapters")}
+    assert columns["original_content"]["nullable"]
+    assert "content_hash" in columns
+    assert "description" in {c["name"] for c in schema.get_columns("novels")}
+    assert {i["name"] for i in schema.get_indexes("chapters")} >= {
+        i.name for i in Chapter.__table__.indexes
+    }
+
+    session = Session(bind=engine)
+    chapter = session.query(Chapter).one()
+    assert (chapter.id, chapter.novel_id) == (7, 1)
+    assert chapter.content == "舊的內容"
+    # hash-only rows go in now
+    session.add(Chapter(novel_id=1, chapter_number=2, title="第二章",
+                        source_url="http://example.test/c2"))
+    session.commit()
+    assert session.query(Novel).one().description is None
+    session.close()
+    engine.dispose()
@@ -0,0 +1,67 @@
+"""CJK search: single characters match wherever they sit in a run."""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.session import Base
+from app.models.novel import Chapter, Novel
+from app.services import search_index
+from app.services.search_index import ensure_search_index, index_chapters, search
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    session = Session(bind=engine)
+    novel = Novel(title="王國記", author="某人", source_url="http://example.test/n")
+    session.add(novel)
+    session.flush()
+    chapter = Chapter(novel_id=novel.id, chapter_number=1, title="第一章",
+                      source_url="http://example.test/c1")
+    session.add(chapter)
+    session.flush()
+    index_chapters(session, [(chapter.id, "第一章", "他是國王。")])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("q", ["王", "國", "國王", "他是", "是", "他"])
+def test_single_chars_and_phrases(db, q):
+    hits, _ = search(db, q)
+    assert [h["chapter_number"] for h in hits] == [1]
+
+
+def test_char_ending_a_run_does_not_match_across_runs(db):
+    hits, _ = search(db, "王他")
+    assert hits == []
+
+
+def test_old_index_is_rebuilt(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # an index written before the run-final unigrams existed
+    monkeypatch.setattr(search_index, "index_tokens", search_index.bigram_tokens)
+    ensure_search_index(engine)
+    session = Session(bind=engine)
+    novel = Novel(title="書", author="某人", source_url="http://example.test/n")
+    session.add(novel)
+    session.flush()
+    chapter = Chapter(novel_id=novel.id, chapter_number=1, title="第一章",
+                      source_url="http://example.test/c1", original_content="他是國王。")
+    session.add(chapter)
+    session.flush()
+    index_chapters(session, [(chapter.id, "第一章", "他是國王。")])
+    session.execute(text("DELETE FROM search_meta"))
+    session.commit()
+    assert search(session, "王")[0] == []
+
+    monkeypatch.undo()
+    ensure_search_index(engine)
+    assert [h["chapter_number"] for h in search(session, "王")[0]] == [1]
+    session.close()
+    engine.dispose()